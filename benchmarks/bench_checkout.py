@@ -0,0 +1,59 @@
+"""Benchmark do checkout: custo por linha de fatura vs. tamanho do catálogo.
+
+    python -m benchmarks.bench_checkout
+
+Para cada tamanho de catálogo mede uma fatura de 1 linha e outra de 30
+linhas; a diferença dividida por 29 é o custo marginal de cada linha, que
+deve manter-se constante mesmo com catálogos maiores.
+"""
+import tempfile
+import time
+from pathlib import Path
+
+from models.json_storage import JsonStorage
+from models.product import Product
+from models.system_manager import SystemManager
+
+CATALOG_SIZES = (1_000, 10_000, 50_000)
+REPEAT = 5
+
+
+def _make_manager(base: Path, n_products: int) -> SystemManager:
+    storage = JsonStorage(base / "users.json", base / "products.json", base / "sales.json")
+    SystemManager.INVOICES = base / "invoices"
+    sm = SystemManager(storage=storage)
+    products = [
+        Product(code=f"P{i:06d}", name=f"Produto {i}", price_no_vat=1.0, ptype="x",
+                stock=1_000_000, company="Loja", shop_type="OUTRO").to_dict()
+        for i in range(n_products)
+    ]
+    storage._save(storage.products_path, products)
+    return sm
+
+
+def _time_checkout(sm: SystemManager, n_lines: int, n_products: int) -> float:
+    step = max(1, n_products // n_lines)
+    items = [{"code": f"P{i * step:06d}", "name": "x", "qty": 1, "price_no_vat": 1.0}
+             for i in range(n_lines)]
+    best = float("inf")
+    for _ in range(REPEAT):
+        t0 = time.perf_counter()
+        sm.create_invoice(items=items, seller_username="bench")
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main() -> None:
+    print(f"{'produtos':>9} {'1 linha (ms)':>13} {'30 linhas (ms)':>15} {'por linha (ms)':>15}")
+    for n in CATALOG_SIZES:
+        with tempfile.TemporaryDirectory() as tmp:
+            sm = _make_manager(Path(tmp), n)
+            one = _time_checkout(sm, 1, n)
+            thirty = _time_checkout(sm, 30, n)
+            per_line = (thirty - one) / 29
+            sm.close()
+            print(f"{n:>9} {one * 1000:>13.2f} {thirty * 1000:>15.2f} {per_line * 1000:>15.4f}")
+
+
+if __name__ == "__main__":
+    main()
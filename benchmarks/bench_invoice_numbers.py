@@ -0,0 +1,78 @@
+"""Numeração das faturas: várias caixas a pedir números ao mesmo tempo.
+
+    python -m benchmarks.bench_invoice_numbers
+
+Lança 1 a 4 processos sobre a mesma pasta ``series/``; cada um escolhe a
+primeira caixa livre e pede ``NUMBERS`` IDs. No fim confirma que não há
+IDs repetidos e que cada série é contínua (1..N, sem falhas).
+"""
+import multiprocessing
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+from models.invoice_series import InvoiceNumberAllocator, parse_invoice_id
+
+TERMINALS = (1, 2, 3, 4)
+NUMBERS = 10_000
+
+
+def run_till(folder: str, out: str, numbers: int, block: int = 100) -> None:
+    """Uma caixa: pede ``numbers`` IDs e escreve-os em ``out`` (um por linha)."""
+    allocator = InvoiceNumberAllocator(Path(folder), lambda year, terminal: 0, block=block)
+    ids = []
+    for _ in range(numbers):
+        with allocator.issue() as invoice_id:
+            ids.append(invoice_id)
+    allocator.close()
+    Path(out).write_text("\n".join(ids), encoding="utf-8")
+
+
+def run_terminals(base: Path, terminals: int, numbers: int) -> float:
+    """Corre as caixas em paralelo e devolve o tempo total (s)."""
+    ctx = multiprocessing.get_context("spawn")
+    # Os processos arrancam todos antes de começar a contar (o spawn é lento)
+    procs = [ctx.Process(target=run_till, args=(str(base / "series"), str(base / f"ids-{t}.txt"),
+                                                numbers))
+             for t in range(terminals)]
+    t0 = time.perf_counter()
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join()
+    elapsed = time.perf_counter() - t0
+    if any(p.exitcode != 0 for p in procs):
+        raise RuntimeError("Uma das caixas terminou com erro.")
+    return elapsed
+
+
+def check(base: Path) -> Dict[str, List[int]]:
+    """Números emitidos por caixa; levanta AssertionError se houver repetidos."""
+    ids = [i for path in sorted(base.glob("ids-*.txt"))
+           for i in path.read_text(encoding="utf-8").split()]
+    if len(ids) != len(set(ids)):
+        raise AssertionError("IDs de fatura repetidos.")
+    series: Dict[str, List[int]] = {}
+    for invoice_id in ids:
+        _, terminal, number = parse_invoice_id(invoice_id)
+        series.setdefault(terminal, []).append(number)
+    return {t: sorted(numbers) for t, numbers in series.items()}
+
+
+def main() -> None:
+    print(f"{'caixas':>7} {'números':>9} {'tempo (s)':>10} {'números/s':>11} {'contínuas':>10}")
+    for n in TERMINALS:
+        with tempfile.TemporaryDirectory() as tmp:
+            base = Path(tmp)
+            elapsed = run_terminals(base, n, NUMBERS)
+            series = check(base)
+            contiguous = all(numbers == list(range(1, len(numbers) + 1))
+                             for numbers in series.values())
+            total = n * NUMBERS
+            print(f"{n:>7} {total:>9} {elapsed:>10.2f} {total / elapsed:>11.0f} "
+                  f"{'sim' if contiguous else 'NÃO':>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""Regenerar o arquivo de faturas: faturas por segundo com 1 a N processos.
+
+    python -m benchmarks.bench_invoice_render
+
+Gera ``INVOICES`` faturas sintéticas de ``LINES`` linhas e mede o tempo de
+``render_all`` (gerar e guardar no arquivo) para cada número de processos.
+"""
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, Iterator
+
+from models.invoice_archive import InvoiceArchive
+from models.invoice_template import TemplateSet, render_all
+
+INVOICES = 20_000
+LINES = 10
+
+
+def synthetic(n: int) -> Iterator[Dict]:
+    items = [{"code": f"P{i:03d}", "name": f"Produto {i}", "qty": 2, "price_no_vat": 1.5}
+             for i in range(LINES)]
+    for i in range(n):
+        yield {"id": f"INV-2025-1-{i:06d}", "timestamp": "2025-11-20T11:30:26", "seller": "v1",
+               "company": "Loja", "shop_type": "OUTRO", "vat_rate": 0.23,
+               "total_no_vat": 30.0, "total_with_vat": 36.9, "items": items}
+
+
+def main() -> None:
+    invoice = next(synthetic(1))
+    templates = TemplateSet()
+    t0 = time.perf_counter()
+    for _ in range(2_000):
+        templates.render(invoice)
+    print(f"só gerar o HTML: {2_000 / (time.perf_counter() - t0):.0f} faturas/s\n")
+
+    print(f"{'processos':>9} {'faturas':>8} {'tempo (s)':>10} {'faturas/s':>10}")
+    for workers in sorted({1, 2, 4, os.cpu_count() or 1}):
+        with tempfile.TemporaryDirectory() as tmp:
+            archive = InvoiceArchive(Path(tmp))
+            t0 = time.perf_counter()
+            n = render_all(synthetic(INVOICES), archive, workers=workers)
+            elapsed = time.perf_counter() - t0
+            archive.close()
+        print(f"{workers:>9} {n:>8} {elapsed:>10.2f} {n / elapsed:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Logins por segundo com o custo de hash escolhido.
+
+    python -m benchmarks.bench_login [--logins 40] [--cost N] [--scheme scrypt]
+
+Cria 200 utilizadores com a password já em hash e mede os logins
+(``login_async``) com 1, 2 e 4 threads no pool, mais um login isolado
+(latência vista pela caixa). O antigo LoginWorker esperava 0,5 s fixos
+antes de cada login: no máximo 2 logins/s por caixa, seja qual for o hash.
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from models import passwords
+from models.file_cache import FILE_CACHE
+from models.json_storage import JsonStorage
+from models.system_manager import SystemManager
+
+USERS = 200
+
+
+def _make_manager(base: Path, scheme: str, cost: int, workers: int) -> SystemManager:
+    storage = JsonStorage(base / "users.json", base / "products.json", base / "sales.json",
+                          multi_terminal=False)
+    SystemManager.INVOICES = base / "invoices"
+    return SystemManager(storage=storage, password_scheme=scheme, password_cost=cost,
+                         login_workers=workers)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--logins", type=int, default=40)
+    parser.add_argument("--scheme", default=passwords.DEFAULT_SCHEME, choices=passwords.SCHEMES)
+    parser.add_argument("--cost", type=int, default=None)
+    args = parser.parse_args()
+    cost = args.cost or passwords.DEFAULT_COST[args.scheme]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        base = Path(tmp)
+        sm = _make_manager(base, args.scheme, cost, 1)
+        hashed = passwords.hash_password("password", args.scheme, cost)
+        # Mesmo hash para todos: o que se mede é a verificação, não a criação
+        for i in range(USERS):
+            sm.storage.add_user({"username": f"u{i}", "email": f"u{i}@x", "password": hashed,
+                                 "role": "VENDOR", "company": "L", "shop_type": "OUTRO"})
+        sm.close()
+
+        print(f"{args.scheme}, custo {cost}")
+        for workers in (1, 2, 4):
+            FILE_CACHE.invalidate()
+            sm = _make_manager(base, args.scheme, cost, workers)
+            assert sm.login("u0", "password") is not None
+            single = time.perf_counter()
+            sm.login("u1", "password")
+            single = time.perf_counter() - single
+            t0 = time.perf_counter()
+            futures = [sm.login_async(f"u{i % USERS}", "password") for i in range(args.logins)]
+            ok = sum(f.result() is not None for f in futures)
+            seconds = time.perf_counter() - t0
+            sm.close()
+            print(f"  {workers} thread(s): {ok / seconds:6.1f} logins/s  "
+                  f"(um login: {single * 1000:.0f} ms)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Memória e custo de conversão: dicts vs. registos com ``__slots__``.
+
+    python -m benchmarks.bench_records [--products 100000]
+
+Lê ``--products`` produtos de JSON (como o catálogo em ``products.json``)
+e mede com ``tracemalloc`` a memória que a lista ocupa como dicts e como
+registos ``Product``, mais o tempo de ``from_dict``/``to_dict``. Repete
+para 10k vendas de 3 linhas (``Sale`` + ``InvoiceLine``).
+"""
+import argparse
+import gc
+import json
+import time
+import tracemalloc
+
+from models.product import Product
+from models.sale import Sale
+
+SHOPS = ("RESTAURACAO", "FARMACIA", "OFICINA", "OUTRO")
+
+
+def _products_json(n: int) -> bytes:
+    return json.dumps([
+        {"code": f"P{i:06d}", "name": f"Produto {i}", "price_no_vat": 1.0 + i % 50,
+         "ptype": f"Tipo {i % 12}", "image_path": "", "stock": i % 100, "min_stock": 5,
+         "company": "Loja", "shop_type": SHOPS[i % len(SHOPS)]}
+        for i in range(n)]).encode("utf-8")
+
+
+def _sales_json(n: int) -> bytes:
+    return json.dumps([
+        {"id": f"INV-2025-1-{i:06d}", "timestamp": "2025-01-01T10:00:00", "seller": f"v{i % 5}",
+         "company": "Loja", "shop_type": "OUTRO",
+         "items": [{"code": f"P{j:06d}", "name": f"Produto {j}", "qty": 1, "price_no_vat": 2.0}
+                   for j in range(3)],
+         "total_no_vat": 6.0, "vat_rate": 0.23, "total_with_vat": 7.38, "html_path": None}
+        for i in range(n)]).encode("utf-8")
+
+
+def _measure(build):
+    """Memória (bytes) ainda ocupada pelo resultado de ``build()`` e o próprio resultado."""
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return size, result
+
+
+def _compare(label: str, raw: bytes, cls) -> None:
+    n = len(json.loads(raw))
+    as_dicts, dicts = _measure(lambda: json.loads(raw))
+    as_records, records = _measure(lambda: [cls.from_dict(d) for d in json.loads(raw)])
+    t0 = time.perf_counter()
+    converted = [cls.from_dict(d) for d in dicts]
+    decode = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    back = [r.to_dict() for r in converted]
+    encode = time.perf_counter() - t0
+    assert back == dicts and records == dicts
+    print(f"{label}: {n} registos")
+    print(f"  dicts     {as_dicts / 1e6:8.1f} MB  ({as_dicts / n:6.0f} B/registo)")
+    print(f"  registos  {as_records / 1e6:8.1f} MB  ({as_records / n:6.0f} B/registo)"
+          f"  -{100 * (1 - as_records / as_dicts):.0f}%")
+    print(f"  from_dict {decode * 1e6 / n:8.2f} µs/registo   to_dict {encode * 1e6 / n:6.2f} µs/registo")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--products", type=int, default=100_000)
+    parser.add_argument("--sales", type=int, default=10_000)
+    args = parser.parse_args()
+    _compare("Produtos", _products_json(args.products), Product)
+    _compare("Vendas (3 linhas)", _sales_json(args.sales), Sale)
+
+
+if __name__ == "__main__":
+    main()
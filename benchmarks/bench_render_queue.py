@@ -0,0 +1,58 @@
+"""Latência do checkout com o HTML gerado na hora vs. em segundo plano.
+
+    python -m benchmarks.bench_render_queue
+
+Faz ``CHECKOUTS`` vendas de ``LINES`` linhas e mostra o p50/p99 do tempo de
+``create_invoice`` com ``background_render`` desligado e ligado.
+"""
+import statistics
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict
+
+from models.file_cache import FILE_CACHE
+from models.json_storage import JsonStorage
+from models.product import Product
+from models.system_manager import SystemManager
+
+CHECKOUTS = 500
+LINES = 20
+
+
+def measure(base: Path, background: bool, checkouts: int = CHECKOUTS) -> Dict[str, float]:
+    """p50/p99 (ms) do checkout e tempo até todos os HTML estarem gerados."""
+    storage = JsonStorage(base / "users.json", base / "products.json", base / "sales.json")
+    SystemManager.INVOICES = base / "invoices"
+    sm = SystemManager(storage=storage, background_render=background)
+    storage.add_products([
+        Product(code=f"P{i:03d}", name=f"Produto {i}", price_no_vat=1.0, ptype="x",
+                stock=1_000_000).to_dict()
+        for i in range(LINES)
+    ])
+    cart = [{"code": f"P{i:03d}", "name": f"Produto {i}", "qty": 1, "price_no_vat": 1.0}
+            for i in range(LINES)]
+    times = []
+    t_start = time.perf_counter()
+    for _ in range(checkouts):
+        t0 = time.perf_counter()
+        sm.create_invoice(items=cart, seller_username="v1")
+        times.append((time.perf_counter() - t0) * 1000)
+    sm.close()  # com a fila: espera pelos HTML que faltam
+    total = time.perf_counter() - t_start
+    FILE_CACHE.invalidate()
+    q = statistics.quantiles(times, n=100)
+    return {"p50": q[49], "p99": q[98], "total": total}
+
+
+def main() -> None:
+    print(f"{'HTML':>14} {'p50 (ms)':>9} {'p99 (ms)':>9} {'total (s)':>10}")
+    for background in (False, True):
+        with tempfile.TemporaryDirectory() as tmp:
+            r = measure(Path(tmp), background)
+        label = "segundo plano" if background else "no checkout"
+        print(f"{label:>14} {r['p50']:>9.2f} {r['p99']:>9.2f} {r['total']:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""Análises do dashboard: ciclo sobre dicts vs. colunas (``sales_columns``).
+
+    python -m benchmarks.bench_sales_columns [--sales 1000000]
+
+Gera ``--sales`` vendas espalhadas por dois anos e mede, para o mesmo
+resultado, o ciclo antigo (``iter_sales`` + ``fromisoformat`` por venda)
+e as colunas: a primeira construção, a abertura a partir de
+``sales_columns.bin`` e cada consulta. Indica também se o NumPy está
+instalado (sem ele usa-se o caminho ``array``/``bisect``).
+"""
+import argparse
+import json
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from models import sales_columns
+from models.json_storage import JsonStorage
+from models.sales_columns import SalesColumns
+
+SELLERS = [f"v{i:02d}" for i in range(20)]
+SHOPS = [("Loja", "FARMACIA"), ("Loja", "OFICINA"), ("Outra", "RESTAURACAO")]
+
+
+def _write_sales(folder: Path, n: int) -> None:
+    """Escreve as partições mensais diretamente (o manifesto é recontado na abertura)."""
+    rnd = random.Random(1)
+    start = datetime(2024, 1, 1)
+    span = 2 * 365 * 86400
+    stamps = sorted(start + timedelta(seconds=rnd.randrange(span)) for _ in range(n))
+    folder.mkdir(parents=True, exist_ok=True)
+    files = {}
+    for i, ts in enumerate(stamps):
+        company, shop_type = SHOPS[i % len(SHOPS)]
+        sale = {"id": f"S{i}", "timestamp": ts.isoformat(timespec="seconds"),
+                "seller": SELLERS[i % len(SELLERS)], "company": company,
+                "shop_type": shop_type, "items": [],
+                "total_with_vat": round(rnd.uniform(1, 200), 2)}
+        name = ts.strftime("%Y-%m")
+        f = files.get(name)
+        if f is None:
+            f = files[name] = open(folder / f"{name}.jsonl", "w", encoding="utf-8")
+        f.write(json.dumps(sale) + "\n")
+    for f in files.values():
+        f.close()
+
+
+def _dict_loop(storage: JsonStorage, allowed):
+    """O que ``monthly_totals``/``totals_by_seller`` faziam antes das colunas."""
+    months, sellers = {}, {}
+    for s in storage.iter_sales():
+        seller = s.get("seller", "?")
+        if seller not in allowed:
+            continue
+        total = float(s.get("total_with_vat", 0.0))
+        key = datetime.fromisoformat(s["timestamp"]).strftime("%Y-%m")
+        months[key] = months.get(key, 0.0) + total
+        sellers[seller] = sellers.get(seller, 0.0) + total
+    return months, sellers
+
+
+def _timed(fn):
+    t0 = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - t0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sales", type=int, default=200_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        base = Path(tmp)
+        _write_sales(base / "sales", args.sales)
+        storage = JsonStorage(base / "users.json", base / "products.json", base / "sales.json",
+                              durability="batch", multi_terminal=False)
+        allowed = SELLERS[:10]
+
+        print(f"{args.sales} vendas, NumPy: {'sim' if sales_columns.np is not None else 'não'}")
+        (months, sellers), loop = _timed(lambda: _dict_loop(storage, allowed))
+        print(f"{'ciclo sobre dicts (mês + vendedor)':<38} {loop * 1000:>10.1f} ms")
+
+        _, build = _timed(storage.columns)
+        print(f"{'colunas: primeira construção':<38} {build * 1000:>10.1f} ms")
+        columns = storage.columns()
+        columns.save()
+        path = columns.path
+        size = path.stat().st_size
+        _, load = _timed(lambda: SalesColumns(path).close())
+        print(f"{'colunas: abertura do .bin':<38} {load * 1000:>10.1f} ms  ({size / 1e6:.1f} MB)")
+
+        queries = {
+            "mês (10 vendedores)": lambda: storage.sales_totals("month", allowed_sellers=allowed),
+            "vendedor (10 vendedores)": lambda: storage.sales_totals("seller", allowed_sellers=allowed),
+            "mês, último trimestre": lambda: storage.sales_totals("month", since="2025-10-01"),
+            "hora do dia": lambda: storage.sales_totals("hour"),
+            "dia da semana, uma loja": lambda: storage.sales_totals(
+                "weekday", company="Loja", shop_type="FARMACIA"),
+        }
+        for label, query in queries.items():
+            _, seconds = _timed(query)
+            print(f"{'colunas: ' + label:<38} {seconds * 1000:>10.1f} ms")
+
+        by_month = storage.sales_totals("month", allowed_sellers=allowed)
+        by_seller = storage.sales_totals("seller", allowed_sellers=allowed)
+        same = (by_month.keys() == months.keys()
+                and all(abs(by_month[k] - months[k]) < 0.01 for k in months)
+                and all(abs(by_seller[k] - sellers[k]) < 0.01 for k in sellers))
+        print(f"resultados iguais ao ciclo: {'sim' if same else 'NÃO'}")
+        storage.close()
+
+
+if __name__ == "__main__":
+    main()
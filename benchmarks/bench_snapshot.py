@@ -0,0 +1,78 @@
+"""Arranque a frio: JSON vs. imagem binária (``snapshot.bin``).
+
+    python -m benchmarks.bench_snapshot [--products 100000]
+
+Cria um catálogo de ``--products`` produtos e 2000 utilizadores e mede o
+que o primeiro login e a primeira página de vendas fazem: abrir o backend,
+procurar o utilizador e listar os produtos da loja. Compara sem imagem
+(``json.loads`` dos ficheiros) e com a imagem gravada no fecho anterior.
+"""
+import argparse
+import json
+import tempfile
+import time
+from pathlib import Path
+
+from models.file_cache import FILE_CACHE
+from models.json_storage import JsonStorage
+
+SHOPS = ("RESTAURACAO", "FARMACIA", "OFICINA", "OUTRO")
+REPEAT = 3
+
+
+def _write_data(base: Path, n_products: int, n_users: int = 2000) -> None:
+    (base / "products.json").write_text(json.dumps([
+        {"code": f"P{i:06d}", "name": f"Produto {i}", "price_no_vat": 1.0 + i % 50,
+         "ptype": f"Tipo {i % 12}", "image_path": "", "stock": i % 100, "min_stock": 5,
+         "company": "Loja", "shop_type": SHOPS[i % len(SHOPS)]}
+        for i in range(n_products)], indent=2), encoding="utf-8")
+    (base / "users.json").write_text(json.dumps([
+        {"username": f"u{i}", "email": f"u{i}@x", "password": "x",
+         "role": "VENDOR", "company": "Loja", "shop_type": SHOPS[i % len(SHOPS)],
+         "photo_path": ""} for i in range(n_users)], indent=2), encoding="utf-8")
+
+
+def _cold_start(base: Path, snapshot: bool):
+    FILE_CACHE.invalidate()
+    t0 = time.perf_counter()
+    storage = JsonStorage(base / "users.json", base / "products.json", base / "sales.json",
+                          multi_terminal=False, snapshot=snapshot)
+    user = storage.find_user("u1")
+    products = storage.shop_products(user["company"], user["shop_type"])
+    seconds = time.perf_counter() - t0
+    report = storage.snapshot_report()
+    storage._snapshot = None  # não regravar a imagem ao fechar
+    storage.close()
+    return seconds, len(products), report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--products", type=int, default=100_000)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        base = Path(tmp)
+        _write_data(base, args.products)
+        storage = JsonStorage(base / "users.json", base / "products.json", base / "sales.json",
+                              multi_terminal=False)
+        t0 = time.perf_counter()
+        storage.save_snapshot()
+        write = time.perf_counter() - t0
+        storage._snapshot = None
+        storage.close()
+        size = (base / "snapshot.bin").stat().st_size
+        json_size = sum((base / f).stat().st_size for f in ("users.json", "products.json"))
+
+        json_time = min(_cold_start(base, False)[0] for _ in range(REPEAT))
+        runs = [_cold_start(base, True) for _ in range(REPEAT)]
+        snap_time = min(r[0] for r in runs)
+        report = runs[0][2]
+        print(f"{args.products} produtos: JSON {json_size / 1e6:.1f} MB, imagem {size / 1e6:.1f} MB "
+              f"(gravada em {write * 1000:.0f} ms)")
+        print(f"arranque + login + produtos da loja: JSON {json_time * 1000:.0f} ms | "
+              f"imagem {snap_time * 1000:.0f} ms (leitura da imagem "
+              f"{report['seconds'] * 1000:.0f} ms) -> {json_time / snap_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Várias caixas na mesma pasta data/: vendas sem perdas e débito total.
+
+    python -m benchmarks.bench_terminals
+
+Lança 1 a 4 processos ("caixas") que fazem checkouts em simultâneo sobre o
+mesmo catálogo e mede quantos checkouts por segundo o conjunto consegue.
+No fim confirma que nenhuma venda nem nenhum desconto de stock se perdeu.
+"""
+import multiprocessing
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict
+
+from models.file_cache import FILE_CACHE
+from models.json_storage import JsonStorage
+from models.product import Product
+
+TERMINALS = (1, 2, 3, 4)
+CHECKOUTS = 100
+INITIAL_STOCK = 1_000_000
+
+
+def open_storage(base: Path) -> JsonStorage:
+    return JsonStorage(base / "users.json", base / "products.json", base / "sales.json")
+
+
+def prepare(base: Path, n_products: int = 1_000) -> None:
+    storage = open_storage(base)
+    storage.add_products([
+        Product(code=f"P{i:04d}", name=f"Produto {i}", price_no_vat=1.0, ptype="x",
+                stock=INITIAL_STOCK, company="Loja", shop_type="OUTRO").to_dict()
+        for i in range(n_products)
+    ])
+    storage.close()
+    FILE_CACHE.invalidate()
+
+
+def run_till(base: str, till: int, checkouts: int, restock: bool = False) -> None:
+    """Uma caixa: ``checkouts`` vendas de 1 unidade de P0000 (ou reposições de +1)."""
+    storage = open_storage(Path(base))
+    for i in range(checkouts):
+        if restock:
+            storage.adjust_stock("P0000", 1, "Loja", "OUTRO")
+            continue
+        storage.checkout({
+            "id": f"T{till}-{i}", "timestamp": datetime.now().isoformat(), "seller": f"caixa{till}",
+            "company": "Loja", "shop_type": "OUTRO", "total_with_vat": 1.23,
+            "items": [{"code": "P0000", "name": "Produto 0", "qty": 1, "price_no_vat": 1.0}],
+        }, "Loja", "OUTRO")
+    storage.close()
+
+
+def run_terminals(base: Path, terminals: int, checkouts: int, restockers: int = 0) -> float:
+    """Corre as caixas em paralelo e devolve o tempo total (s)."""
+    ctx = multiprocessing.get_context("spawn")
+    procs = [ctx.Process(target=run_till, args=(str(base), t, checkouts)) for t in range(terminals)]
+    procs += [ctx.Process(target=run_till, args=(str(base), 100 + r, checkouts, True))
+              for r in range(restockers)]
+    t0 = time.perf_counter()
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join()
+    elapsed = time.perf_counter() - t0
+    if any(p.exitcode != 0 for p in procs):
+        raise RuntimeError("Uma das caixas terminou com erro.")
+    return elapsed
+
+
+def check(base: Path) -> Dict[str, float]:
+    """Estado final visto por um processo novo."""
+    FILE_CACHE.invalidate()
+    storage = open_storage(base)
+    try:
+        return {
+            "stock": storage.find_product("P0000", "Loja", "OUTRO")["stock"],
+            "sales": sum(1 for _ in storage.iter_sales()),
+            "rollup_count": storage.rollups.data["count"],
+            "month_total": sum(storage.shop_monthly_totals("Loja", "OUTRO").values()),
+        }
+    finally:
+        storage.close()
+
+
+def main() -> None:
+    print(f"{'caixas':>7} {'checkouts':>10} {'tempo (s)':>10} {'checkouts/s':>12} {'perdidos':>9}")
+    for n in TERMINALS:
+        with tempfile.TemporaryDirectory() as tmp:
+            base = Path(tmp)
+            prepare(base)
+            elapsed = run_terminals(base, n, CHECKOUTS)
+            state = check(base)
+            total = n * CHECKOUTS
+            lost = (total - state["sales"]) + (state["stock"] - (INITIAL_STOCK - total))
+            print(f"{n:>7} {total:>10} {elapsed:>10.2f} {total / elapsed:>12.1f} {lost:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,26 +1,72 @@
 import sys
+import time
+
+from models.startup_trace import StartupTrace
+# Antes dos restantes imports, para também medir o PyQt5 (ver --startup-trace)
+TRACE = StartupTrace.from_argv(sys.argv)
+
 from pathlib import Path
 from PyQt5.QtWidgets import QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QStackedWidget
 from PyQt5.QtGui import QIcon
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QTimer, pyqtSignal
 
+from models.config import load_config
 from models.system_manager import SystemManager
 from pages.login_page import LoginPage
 from pages.register_page import RegisterPage
-from pages.management_page import ManagementPage
-from pages.sales_page import SalesPage
 from pages.recover_password_page import RecoverPasswordPage
-from pages.inventory_page import InventoryPage
-from pages.profile_page import ProfilePage
-from pages.dashboard_page import DashboardPage
+from pages.lazy_page import LazyPage
+
+# As páginas da área principal (e o matplotlib do dashboard) só são
+# importadas quando são abertas pela primeira vez
+
+
+def _management_page(sm, user):
+    from pages.management_page import ManagementPage
+    return ManagementPage(sm, user)
+
+
+def _sales_page(sm, user):
+    from pages.sales_page import SalesPage
+    return SalesPage(sm, user)
+
+
+def _inventory_page(sm, user):
+    from pages.inventory_page import InventoryPage
+    return InventoryPage(sm, user)
+
+
+def _dashboard_page(sm, user):
+    from pages.dashboard_page import DashboardPage
+    return DashboardPage(sm, user)
+
+
+def _profile_page(sm, user, on_logout):
+    from pages.profile_page import ProfilePage
+    return ProfilePage(sm, user, on_logout)
+
 
 class MainArea(QWidget):
-    """Zona principal após login, com navegação no topo."""
-    def __init__(self, system_manager, current_user: dict, on_logout):
+    """Zona principal após login, com navegação no topo.
+
+    As páginas só são criadas quando o separador é aberto pela primeira vez
+    (ver LazyPage); com ``prewarm_delay_ms`` as restantes são criadas uma a uma
+    em segundo plano depois da primeira página estar no ecrã.
+    """
+    # Título da primeira página mostrada e tempo que levou a criar
+    first_paint = pyqtSignal(str, float)
+
+    def __init__(self, system_manager, current_user: dict, on_logout, prewarm_delay_ms=None):
         super().__init__()
         self.sm = system_manager
         self.user = current_user
         self.on_logout = on_logout
+        self.prewarm_delay_ms = prewarm_delay_ms
+        self._painted = False
+        # Dono do timer: se a área for destruída (logout) o pré-aquecimento para
+        self._prewarm_timer = QTimer(self)
+        self._prewarm_timer.setSingleShot(True)
+        self._prewarm_timer.timeout.connect(self._prewarm_next)
         self._build()
 
     def _build(self):
@@ -50,76 +96,92 @@ class MainArea(QWidget):
         self.stack = QStackedWidget()
         layout.addWidget(self.stack, 1)
 
-        # --- CRIAÇÃO DAS PÁGINAS ---
+        # --- PÁGINAS (criadas só quando abertas) ---
         # Passamos self.user para todas as páginas que precisam de saber quem está logado
-        
-        self.page_manage = ManagementPage(self.sm, self.user) if self.user.get("role") == "ADMIN" else None
-        self.page_sales = SalesPage(self.sm, self.user)
-        self.page_inventory = InventoryPage(self.sm, self.user) if self.user.get("role") == "ADMIN" else None
-        
-        # CORREÇÃO AQUI: Adicionado self.user ao DashboardPage
-        self.page_dashboard = DashboardPage(self.sm, self.user) if self.user.get("role") == "ADMIN" else None
-        
-        self.page_profile = ProfilePage(self.sm, self.user, self.on_logout)
-
-        if self.page_manage:
-            self.stack.addWidget(self.page_manage)
-        self.stack.addWidget(self.page_sales)
-        if self.page_inventory:
-            self.stack.addWidget(self.page_inventory)
-        if self.page_dashboard:
-            self.stack.addWidget(self.page_dashboard)
-        self.stack.addWidget(self.page_profile)
-
-        # --- Lógica de Índices para Navegação ---
-        idx = 0
-        self.idx_manage = idx if self.page_manage else None
-        if self.page_manage:
-            idx += 1
-        self.idx_sales = idx
-        idx += 1
-        self.idx_inventory = idx if self.page_inventory else None
-        if self.page_inventory:
-            idx += 1
-        self.idx_dashboard = idx if self.page_dashboard else None
-        if self.page_dashboard:
-            idx += 1
-        self.idx_profile = idx
-
-        # Ligações de navegação interna (ex: botão na gestão que leva às vendas)
-        if self.page_manage:
-            self.page_manage.goto_sales.connect(lambda: self.stack.setCurrentIndex(self.idx_sales))
-            self.page_manage.goto_stats.connect(lambda: self.stack.setCurrentIndex(self.idx_dashboard))
-        
-        if self.page_sales:
-             self.page_sales.back_to_manage.connect(lambda: self.stack.setCurrentIndex(self.idx_manage) if self.idx_manage is not None else None)
+        is_admin = self.user.get("role") == "ADMIN"
+        specs = (
+            ("manage", "Gestão", lambda: _management_page(self.sm, self.user), is_admin),
+            ("sales", "Vendas", lambda: _sales_page(self.sm, self.user), True),
+            ("inventory", "Inventário", lambda: _inventory_page(self.sm, self.user), is_admin),
+            ("dashboard", "Dashboard", lambda: _dashboard_page(self.sm, self.user), is_admin),
+            ("profile", "Perfil", lambda: _profile_page(self.sm, self.user, self.on_logout), True),
+        )
+        self.pages = {}
+        for key, title, factory, enabled in specs:
+            if not enabled:
+                continue
+            lazy = LazyPage(title, factory)
+            lazy.built.connect(lambda page, seconds, key=key: self._wire_page(key, page))
+            lazy.first_paint.connect(lambda lazy=lazy: self._on_first_paint(lazy))
+            self.stack.addWidget(lazy)
+            self.pages[key] = lazy
 
         # Ligações dos botões do menu superior
-        self.btn_manage.clicked.connect(lambda: self.stack.setCurrentIndex(self.idx_manage) if self.idx_manage is not None else None)
-        self.btn_sales.clicked.connect(lambda: self.stack.setCurrentIndex(self.idx_sales))
-        self.btn_inventory.clicked.connect(lambda: self.stack.setCurrentIndex(self.idx_inventory) if self.idx_inventory is not None else None)
-        self.btn_dashboard.clicked.connect(lambda: self.stack.setCurrentIndex(self.idx_dashboard) if self.idx_dashboard is not None else None)
-        self.btn_profile.clicked.connect(lambda: self.stack.setCurrentIndex(self.idx_profile))
+        self.btn_manage.clicked.connect(lambda: self.show_page("manage"))
+        self.btn_sales.clicked.connect(lambda: self.show_page("sales"))
+        self.btn_inventory.clicked.connect(lambda: self.show_page("inventory"))
+        self.btn_dashboard.clicked.connect(lambda: self.show_page("dashboard"))
+        self.btn_profile.clicked.connect(lambda: self.show_page("profile"))
         self.btn_logout.clicked.connect(self.on_logout)
 
         # Esconder botões de Admin para Vendedores
-        if self.user.get("role") != "ADMIN":
+        if not is_admin:
             self.btn_manage.hide()
             self.btn_inventory.hide()
             self.btn_dashboard.hide()
-            self.stack.setCurrentIndex(self.idx_sales)
+            self.stack.setCurrentWidget(self.pages["sales"])
         else:
             self.btn_manage.show()
             self.btn_inventory.show()
             self.btn_dashboard.show()
-            # Admin começa na gestão (ou vendas se gestão falhar)
-            self.stack.setCurrentIndex(self.idx_manage if self.idx_manage is not None else self.idx_sales)
+            # Admin começa na gestão
+            self.stack.setCurrentWidget(self.pages["manage"])
+
+    def show_page(self, key: str):
+        """Mostra a página ``key``, criando-a se ainda não existir (ignora as que não há)."""
+        lazy = self.pages.get(key)
+        if lazy is None:
+            return
+        lazy.ensure()
+        self.stack.setCurrentWidget(lazy)
+
+    def _wire_page(self, key: str, page):
+        # Ligações de navegação interna (ex: botão na gestão que leva às vendas)
+        if key == "manage":
+            page.goto_sales.connect(lambda: self.show_page("sales"))
+            page.goto_stats.connect(lambda: self.show_page("dashboard"))
+        elif key == "sales":
+            page.back_to_manage.connect(lambda: self.show_page("manage"))
+
+    def _on_first_paint(self, lazy: LazyPage):
+        if self._painted:
+            return
+        self._painted = True
+        self.first_paint.emit(lazy.title, lazy.build_seconds)
+        if self.prewarm_delay_ms is not None:
+            self._prewarm_timer.start(int(self.prewarm_delay_ms))
+
+    def _prewarm_next(self):
+        """Cria a próxima página em falta; uma por vez, para a interface continuar a responder."""
+        for lazy in self.pages.values():
+            if lazy.page is None:
+                lazy.ensure()
+                self._prewarm_timer.start(0)
+                return
 
 
 class POSMainWindow(QMainWindow):
     def __init__(self):
         super().__init__()
-        self.sm = SystemManager()
+        config = load_config()
+        self.config = config
+        self.sm = SystemManager.from_config(config)
+        TRACE.mark("configuração e dados (SystemManager)")
+        TRACE.extra["imagem de arranque"] = self.sm.snapshot_report()
+        # Atualiza a imagem binária de arranque de vez em quando (só grava se algo mudou)
+        self._snapshot_timer = QTimer(self)
+        self._snapshot_timer.timeout.connect(self.sm.save_snapshot)
+        self._snapshot_timer.start(int(config.get("snapshot_interval_s", 300) * 1000))
         self.current_user = None
         self.central = QStackedWidget()
         self.setCentralWidget(self.central)
@@ -138,8 +200,10 @@ class POSMainWindow(QMainWindow):
         self.login.goto_recover.connect(lambda: self.central.setCurrentWidget(self.recover))
         self.login.login_success.connect(self._on_login_success)
         self.recover.back.connect(lambda: self.central.setCurrentWidget(self.login))
+        TRACE.mark("páginas de login/registo/recuperação")
 
         self._apply_theme_accent("#ff5555")
+        TRACE.mark("stylesheet")
 
     def _apply_theme_accent(self, color_hex: str):
         style_path = Path(__file__).resolve().parent / "style" / "style.qss"
@@ -157,6 +221,7 @@ QPushButton:hover {{
         self.setStyleSheet(base_style + "\n" + extra)
 
     def _on_login_success(self, user: dict):
+        self._login_t0 = time.perf_counter()
         self.current_user = user
         shop_type = user.get("shop_type", "OUTRO")
         # Cores temáticas por loja
@@ -169,11 +234,25 @@ QPushButton:hover {{
         self._apply_theme_accent(accents.get(shop_type, "#ff5555"))
 
         # Cria a área principal passando o utilizador logado
-        self.main_area = MainArea(self.sm, user, on_logout=self._logout)
+        self.main_area = MainArea(self.sm, user, on_logout=self._logout,
+                                  prewarm_delay_ms=self.config.get("prewarm_delay_ms"))
+        self.main_area.first_paint.connect(self._log_first_paint)
         if self.central.indexOf(self.main_area) == -1:
             self.central.addWidget(self.main_area)
         self.central.setCurrentWidget(self.main_area)
 
+    def _log_first_paint(self, title: str, build_seconds: float):
+        seconds = time.perf_counter() - self._login_t0
+        print(f"Login -> primeira página ({title}) no ecrã: {seconds * 1000:.0f} ms "
+              f"(criação da página: {build_seconds * 1000:.0f} ms)")
+        TRACE.mark(f"primeira página após login ({title}), {seconds * 1000:.0f} ms após o login")
+        TRACE.write()
+
+    def closeEvent(self, event):
+        # Termina as faturas em fila e fecha a série de faturação desta caixa
+        self.sm.close()
+        super().closeEvent(event)
+
     def _logout(self):
         from PyQt5.QtWidgets import QMessageBox
         reply = QMessageBox.question(self, "Terminar sessão", "Deseja terminar sessão?")
@@ -190,8 +269,17 @@ QPushButton:hover {{
         self.central.setCurrentWidget(self.login)
 
 
+def _startup_done():
+    TRACE.mark("login visível")
+    path = TRACE.write()
+    if path:
+        print(f"Perfil do arranque gravado em {path}")
+
+
 def main():
+    TRACE.mark("imports")
     app = QApplication(sys.argv)
+    TRACE.mark("QApplication")
     w = POSMainWindow()
     w.setWindowTitle("Sistema POS (PyQt5)")
     icon_path = Path(__file__).resolve().parent / "icons" / "product.png"
@@ -199,6 +287,9 @@ def main():
         w.setWindowIcon(QIcon(str(icon_path)))
     w.resize(1100, 700)
     w.show()
+    if TRACE.enabled:
+        # Corre na primeira volta do ciclo de eventos, depois de a janela ser desenhada
+        QTimer.singleShot(0, _startup_done)
     sys.exit(app.exec_())
 
 if __name__ == "__main__":
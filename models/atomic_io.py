@@ -0,0 +1,139 @@
+"""Escritas atómicas e commit em grupo para os ficheiros de dados.
+
+``atomic_write`` nunca deixa um ficheiro meio escrito: grava num ficheiro
+temporário na mesma pasta, faz fsync, troca-o com ``os.replace`` e faz fsync
+da pasta. Uma falha a meio deixa sempre a versão anterior intacta.
+
+``GroupCommitter`` decide *quando* se escreve, conforme o nível de
+durabilidade:
+
+- ``"always"``: cada alteração é gravada antes de a chamada retornar;
+- ``"batch"``: alterações dentro de uma janela curta (importações, edições
+  de stock em massa) são agrupadas numa só escrita no fim da janela;
+- ``"idle"``: só se grava quando não há alterações há ``window`` segundos.
+
+Em ``batch``/``idle`` o conteúdo pendente é sempre gravado em ``flush()``,
+no ``close()`` do SystemManager e à saída do processo.
+"""
+import atexit
+import os
+import threading
+import weakref
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple
+
+DURABILITY_LEVELS = ("always", "batch", "idle")
+
+
+def fsync_dir(path: Path) -> None:
+    """Garante que a entrada do ficheiro na pasta chegou ao disco (POSIX)."""
+    if os.name != "posix":
+        return
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def atomic_write(path: Path, data: bytes, fsync: bool = True) -> None:
+    """Substitui ``path`` por ``data`` de forma atómica."""
+    path = Path(path)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with open(tmp, "wb") as f:
+            f.write(data)
+            f.flush()
+            if fsync:
+                os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            tmp.unlink()
+        except OSError:
+            pass
+        raise
+    if fsync:
+        fsync_dir(path.parent)
+
+
+_committers: "weakref.WeakSet[GroupCommitter]" = weakref.WeakSet()
+
+
+@atexit.register
+def _flush_all() -> None:
+    for committer in list(_committers):
+        committer.flush()
+
+
+class GroupCommitter:
+    """Agrupa escritas para o mesmo ficheiro segundo o nível de durabilidade."""
+
+    def __init__(self, durability: str = "always", window: float = 0.05) -> None:
+        if durability not in DURABILITY_LEVELS:
+            raise ValueError(f"Nível de durabilidade inválido: {durability}")
+        self.durability = durability
+        self.window = window
+        self._lock = threading.Lock()
+        self._pending: Dict[Path, Tuple[Callable[[], bytes], Optional[Callable[[], None]]]] = {}
+        self._timer: Optional[threading.Timer] = None
+        self.flushes = 0
+        # Chamado no fim de cada flush() (ex.: largar o lock entre processos)
+        self.on_flush: Optional[Callable[[], None]] = None
+        _committers.add(self)
+
+    def write(self, path: Path, produce: Callable[[], bytes],
+              on_done: Optional[Callable[[], None]] = None) -> None:
+        """Pede a escrita de ``path``; ``produce()`` gera os bytes na altura de gravar.
+
+        ``on_done()`` é chamado depois de o ficheiro estar em disco, desde que
+        não tenha entretanto chegado outra escrita para o mesmo ficheiro.
+        """
+        if self.durability == "always":
+            atomic_write(path, produce())
+            self.flushes += 1
+            if on_done:
+                on_done()
+            return
+        with self._lock:
+            self._pending[Path(path)] = (produce, on_done)
+            if self.durability == "idle" and self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if self._timer is None:
+                self._timer = threading.Timer(self.window, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def pending(self, path: Path) -> bool:
+        with self._lock:
+            return Path(path) in self._pending
+
+    def has_pending(self) -> bool:
+        with self._lock:
+            return bool(self._pending)
+
+    def flush(self) -> None:
+        """Grava já tudo o que estiver pendente."""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            batch = list(self._pending.items())
+            self._pending.clear()
+        for path, (produce, on_done) in batch:
+            try:
+                atomic_write(path, produce())
+            except Exception as e:
+                print(f"Erro ao gravar {path}: {e}")
+                with self._lock:
+                    # Voltar a tentar no próximo flush (se não houver versão mais nova)
+                    self._pending.setdefault(path, (produce, on_done))
+                continue
+            self.flushes += 1
+            with self._lock:
+                superseded = path in self._pending
+            if on_done and not superseded:
+                on_done()
+        if self.on_flush is not None:
+            self.on_flush()
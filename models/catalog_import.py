@@ -0,0 +1,134 @@
+"""Importação de catálogos de produtos (CSV ou JSON Lines) em massa.
+
+O ficheiro é lido linha a linha e cada linha é validada numa única
+passagem contra um conjunto de chaves (empresa, loja, código): as que já
+existem no catálogo e as que já apareceram no próprio ficheiro. As linhas
+válidas são depois gravadas todas de uma vez pelo backend.
+
+Colunas reconhecidas: code, name, price_no_vat, ptype, image_path, stock,
+min_stock, company, shop_type (no CSV o separador pode ser ``;`` ou ``,``).
+"""
+import csv
+import json
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from .product import Product
+from .product_index import norm
+
+Row = Tuple[int, Dict]
+Progress = Optional[Callable[[int], None]]
+
+# De quantas em quantas linhas se chama o callback de progresso
+PROGRESS_EVERY = 500
+
+
+class ImportReport:
+    """Resultado de uma importação: produtos gravados e erros por linha."""
+
+    def __init__(self) -> None:
+        self.imported: List[Dict] = []
+        self.errors: List[Tuple[int, str]] = []
+        self.rows = 0
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors
+
+    def summary(self) -> str:
+        return f"{len(self.imported)} produtos importados, {len(self.errors)} linhas com erros."
+
+
+def read_catalog(path: Path) -> Iterator[Row]:
+    """Linhas do ficheiro como (número da linha, dict), sem o carregar inteiro."""
+    path = Path(path)
+    with path.open(encoding="utf-8-sig", newline="") as f:
+        if path.suffix.lower() in (".jsonl", ".json"):
+            for n, line in enumerate(f, start=1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    row = json.loads(line)
+                except ValueError as e:
+                    row = {"__error__": f"JSON inválido ({e.msg})."}
+                yield n, row if isinstance(row, dict) else {"__error__": "Linha não é um objeto JSON."}
+            return
+        header = f.readline()
+        delimiter = ";" if header.count(";") >= header.count(",") else ","
+        fields = [h.strip() for h in next(csv.reader([header], delimiter=delimiter), [])]
+        # Linha 1 é o cabeçalho
+        for n, values in enumerate(csv.reader(f, delimiter=delimiter), start=2):
+            if not any(v.strip() for v in values):
+                continue
+            yield n, dict(zip(fields, values))
+
+
+def _number(value, kind, field: str):
+    if value is None or (isinstance(value, str) and not value.strip()):
+        return kind(0)
+    if isinstance(value, str):
+        value = value.strip().replace(",", ".")
+    try:
+        result = kind(float(value)) if kind is int else kind(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"Valor inválido em '{field}': {value!r}.")
+    if result < 0:
+        raise ValueError(f"'{field}' não pode ser negativo.")
+    return result
+
+
+def to_product(row: Dict, company: Optional[str] = None,
+               shop_type: Optional[str] = None) -> Product:
+    """Converte uma linha num Product; levanta ValueError com o motivo."""
+    if "__error__" in row:
+        raise ValueError(row["__error__"])
+    code = str(row.get("code") or "").strip()
+    name = str(row.get("name") or "").strip()
+    if not code:
+        raise ValueError("Falta o código.")
+    if not name:
+        raise ValueError("Falta a designação.")
+    return Product(
+        code=code,
+        name=name,
+        price_no_vat=_number(row.get("price_no_vat"), float, "price_no_vat"),
+        ptype=str(row.get("ptype") or "Outro").strip(),
+        image_path=str(row.get("image_path") or "").strip(),
+        stock=_number(row.get("stock"), int, "stock"),
+        min_stock=_number(row.get("min_stock"), int, "min_stock"),
+        company=company if company is not None else str(row.get("company") or "").strip(),
+        shop_type=shop_type if shop_type is not None else str(row.get("shop_type") or "").strip(),
+    )
+
+
+def validate(rows: Iterable[Row], existing: Callable[[str, str], Set[str]],
+             company: Optional[str] = None, shop_type: Optional[str] = None,
+             progress: Progress = None) -> ImportReport:
+    """Valida as linhas numa só passagem e devolve o relatório (ainda sem gravar).
+
+    ``existing(empresa, loja)`` devolve os códigos (normalizados) já
+    existentes nessa loja; é chamado uma vez por loja.
+    """
+    report = ImportReport()
+    taken: Dict[Tuple[str, str], Set[str]] = {}
+    for n, row in rows:
+        report.rows += 1
+        if progress and report.rows % PROGRESS_EVERY == 0:
+            progress(report.rows)
+        try:
+            product = to_product(row, company, shop_type)
+        except ValueError as e:
+            report.errors.append((n, str(e)))
+            continue
+        shop = (norm(product.company), norm(product.shop_type))
+        if shop not in taken:
+            taken[shop] = set(existing(product.company, product.shop_type))
+        if norm(product.code) in taken[shop]:
+            report.errors.append((n, f"Código '{product.code}' duplicado nesta loja."))
+            continue
+        taken[shop].add(norm(product.code))
+        report.imported.append(product.to_dict())
+    if progress:
+        progress(report.rows)
+    return report
@@ -0,0 +1,57 @@
+"""Configuração opcional do POS (data/config.json)."""
+import json
+from pathlib import Path
+from typing import Dict
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+CONFIG_PATH = ROOT_DIR / "data" / "config.json"
+
+DEFAULTS: Dict = {
+    # "json" (ficheiros em data/), "sqlite" ou "remote" (servidor de armazenamento)
+    "storage": "json",
+    "sqlite_path": "data/pos.db",
+    # Modo servidor: endereço (unix:caminho ou tcp:host:porta) e backend do servidor
+    "server_address": "unix:data/pos.sock",
+    "server_storage": "json",
+    # Backend JSON: "always" (cada escrita), "batch" ou "idle" (agrupadas)
+    "durability": "always",
+    "commit_window_ms": 50,
+    # Várias caixas na mesma pasta data/: lock entre processos nas alterações.
+    # Em batch/idle a caixa com escritas pendentes fica com o lock até ao fim
+    # da janela (as outras esperam no máximo commit_window_ms).
+    "multi_terminal": True,
+    # Série de faturação desta caixa (None: a primeira livre neste computador).
+    # Com caixas em computadores diferentes, cada uma deve ter a sua.
+    "terminal": None,
+    # Números de fatura reservados de cada vez (uma escrita em disco por bloco)
+    "invoice_block": 100,
+    # Gerar o HTML das faturas em segundo plano (o checkout não espera por ele)
+    "background_render": True,
+    # Backend JSON: imagem binária (data/snapshot.bin) para arrancar sem json.loads
+    "snapshot": True,
+    "snapshot_interval_s": 300,
+    # Hash das passwords: "pbkdf2_sha256" (custo = iterações) ou "scrypt" (custo = n).
+    # None usa o custo por omissão de models/passwords.py
+    "password_scheme": "pbkdf2_sha256",
+    "password_cost": None,
+    # Logins verificados em paralelo (threads)
+    "login_workers": 2,
+    # Páginas da área principal criadas em segundo plano depois da primeira
+    # estar no ecrã (ms de espera); None cria cada uma só quando é aberta
+    "prewarm_delay_ms": 2000,
+}
+
+
+def load_config(path: Path = CONFIG_PATH) -> Dict:
+    """Lê a configuração, completando com os valores por omissão.
+
+    O ficheiro é opcional; se não existir ou for inválido usam-se os DEFAULTS.
+    """
+    config = dict(DEFAULTS)
+    try:
+        data = json.loads(Path(path).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return config
+    if isinstance(data, dict):
+        config.update(data)
+    return config
@@ -0,0 +1,196 @@
+"""Cache de leitura partilhada pelo processo para os ficheiros de dados.
+
+Cada ficheiro é lido e interpretado uma única vez. Nas leituras seguintes
+basta um ``os.stat``: se (inode, mtime_ns, tamanho) não mudou, devolve-se o
+que já está em memória. As escritas feitas pelo SystemManager atualizam a
+entrada diretamente, sem voltar a ler o disco.
+"""
+import itertools
+import os
+import threading
+from pathlib import Path
+from types import MappingProxyType
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+Stamp = Tuple[int, int, int]
+
+
+def file_stamp(path: Path) -> Optional[Stamp]:
+    """Assinatura barata de um ficheiro: (inode, mtime_ns, tamanho)."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+
+class _Entry:
+    __slots__ = ("data", "stamp", "offset", "generation", "view", "pinned")
+
+    def __init__(self, data: list, stamp: Optional[Stamp], offset: int, generation: int,
+                 pinned: bool = False) -> None:
+        self.data = data
+        self.stamp = stamp
+        self.offset = offset          # bytes já lidos (usado nos diários .jsonl)
+        self.generation = generation
+        self.view: Optional[List[MappingProxyType]] = None
+        self.pinned = pinned          # há uma escrita pendente: a memória manda
+
+
+class FileCache:
+    """Cache de listas de registos indexada pelo caminho do ficheiro."""
+
+    def __init__(self) -> None:
+        self._entries: Dict[Path, _Entry] = {}
+        self._lock = threading.RLock()
+        # Gerações nunca se repetem, mesmo depois de invalidar uma entrada
+        self._generations = itertools.count(1)
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(path: Path) -> Path:
+        return Path(os.path.abspath(path))
+
+    def get(
+        self,
+        path: Path,
+        loader: Callable[[Path], Tuple[list, int]],
+        extend: Optional[Callable[[Path, list, int], int]] = None,
+    ) -> list:
+        """Devolve os registos do ficheiro (lista interna, não alterar fora do backend).
+
+        ``loader(path)`` lê tudo e devolve ``(registos, offset)``. Se ``extend``
+        for dado e o ficheiro apenas cresceu (mesmo inode), chama-se
+        ``extend(path, registos, offset)`` para ler só o que foi acrescentado;
+        deve devolver o novo offset.
+        """
+        key = self._key(path)
+        with self._lock:
+            stamp = file_stamp(key)
+            entry = self._entries.get(key)
+            if entry is not None and (entry.pinned or entry.stamp == stamp):
+                self.hits += 1
+                return entry.data
+            self.misses += 1
+            if (entry is not None and extend is not None and stamp is not None
+                    and entry.stamp is not None and entry.stamp[0] == stamp[0]
+                    and stamp[2] >= entry.offset):
+                before = len(entry.data)
+                entry.offset = extend(key, entry.data, entry.offset)
+                entry.stamp = stamp
+                if len(entry.data) != before:
+                    entry.generation = next(self._generations)
+                    entry.view = None
+                return entry.data
+            data, offset = loader(key)
+            self._entries[key] = _Entry(data, stamp, offset, next(self._generations))
+            return data
+
+    def peek(self, path: Path) -> Optional[list]:
+        """Registos em cache se ainda correspondem ao disco; nunca lê o ficheiro."""
+        key = self._key(path)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (entry.pinned or entry.stamp == file_stamp(key)):
+                self.hits += 1
+                return entry.data
+            return None
+
+    def view(self, path: Path, loader, extend=None) -> List[MappingProxyType]:
+        """Como ``get``, mas devolve vistas só de leitura de cada registo."""
+        with self._lock:
+            data = self.get(path, loader, extend)
+            entry = self._entries[self._key(path)]
+            if entry.view is None:
+                entry.view = [MappingProxyType(r) if isinstance(r, dict) else r for r in data]
+            return list(entry.view)
+
+    def put(self, path: Path, data: list, offset: int = 0, pinned: bool = False) -> None:
+        """Regista o conteúdo que acabámos de escrever (ou que vamos escrever).
+
+        Com ``pinned=True`` a escrita ainda está pendente: a entrada é usada
+        sem olhar para o disco até ``flushed`` ser chamado.
+        """
+        key = self._key(path)
+        with self._lock:
+            self._entries[key] = _Entry(data, file_stamp(key), offset,
+                                        next(self._generations), pinned)
+
+    def seed(self, path: Path, data: list, stamp: Stamp) -> bool:
+        """Usa ``data`` (ex.: da imagem binária) se o ficheiro ainda tem a assinatura ``stamp``."""
+        key = self._key(path)
+        with self._lock:
+            if key in self._entries or file_stamp(key) != tuple(stamp):
+                return False
+            self._entries[key] = _Entry(data, tuple(stamp), 0, next(self._generations))
+            return True
+
+    def durable(self, path: Path) -> Optional[Tuple[list, Stamp]]:
+        """Registos em cache e a assinatura do ficheiro, se forem iguais ao disco."""
+        key = self._key(path)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.pinned or entry.stamp != file_stamp(key):
+                return None
+            return entry.data, entry.stamp
+
+    def flushed(self, path: Path) -> None:
+        """A escrita pendente chegou ao disco: voltar a validar por stat."""
+        key = self._key(path)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry.stamp = file_stamp(key)
+                entry.pinned = False
+
+    def appended(self, path: Path, record: Any, before: Optional[Stamp]) -> None:
+        """Atualiza a entrada após acrescentarmos ``record`` a um diário.
+
+        Se o ficheiro mudou entretanto por outra via, a entrada é descartada e
+        a próxima leitura lê apenas o que falta.
+        """
+        key = self._key(path)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return
+            if entry.stamp != before:
+                # Mantém o inode para a próxima leitura continuar a partir do offset
+                entry.stamp = (entry.stamp[0], -1, -1) if entry.stamp else None
+                return
+            entry.data.append(record)
+            entry.stamp = file_stamp(key)
+            entry.offset = entry.stamp[2] if entry.stamp else 0
+            entry.generation = next(self._generations)
+            entry.view = None
+
+    def touched(self, path: Path) -> None:
+        """Os registos em memória foram alterados no próprio sítio e gravados."""
+        key = self._key(path)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry.stamp = file_stamp(key)
+                entry.generation = next(self._generations)
+                entry.view = None
+
+    def generation(self, path: Path) -> int:
+        """Contador que muda sempre que o conteúdo em cache muda."""
+        entry = self._entries.get(self._key(path))
+        return entry.generation if entry is not None else 0
+
+    def invalidate(self, path: Optional[Path] = None) -> None:
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(self._key(path), None)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
+
+
+# Instância única partilhada por todos os SystemManager do processo
+FILE_CACHE = FileCache()
@@ -0,0 +1,108 @@
+"""Lock entre processos (várias caixas na mesma pasta ``data/``).
+
+Usa ``fcntl.flock`` em POSIX e ``msvcrt.locking`` no Windows sobre um
+ficheiro ``.pos.lock``. O mesmo ficheiro guarda um número de versão que
+cada escritor incrementa antes de largar o lock: quem o encontrar
+diferente do último que viu sabe que os dados em memória estão
+desatualizados e tem de os reler antes de aplicar a sua alteração.
+"""
+import os
+import time
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+VERSION_SIZE = 20
+# No Windows bloqueia-se um byte depois da versão, para a poder ler sem lock
+_WIN_LOCK_OFFSET = 4096
+
+
+class InterProcessLock:
+    """Lock exclusivo e reentrante (por contagem) partilhado entre processos.
+
+    Não é thread-safe por si só: o backend só o usa com o seu RLock adquirido.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        self.depth = 0
+        self.waits = 0  # vezes que foi preciso esperar por outro processo
+
+    def _lock(self) -> None:
+        if fcntl is not None:
+            try:
+                fcntl.flock(self._fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                self.waits += 1
+                fcntl.flock(self._fd, fcntl.LOCK_EX)
+            return
+        os.lseek(self._fd, _WIN_LOCK_OFFSET, os.SEEK_SET)
+        while True:
+            try:
+                msvcrt.locking(self._fd, msvcrt.LK_NBLCK, 1)
+                return
+            except OSError:
+                self.waits += 1
+                time.sleep(0.001)
+
+    def try_acquire(self) -> bool:
+        """Tenta o lock sem esperar; False se outro processo o tiver."""
+        if self.depth > 0:
+            self.depth += 1
+            return True
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                os.lseek(self._fd, _WIN_LOCK_OFFSET, os.SEEK_SET)
+                msvcrt.locking(self._fd, msvcrt.LK_NBLCK, 1)
+        except OSError:
+            return False
+        self.depth = 1
+        return True
+
+    def _unlock(self) -> None:
+        if fcntl is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        else:
+            os.lseek(self._fd, _WIN_LOCK_OFFSET, os.SEEK_SET)
+            msvcrt.locking(self._fd, msvcrt.LK_UNLCK, 1)
+
+    def acquire(self) -> bool:
+        """Adquire o lock; devolve True se esta é a aquisição mais exterior."""
+        if self.depth == 0:
+            self._lock()
+        self.depth += 1
+        return self.depth == 1
+
+    def release(self) -> None:
+        self.depth -= 1
+        if self.depth == 0:
+            self._unlock()
+
+    def version(self) -> int:
+        """Versão atual dos dados partilhados (-1 se ilegível)."""
+        os.lseek(self._fd, 0, os.SEEK_SET)
+        raw = os.read(self._fd, VERSION_SIZE)
+        try:
+            return int(raw) if raw.strip() else 0
+        except ValueError:
+            return -1
+
+    def bump(self) -> int:
+        """Incrementa a versão (só com o lock adquirido)."""
+        version = max(self.version(), 0) + 1
+        os.lseek(self._fd, 0, os.SEEK_SET)
+        os.write(self._fd, b"%0*d" % (VERSION_SIZE, version))
+        return version
+
+    def close(self) -> None:
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
@@ -0,0 +1,231 @@
+"""Arquivo das faturas em HTML: ficheiros "pack" mensais em vez de um
+ficheiro por venda.
+
+Cada mês tem um ``AAAA-MM.pack`` (documentos comprimidos com zlib, um a
+seguir ao outro, só acrescentados) e um ``AAAA-MM.idx`` com uma linha
+``id<TAB>posição<TAB>tamanho`` por documento. O índice é lido para um
+dicionário, por isso ler uma fatura é uma consulta e uma leitura (por mmap)
+de ``tamanho`` bytes. Se uma fatura for gerada de novo, a última linha do
+índice é a que conta.
+
+A venda guarda em ``html_path`` a referência ``archive:AAAA-MM/<id>``;
+``view(id)`` extrai o HTML para ``view/<id>.html`` para o abrir no
+navegador (reimpressão). As vendas anteriores ao arquivo mantêm em
+``html_path`` o caminho do antigo ``INV*.html``, que deixa de existir
+depois de ``migrate``: esse valor nunca é aberto diretamente, as faturas
+são sempre procuradas pelo ``id`` no índice (qualquer que seja o pack).
+As vendas não são regravadas só para atualizar este campo.
+
+Várias caixas podem escrever no mesmo arquivo: as escritas são feitas com
+o lock ``.archive.lock``, que guarda também um número de versão; quando a
+versão muda, cada processo relê o fim dos índices antes da leitura seguinte.
+"""
+import mmap
+import os
+import re
+import threading
+import zlib
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple
+
+from .file_lock import InterProcessLock
+from .sales_partitions import partition_of
+
+PREFIX = "archive:"
+COMPRESS_LEVEL = 6
+
+# IDs antigos (um ficheiro por venda): INVAAAAMMDDhhmmss
+_LEGACY_ID = re.compile(r"^INV(\d{4})(\d{2})\d{2}")
+
+Location = Tuple[str, int, int]  # (pack, posição, tamanho)
+
+
+def is_reference(html_path: Optional[str]) -> bool:
+    return bool(html_path) and html_path.startswith(PREFIX)
+
+
+class InvoiceArchive:
+    """Packs mensais de faturas comprimidas com índice id -> (pack, posição, tamanho)."""
+
+    def __init__(self, folder: Path) -> None:
+        self.folder = Path(folder)
+        self.folder.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.RLock()
+        self._plock = InterProcessLock(self.folder / ".archive.lock")
+        self._index: Dict[str, Location] = {}
+        self._read: Dict[str, int] = {}  # bytes já lidos de cada .idx
+        self._maps: Dict[str, mmap.mmap] = {}
+        self._seen = None  # versão do arquivo refletida em _index
+
+    @staticmethod
+    def pack_of(invoice: Dict) -> str:
+        ref = invoice.get("html_path")
+        if is_reference(ref):
+            return ref[len(PREFIX):].split("/", 1)[0]
+        return partition_of(invoice)
+
+    def reference(self, invoice: Dict) -> str:
+        return f"{PREFIX}{self.pack_of(invoice)}/{invoice['id']}"
+
+    # ---------- Índice ----------
+    def _refresh(self) -> None:
+        """Lê as linhas novas dos índices (escritas por este ou outro processo)."""
+        for idx in self.folder.glob("*.idx"):
+            pack = idx.stem
+            start = self._read.get(pack, 0)
+            try:
+                if idx.stat().st_size <= start:
+                    continue
+                with open(idx, "rb") as f:
+                    f.seek(start)
+                    data = f.read()
+            except OSError:
+                continue
+            # Só linhas completas: uma escrita a meio fica para a próxima leitura
+            data = data[:data.rfind(b"\n") + 1]
+            self._read[pack] = start + len(data)
+            for line in data.decode("utf-8").splitlines():
+                try:
+                    invoice_id, offset, length = line.split("\t")
+                    self._index[invoice_id] = (pack, int(offset), int(length))
+                except ValueError:
+                    continue
+
+    def _check(self) -> None:
+        version = self._plock.version()
+        if version != self._seen:
+            self._refresh()
+            self._seen = version
+
+    def locate(self, invoice_id: str) -> Optional[Location]:
+        with self._lock:
+            self._check()
+            return self._index.get(invoice_id)
+
+    def __contains__(self, invoice_id: str) -> bool:
+        return self.locate(invoice_id) is not None
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._check()
+            return len(self._index)
+
+    # ---------- Escrita ----------
+    def put_many(self, docs: Iterable[Tuple[str, str, str]], fsync: bool = False) -> int:
+        """Acrescenta documentos ``(id, html, pack)``; devolve quantos foram gravados.
+
+        O documento é escrito no pack antes da linha do índice, por isso uma
+        falha a meio nunca deixa o índice a apontar para bytes em falta.
+        """
+        by_pack: Dict[str, list] = {}
+        for invoice_id, html, pack in docs:
+            by_pack.setdefault(pack, []).append(
+                (invoice_id, zlib.compress(html.encode("utf-8"), COMPRESS_LEVEL)))
+        count = 0
+        with self._lock:
+            self._plock.acquire()
+            try:
+                before = self._plock.version()
+                for pack, items in by_pack.items():
+                    with open(self.folder / f"{pack}.pack", "ab") as data, \
+                            open(self.folder / f"{pack}.idx", "ab") as idx:
+                        offset = data.seek(0, os.SEEK_END)
+                        lines = []
+                        for invoice_id, blob in items:
+                            data.write(blob)
+                            lines.append(f"{invoice_id}\t{offset}\t{len(blob)}\n")
+                            self._index[invoice_id] = (pack, offset, len(blob))
+                            offset += len(blob)
+                        data.flush()
+                        if fsync:
+                            os.fsync(data.fileno())
+                        idx.write("".join(lines).encode("utf-8"))
+                        idx.flush()
+                        if fsync:
+                            os.fsync(idx.fileno())
+                    count += len(items)
+                after = self._plock.bump()
+                # Sem escritas de outros processos pelo meio, _index já está em dia
+                if before == self._seen:
+                    self._seen = after
+            finally:
+                self._plock.release()
+        return count
+
+    def put(self, invoice: Dict, html: str) -> str:
+        """Guarda o HTML da fatura e devolve a referência para ``html_path``."""
+        self.put_many([(invoice["id"], html, self.pack_of(invoice))])
+        return self.reference(invoice)
+
+    # ---------- Leitura ----------
+    def _map(self, pack: str, end: int) -> mmap.mmap:
+        m = self._maps.get(pack)
+        if m is None or len(m) < end:
+            if m is not None:
+                m.close()
+            with open(self.folder / f"{pack}.pack", "rb") as f:
+                m = self._maps[pack] = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return m
+
+    def get(self, invoice_id: str) -> Optional[str]:
+        """HTML da fatura, ou None se não estiver no arquivo."""
+        with self._lock:
+            loc = self.locate(invoice_id)
+            if loc is None:
+                return None
+            pack, offset, length = loc
+            blob = self._map(pack, offset + length)[offset:offset + length]
+        return zlib.decompress(blob).decode("utf-8")
+
+    def view(self, invoice_id: str) -> Path:
+        """Extrai a fatura para ``view/<id>.html`` (para abrir/imprimir)."""
+        html = self.get(invoice_id)
+        if html is None:
+            raise KeyError(f"Fatura {invoice_id} não está no arquivo.")
+        path = self.folder / "view" / f"{invoice_id}.html"
+        path.parent.mkdir(exist_ok=True)
+        path.write_text(html, encoding="utf-8")
+        return path
+
+    # ---------- Migração ----------
+    def migrate(self, folder: Optional[Path] = None, batch: int = 500) -> int:
+        """Passa os ficheiros ``INV*.html`` soltos para os packs e apaga-os.
+
+        O mês vem do ID antigo (``INVAAAAMMDD...``) ou, se não der, da data do
+        ficheiro. Cada lote é gravado com fsync antes de os ficheiros serem
+        apagados. O ``html_path`` das vendas fica com o caminho antigo: a
+        reimpressão procura a fatura pelo id (ver o topo do módulo).
+        """
+        folder = Path(folder or self.folder)
+        migrated = 0
+        with self._lock:
+            self._plock.acquire()  # outra caixa pode estar a migrar ao mesmo tempo
+            try:
+                paths = sorted(folder.glob("INV*.html"))
+                for start in range(0, len(paths), batch):
+                    docs, done = [], []
+                    for path in paths[start:start + batch]:
+                        try:
+                            html = path.read_text(encoding="utf-8")
+                            mtime = path.stat().st_mtime
+                        except FileNotFoundError:
+                            continue
+                        m = _LEGACY_ID.match(path.stem)
+                        pack = (f"{m.group(1)}-{m.group(2)}" if m
+                                else datetime.fromtimestamp(mtime).strftime("%Y-%m"))
+                        docs.append((path.stem, html, pack))
+                        done.append(path)
+                    migrated += self.put_many(docs, fsync=True)
+                    for path in done:
+                        path.unlink()
+            finally:
+                self._plock.release()
+        return migrated
+
+    def close(self) -> None:
+        with self._lock:
+            for m in self._maps.values():
+                m.close()
+            self._maps.clear()
+            self._plock.close()
@@ -0,0 +1,157 @@
+"""Numeração das faturas por série (ano + caixa), sem repetições nem falhas.
+
+Cada caixa usa a sua série, ``AAAA-<caixa>``, e numera as faturas 1, 2, 3...
+dentro de cada ano (como as séries de faturação portuguesas). O ID da
+fatura é ``INV-AAAA-<caixa>-NNNNNN``.
+
+Para não escrever em disco a cada venda, os números são reservados em
+blocos: o ficheiro de estado da série (``invoices/series/AAAA-<caixa>.json``)
+só é regravado quando um bloco se esgota e ao fechar. Se o programa parar
+sem fechar, o estado fica marcado como "aberto" e na abertura seguinte o
+último número usado é lido das próprias vendas gravadas; a numeração
+continua a seguir, sem reutilizar nem saltar números.
+
+Uma caixa é identificada pelo lock ``terminal-<caixa>.lock``, que fica com
+o processo enquanto este estiver aberto. Sem caixa configurada escolhe-se
+a primeira livre ("1", "2", ...), por isso duas caixas no mesmo computador
+nunca partilham uma série.
+"""
+import contextlib
+import json
+import re
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Iterator, Optional
+
+from .atomic_io import atomic_write
+from .file_lock import InterProcessLock
+
+INVOICE_ID = re.compile(r"^INV-(?P<year>\d{4})-(?P<terminal>[A-Za-z0-9]+)-(?P<number>\d+)$")
+
+# recover(ano, caixa) -> último número gravado nas vendas (0 se nenhum)
+Recover = Callable[[int, str], int]
+
+
+def invoice_id(year: int, terminal: str, number: int) -> str:
+    return f"INV-{year}-{terminal}-{number:06d}"
+
+
+def parse_invoice_id(value: str):
+    """(ano, caixa, número) de um ID de fatura, ou None para IDs antigos."""
+    m = INVOICE_ID.match(value or "")
+    if m is None:
+        return None
+    return int(m.group("year")), m.group("terminal"), int(m.group("number"))
+
+
+class InvoiceSeries:
+    """Estado de uma série (um ano de uma caixa)."""
+
+    def __init__(self, path: Path, year: int, terminal: str, block: int, recover: Recover) -> None:
+        self.path = path
+        self.year = year
+        self.terminal = terminal
+        self.block = block
+        try:
+            state = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            state = None
+        if isinstance(state, dict) and state.get("clean"):
+            last = int(state["last"])
+        else:
+            # Ficheiro inexistente ou fecho não limpo: confiar nas vendas gravadas
+            last = recover(year, terminal)
+        self.next = last + 1
+        self.reserved = self.next
+        self.writes = 0
+        self._reserve()
+
+    def _write(self, state: Dict) -> None:
+        atomic_write(self.path, json.dumps(state).encode("utf-8"))
+        self.writes += 1
+
+    def _reserve(self) -> None:
+        self.reserved = self.next + self.block
+        self._write({"year": self.year, "terminal": self.terminal, "reserved": self.reserved,
+                     "last": self.next - 1, "clean": False})
+
+    def take(self) -> int:
+        if self.next >= self.reserved:
+            self._reserve()
+        number = self.next
+        self.next += 1
+        return number
+
+    def give_back(self, number: int) -> None:
+        """Devolve o último número se a fatura não chegou a ser gravada."""
+        if number == self.next - 1:
+            self.next = number
+
+    def close(self) -> None:
+        self._write({"year": self.year, "terminal": self.terminal, "reserved": self.next,
+                     "last": self.next - 1, "clean": True})
+
+
+class InvoiceNumberAllocator:
+    """Atribui IDs de fatura da série desta caixa."""
+
+    def __init__(self, folder: Path, recover: Recover, terminal: Optional[str] = None,
+                 block: int = 100) -> None:
+        self.folder = Path(folder)
+        self.folder.mkdir(parents=True, exist_ok=True)
+        self.recover = recover
+        self.block = block
+        self._lock = threading.RLock()
+        self._series: Dict[int, InvoiceSeries] = {}
+        self.terminal, self._terminal_lock = self._claim(terminal)
+
+    def _claim(self, terminal: Optional[str]):
+        if terminal is not None:
+            lock = InterProcessLock(self.folder / f"terminal-{terminal}.lock")
+            if not lock.try_acquire():
+                lock.close()
+                raise ValueError(f"A série da caixa {terminal} já está a ser usada noutro processo.")
+            return str(terminal), lock
+        n = 1
+        while True:
+            lock = InterProcessLock(self.folder / f"terminal-{n}.lock")
+            if lock.try_acquire():
+                return str(n), lock
+            lock.close()
+            n += 1
+
+    def _get(self, year: int) -> InvoiceSeries:
+        series = self._series.get(year)
+        if series is None:
+            path = self.folder / f"{year}-{self.terminal}.json"
+            series = self._series[year] = InvoiceSeries(path, year, self.terminal,
+                                                        self.block, self.recover)
+        return series
+
+    @contextlib.contextmanager
+    def issue(self, when: Optional[datetime] = None) -> Iterator[str]:
+        """Reserva o próximo ID; se o bloco ``with`` falhar, o número é devolvido.
+
+        O lock fica adquirido durante o bloco, para que o número só seja
+        consumido quando a venda fica gravada (numeração sem falhas).
+        """
+        year = (when or datetime.now()).year
+        with self._lock:
+            series = self._get(year)
+            number = series.take()
+            try:
+                yield invoice_id(year, self.terminal, number)
+            except BaseException:
+                series.give_back(number)
+                raise
+
+    def close(self) -> None:
+        with self._lock:
+            for series in self._series.values():
+                series.close()
+            self._series.clear()
+            if self._terminal_lock is not None:
+                self._terminal_lock.release()
+                self._terminal_lock.close()
+                self._terminal_lock = None
@@ -0,0 +1,174 @@
+"""Modelos (templates) das faturas em HTML, compilados uma só vez.
+
+O modelo é um ficheiro HTML com campos ``${nome}`` e um bloco de linha entre
+``<!-- row -->`` e ``<!-- /row -->``, repetido por cada linha da fatura.
+``templates/invoice.html`` é o modelo por omissão; uma loja pode ter o seu em
+``templates/invoice-<SHOP_TYPE>.html`` (ex.: ``invoice-FARMACIA.html``).
+
+Campos da fatura: id, date, seller, company, shop_type, total_no_vat,
+vat_percent, total_vat, total_with_vat. Campos da linha: code, name, qty,
+price_no_vat, subtotal. Os valores são escapados para HTML.
+
+Na compilação o modelo é partido em cabeçalho, linha e rodapé, e cada parte
+passa a uma string de ``str.format``; gerar uma fatura é formatar essas três
+partes e juntar tudo com ``"".join``.
+
+Regenerar o arquivo depois de mudar um modelo (usa vários processos):
+
+    python -m models.invoice_template --workers 4
+"""
+import html
+import os
+import re
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .invoice_archive import InvoiceArchive
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+TEMPLATE_DIR = ROOT_DIR / "templates"
+
+_FIELD = re.compile(r"\$\{(\w+)\}")
+_ROW = re.compile(r"[ \t]*<!-- row -->\n?(.*?)[ \t]*<!-- /row -->\n?", re.S)
+
+
+def _to_format(text: str) -> str:
+    """``${campo}`` -> ``{campo}``, com as restantes chavetas (CSS) escapadas."""
+    parts = _FIELD.split(text)
+    # split com um grupo: texto, campo, texto, campo, ...
+    return "".join(p.replace("{", "{{").replace("}", "}}") if i % 2 == 0 else "{%s}" % p
+                   for i, p in enumerate(parts))
+
+
+class InvoiceTemplate:
+    """Modelo compilado: cabeçalho, linha e rodapé prontos para ``format_map``."""
+
+    def __init__(self, source: str) -> None:
+        m = _ROW.search(source)
+        if m is None:
+            raise ValueError("O modelo da fatura não tem o bloco <!-- row --> ... <!-- /row -->.")
+        self.head = _to_format(source[:m.start()])
+        self.row = _to_format(m.group(1))
+        self.tail = _to_format(source[m.end():])
+
+    @classmethod
+    def from_file(cls, path: Path) -> "InvoiceTemplate":
+        return cls(Path(path).read_text(encoding="utf-8"))
+
+    def render(self, invoice: Dict) -> str:
+        esc = html.escape
+        vat_rate = invoice.get("vat_rate", 0.0)
+        total_no_vat = invoice["total_no_vat"]
+        fields = {
+            "id": esc(invoice["id"]),
+            "date": datetime.fromisoformat(invoice["timestamp"]).strftime("%d/%m/%Y %H:%M"),
+            "seller": esc(str(invoice.get("seller", ""))),
+            "company": esc(str(invoice.get("company") or "")),
+            "shop_type": esc(str(invoice.get("shop_type") or "")),
+            "total_no_vat": f"{total_no_vat:.2f}",
+            "vat_percent": int(vat_rate * 100),
+            "total_vat": f"{total_no_vat * vat_rate:.2f}",
+            "total_with_vat": f"{invoice['total_with_vat']:.2f}",
+        }
+        row = self.row.format
+        parts = [self.head.format_map(fields)]
+        parts.extend(
+            row(code=esc(str(it["code"])), name=esc(str(it["name"])), qty=it["qty"],
+                price_no_vat=f"{it['price_no_vat']:.2f}",
+                subtotal=f"{it['qty'] * it['price_no_vat']:.2f}")
+            for it in invoice["items"]
+        )
+        parts.append(self.tail.format_map(fields))
+        return "".join(parts)
+
+
+class TemplateSet:
+    """Modelos por tipo de loja, compilados na primeira utilização."""
+
+    def __init__(self, folder: Path = TEMPLATE_DIR) -> None:
+        self.folder = Path(folder)
+        self._compiled: Dict[Optional[str], InvoiceTemplate] = {}
+
+    def get(self, shop_type: Optional[str] = None) -> InvoiceTemplate:
+        template = self._compiled.get(shop_type)
+        if template is None:
+            path = self.folder / f"invoice-{shop_type}.html"
+            if shop_type is None or not path.exists():
+                template = self._compiled.get(None) or InvoiceTemplate.from_file(
+                    self.folder / "invoice.html")
+                self._compiled[None] = template
+            else:
+                template = InvoiceTemplate.from_file(path)
+            self._compiled[shop_type] = template
+        return template
+
+    def render(self, invoice: Dict) -> str:
+        return self.get(invoice.get("shop_type")).render(invoice)
+
+
+# ---------- Regenerar o arquivo em paralelo ----------
+_worker: Optional[Tuple[TemplateSet, InvoiceArchive]] = None
+
+
+def _init_worker(folder: str, archive_dir: str) -> None:
+    global _worker
+    _worker = (TemplateSet(Path(folder)), InvoiceArchive(Path(archive_dir)))
+
+
+def render_batch(templates: TemplateSet, archive: InvoiceArchive, invoices: List[Dict]) -> int:
+    """Gera um lote de faturas e guarda-o no arquivo numa só escrita."""
+    return archive.put_many((inv["id"], templates.render(inv), archive.pack_of(inv))
+                            for inv in invoices)
+
+
+def _render_batch(invoices: List[Dict]) -> int:
+    return render_batch(*_worker, invoices)
+
+
+def _batches(invoices: Iterable[Dict], size: int) -> Iterable[List[Dict]]:
+    batch = []
+    for invoice in invoices:
+        batch.append(invoice)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def render_all(invoices: Iterable[Dict], archive: InvoiceArchive, folder: Path = TEMPLATE_DIR,
+               workers: int = 1, batch: int = 200) -> int:
+    """Gera o HTML de todas as faturas; com ``workers > 1`` usa um pool de processos.
+
+    As faturas são lidas em streaming e enviadas aos processos em lotes de
+    ``batch``, por isso a memória não cresce com o tamanho do arquivo.
+    """
+    if workers <= 1:
+        templates = TemplateSet(folder)
+        return sum(render_batch(templates, archive, b) for b in _batches(invoices, batch))
+    import multiprocessing
+
+    ctx = multiprocessing.get_context("spawn")
+    with ctx.Pool(workers, initializer=_init_worker,
+                  initargs=(str(folder), str(archive.folder))) as pool:
+        return sum(pool.imap_unordered(_render_batch, _batches(invoices, batch)))
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from .config import load_config
+    from .system_manager import SystemManager
+
+    parser = argparse.ArgumentParser(description="Regenera o HTML das faturas com os modelos atuais.")
+    parser.add_argument("ids", nargs="*", help="IDs das faturas (por omissão, todas)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+    sm = SystemManager.from_config(dict(load_config(), background_render=False))
+    try:
+        report = sm.render_invoices(args.ids or None, workers=args.workers)
+    finally:
+        sm.close()
+    print(f"{report['rendered']} faturas em {report['seconds']:.2f} s "
+          f"({report['per_second']:.0f} faturas/s, {args.workers} processos)")
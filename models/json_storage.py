@@ -0,0 +1,558 @@
+"""Backend de persistência em ficheiros JSON (formato original do projeto)."""
+import contextlib
+import functools
+import json
+import threading
+from pathlib import Path
+from types import MappingProxyType
+from typing import TYPE_CHECKING, Optional, List, Dict, Iterator
+from datetime import datetime
+
+from .atomic_io import GroupCommitter
+from .file_cache import FILE_CACHE, file_stamp
+from .file_lock import InterProcessLock
+from .product_index import ProductIndex, norm, product_key
+from .user_directory import UserDirectory
+from .sales_partitions import Bound, PartitionedSales, migrate_to_partitions
+from .sales_journal import SalesJournal
+from .sales_rollups import SalesRollups
+from .sale import sale_shop
+from .snapshot import Snapshot, encode as encode_snapshot
+
+if TYPE_CHECKING:
+    from .sales_columns import SalesColumns
+
+
+def _locked(method):
+    """Executa o método com o lock de escrita do backend (threads e processos)."""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock, self._exclusive():
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+class CorruptDataError(ValueError):
+    """Um ficheiro de dados existe mas não é JSON válido."""
+
+
+class JsonStorage:
+    """Guarda utilizadores e produtos em listas JSON e as vendas num diário.
+
+    É o backend por omissão do SystemManager. Utilizadores e produtos são
+    lidos, alterados em memória e regravados; as vendas vão para partições
+    mensais append-only em ``sales/AAAA-MM.jsonl``. Um ``sales.jsonl`` ou
+    ``sales.json`` antigo é migrado automaticamente na primeira abertura.
+
+    As leituras vêm da FILE_CACHE (partilhada pelo processo) e as listas
+    devolvidas contêm vistas só de leitura; as escritas atualizam a cache.
+
+    As gravações são atómicas (ficheiro temporário + ``os.replace``) e
+    ``durability`` controla quando acontecem: ``"always"``, ``"batch"`` ou
+    ``"idle"`` (ver ``atomic_io.GroupCommitter``).
+
+    Várias caixas podem partilhar a mesma pasta: cada alteração corre com o
+    lock entre processos (``data/.pos.lock``) e começa por confirmar que os
+    dados em memória são os do disco. Os ficheiros em cache são validados
+    pelo seu carimbo (inode, mtime, tamanho); o manifesto das vendas e os
+    totais materializados pela versão guardada no ficheiro do lock. Se
+    outra caixa escreveu entretanto, relê-se antes de aplicar a alteração,
+    por isso nenhum delta de stock nem nenhuma venda se perde. Em
+    batch/idle a caixa que tem escritas pendentes fica com o lock até ao fim
+    da janela: as alterações seguintes juntam-se à mesma gravação e o lock
+    só é largado (com a versão incrementada) depois de tudo estar em disco.
+    """
+
+    name = "json"
+
+    def __init__(self, users: Path, products: Path, sales: Path,
+                 durability: str = "always", commit_window: float = 0.05,
+                 multi_terminal: bool = True, snapshot: bool = True) -> None:
+        self.committer = GroupCommitter(durability, commit_window)
+        # Serializar o JSON (thread do commit) e alterar registos não se cruzam
+        self._lock = threading.RLock()
+        self._index = ProductIndex()
+        self._directory = UserDirectory()
+        self.users_path = Path(users)
+        self.products_path = Path(products)
+        self.sales_path = Path(sales)
+        self.users_path.parent.mkdir(parents=True, exist_ok=True)
+        self._plock = (InterProcessLock(self.users_path.with_name(".pos.lock"))
+                       if multi_terminal else None)
+        self._seen_version = None
+        # Lock mantido até o commit em grupo gravar as escritas pendentes
+        self._holding = False
+        if self._plock is not None:
+            self.committer.on_flush = self._committed
+        # Imagem binária dos utilizadores, produtos e totais (arranque rápido)
+        self._snapshot = Snapshot(self.users_path.with_name("snapshot.bin")) if snapshot else None
+        with self._lock, self._exclusive():
+            for f in (self.users_path, self.products_path):
+                f.parent.mkdir(parents=True, exist_ok=True)
+                if not f.exists():
+                    f.write_text("[]", encoding="utf-8")
+            sales_dir = self.sales_path.with_suffix("")
+            migrate_to_partitions(sales_dir, self.sales_path.with_suffix(".jsonl"), self.sales_path)
+            self.sales = PartitionedSales(sales_dir, self.committer, self._lock)
+            rollups_path = self.sales_path.with_name("sales_rollups.json")
+            loaded = self._load_snapshot(rollups_path)
+            self.rollups = SalesRollups(rollups_path, self.committer, self._lock,
+                                        loaded.get("rollups", (None, None))[1])
+            self.rollups.catch_up(self.sales, self._shop_of)
+            # Registo das entradas/contagens de stock em massa (com o motivo)
+            self.movements = SalesJournal(self.products_path.with_name("stock_movements.jsonl"))
+        # Colunas para as análises (abertas na primeira consulta)
+        self._columns: Optional["SalesColumns"] = None
+
+    # ---------- Várias caixas ----------
+    @contextlib.contextmanager
+    def _exclusive(self):
+        """Lock entre processos à volta de uma alteração (reentrante)."""
+        if self._plock is None:
+            yield
+            return
+        if self._plock.acquire():
+            flushes = self.committer.flushes
+            try:
+                self._sync(self._plock.version())
+                yield
+            finally:
+                try:
+                    # As outras caixas têm de ver tudo antes de o lock ser largado:
+                    # com escritas pendentes (batch/idle) fica-se com ele até ao
+                    # fim da janela e é ``_committed`` que o larga
+                    if self.committer.has_pending():
+                        if not self._holding:
+                            self._holding = True
+                            self._plock.acquire()
+                    elif self.committer.flushes != flushes:
+                        self._seen_version = self._plock.bump()
+                finally:
+                    self._plock.release()
+        else:
+            try:
+                yield
+            finally:
+                self._plock.release()
+
+    def _committed(self) -> None:
+        """Fim de um flush do commit em grupo: larga o lock mantido desde a escrita."""
+        with self._lock:
+            if self._holding and not self.committer.has_pending():
+                self._holding = False
+                self._seen_version = self._plock.bump()
+                self._plock.release()
+
+    def _sync(self, version: int) -> None:
+        """Relê o manifesto e os totais se outra caixa escreveu desde a última vez."""
+        if version == self._seen_version or self._seen_version is None:
+            self._seen_version = version
+            return
+        self.sales.refresh()
+        self.rollups.reload()
+        self.rollups.catch_up(self.sales, self._shop_of, save=False)
+        self._seen_version = version
+
+    def _refresh(self) -> None:
+        """Antes de consultar totais em memória: confirmar que estão atualizados."""
+        if self._plock is not None and self._plock.version() != self._seen_version:
+            with self._lock, self._exclusive():
+                pass
+
+    # ---------- Imagem binária ----------
+    def _snapshot_sources(self, rollups_path: Path) -> Dict[str, Path]:
+        return {"users": self.users_path, "products": self.products_path,
+                "rollups": rollups_path}
+
+    def _load_snapshot(self, rollups_path: Path) -> Dict:
+        """Põe na cache os registos da imagem que ainda correspondem aos ficheiros."""
+        if self._snapshot is None:
+            return {}
+        sources = self._snapshot_sources(rollups_path)
+        # Os índices valem o mesmo que a lista: a mesma assinatura de ficheiro
+        sources.update(users_index=self.users_path, products_index=self.products_path)
+        loaded = self._snapshot.load(sources)
+        for name, index in (("users", self._directory), ("products", self._index)):
+            if name not in loaded:
+                continue
+            path = getattr(self, f"{name}_path")
+            stamp, data = loaded[name]
+            if FILE_CACHE.seed(path, data, stamp) and f"{name}_index" in loaded:
+                # Os índices apontam para os mesmos dicts (o marshal mantém as referências)
+                index.restore(loaded[f"{name}_index"][1], FILE_CACHE.generation(path))
+        return loaded
+
+    def snapshot_report(self) -> Dict:
+        """Tempo de leitura da imagem e que partes foram usadas na abertura."""
+        return dict(self._snapshot.report) if self._snapshot is not None else {}
+
+    def save_snapshot(self) -> bool:
+        """Grava a imagem se os dados mudaram desde a última; devolve se gravou."""
+        if self._snapshot is None:
+            return False
+        self.flush()
+        with self._lock:
+            entries = {}
+            for name, read in (("users", self._users), ("products", self._products)):
+                path = getattr(self, f"{name}_path")
+                try:
+                    index = read()[1]
+                except CorruptDataError:
+                    continue  # fica fora da imagem; o erro aparece na próxima leitura
+                durable = FILE_CACHE.durable(path)
+                if durable is not None:
+                    entries[name] = (durable[1], durable[0])
+                    entries[f"{name}_index"] = (durable[1], index.state())
+            stamp = file_stamp(self.rollups.path)
+            if stamp is not None:
+                entries["rollups"] = (stamp, self.rollups.data)
+            if not self._snapshot.changed(entries):
+                return False
+            # Serializado com o lock: as escritas alteram as listas no próprio sítio
+            raw = encode_snapshot(entries)
+        self._snapshot.save(raw, entries)
+        return True
+
+    # ---------- Helpers JSON ----------
+    @staticmethod
+    def _parse(path: Path):
+        try:
+            text = path.read_text(encoding="utf-8")
+        except FileNotFoundError:
+            return [], 0
+        try:
+            data = json.loads(text) if text.strip() else []
+        except ValueError as e:
+            # Nunca tratar um ficheiro corrompido como vazio: a próxima
+            # gravação apagaria o catálogo inteiro
+            raise CorruptDataError(f"Ficheiro de dados corrompido: {path} ({e})") from e
+        # Formato antigo {"users": [...]} também é aceite
+        if isinstance(data, dict):
+            data = next((v for v in data.values() if isinstance(v, list)), [])
+        if not isinstance(data, list):
+            return [], 0
+        return [r for r in data if isinstance(r, dict)], 0
+
+    def _load(self, path: Path) -> list:
+        """Lista interna em cache; só os métodos de escrita a alteram."""
+        return FILE_CACHE.get(path, self._parse)
+
+    def _view(self, path: Path) -> list:
+        return FILE_CACHE.view(path, self._parse)
+
+    def _encode(self, data: list) -> bytes:
+        with self._lock:
+            return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    def _save(self, path: Path, data: list) -> None:
+        # A memória passa a ser a versão de referência até a escrita acabar
+        FILE_CACHE.put(path, data, pinned=True)
+        try:
+            self.committer.write(path, lambda: self._encode(data),
+                                 lambda: FILE_CACHE.flushed(path))
+        except BaseException:
+            # A lista em memória já foi alterada: obrigar a reler o disco
+            FILE_CACHE.invalidate(path)
+            raise
+
+    def flush(self) -> None:
+        """Grava já as alterações pendentes (modos batch/idle) e os totais das vendas."""
+        with self._lock:
+            self.rollups.save_pending()
+        self.committer.flush()
+
+    def cache_stats(self) -> Dict[str, int]:
+        return FILE_CACHE.stats()
+
+    def close(self) -> None:
+        self.flush()
+        self.save_snapshot()
+        if self._columns is not None:
+            self._columns.save()
+            self._columns.close()
+            self._columns = None
+        if self._plock is not None:
+            self._plock.close()
+
+    # ---------- Utilizadores ----------
+    def _users(self):
+        """Lista de utilizadores em cache e o diretório (reconstruído se o ficheiro mudou)."""
+        users = self._load(self.users_path)
+        generation = FILE_CACHE.generation(self.users_path)
+        if self._directory.generation != generation:
+            self._directory.build(users, generation)
+        return users, self._directory
+
+    def _save_users(self, users: list) -> None:
+        self._save(self.users_path, users)
+        self._directory.generation = FILE_CACHE.generation(self.users_path)
+
+    def list_users(self) -> List[Dict]:
+        return self._view(self.users_path)
+
+    def find_user(self, username: str) -> Optional[Dict]:
+        """Procura um utilizador pelo username (sem distinguir maiúsculas)."""
+        u = self._users()[1].get(username)
+        return dict(u) if u is not None else None
+
+    def find_user_by_email(self, email: str) -> Optional[Dict]:
+        u = self._users()[1].get_by_email(email)
+        return dict(u) if u is not None else None
+
+    @_locked
+    def add_user(self, payload: Dict) -> Dict:
+        users, directory = self._users()
+        if directory.get(payload["username"]) is not None:
+            raise ValueError("Username já existe.")
+        record = dict(payload)
+        users.append(record)
+        directory.add(record)
+        self._save_users(users)
+        return payload
+
+    @_locked
+    def update_user(self, username: str, changes: Dict) -> Optional[Dict]:
+        """Atualiza campos do utilizador com este username exato."""
+        users, directory = self._users()
+        u = directory.get(username)
+        if u is None or u.get("username") != username:
+            return None
+        old_email = u.get("email")
+        u.update({k: v for k, v in changes.items() if k != "username"})
+        directory.reindex_email(u, old_email)
+        self._save_users(users)
+        return dict(u)
+
+    def shop_users(self, company: str, shop_type: str, role: Optional[str] = None) -> List[Dict]:
+        with self._lock:
+            return [MappingProxyType(u) for u in self._users()[1].shop(company, shop_type, role)]
+
+    # ---------- Produtos ----------
+    def _products(self):
+        """Lista de produtos em cache e o respetivo índice (reconstruído se o ficheiro mudou)."""
+        products = self._load(self.products_path)
+        generation = FILE_CACHE.generation(self.products_path)
+        if self._index.generation != generation:
+            self._index.build(products, generation)
+        return products, self._index
+
+    def _save_products(self, products: list) -> None:
+        # O índice já foi atualizado no sítio: fica associado à nova geração
+        self._save(self.products_path, products)
+        self._index.generation = FILE_CACHE.generation(self.products_path)
+
+    def _locate(self, code: str, company: Optional[str], shop_type: Optional[str]) -> Dict:
+        p = self._products()[1].get(code, company, shop_type)
+        if p is None:
+            raise ValueError("Produto não encontrado.")
+        return p
+
+    def list_products(self) -> List[Dict]:
+        return self._view(self.products_path)
+
+    def shop_products(self, company: str, shop_type: str,
+                      ptype: Optional[str] = None) -> List[Dict]:
+        with self._lock:
+            return [MappingProxyType(p) for p in self._products()[1].shop(company, shop_type, ptype)]
+
+    def find_product(self, code: str, company: Optional[str] = None,
+                     shop_type: Optional[str] = None) -> Optional[Dict]:
+        p = self._products()[1].get(code, company, shop_type)
+        return dict(p) if p is not None else None
+
+    @_locked
+    def add_product(self, payload: Dict) -> Dict:
+        products, index = self._products()
+        if index.get(payload["code"], payload.get("company") or "",
+                     payload.get("shop_type") or "") is not None:
+            raise ValueError("Código de produto duplicado nesta loja.")
+        record = dict(payload)
+        products.append(record)
+        index.add(record)
+        self._save_products(products)
+        return payload
+
+    @_locked
+    def add_products(self, payloads: List[Dict]) -> int:
+        """Acrescenta vários produtos com uma única gravação de products.json.
+
+        Se algum código já existir na sua loja nada é gravado.
+        """
+        products, index = self._products()
+        seen = set()
+        for payload in payloads:
+            key = product_key(payload)
+            if key in seen or index.get(payload["code"], payload.get("company") or "",
+                                        payload.get("shop_type") or "") is not None:
+                raise ValueError(f"Código de produto duplicado nesta loja: {payload['code']}")
+            seen.add(key)
+        for payload in payloads:
+            record = dict(payload)
+            products.append(record)
+            index.add(record)
+        if payloads:
+            self._save_products(products)
+        return len(payloads)
+
+    @_locked
+    def update_product(self, code: str, changes: Dict, company: Optional[str] = None,
+                       shop_type: Optional[str] = None) -> Dict:
+        products, index = self._products()
+        p = self._locate(code, company, shop_type)
+        old_key, old_ptype = product_key(p), p.get("ptype")
+        p.update(changes)
+        index.reindex(p, old_key, old_ptype)
+        self._save_products(products)
+        return dict(p)
+
+    @_locked
+    def adjust_stock(self, code: str, delta: int, company: Optional[str] = None,
+                     shop_type: Optional[str] = None) -> Dict:
+        products, _ = self._products()
+        p = self._locate(code, company, shop_type)
+        p["stock"] = max(0, int(p.get("stock", 0)) + int(delta))
+        self._save_products(products)
+        return dict(p)
+
+    @_locked
+    def adjust_stock_bulk(self, deltas: Dict[str, int], company: Optional[str] = None,
+                          shop_type: Optional[str] = None, reason: str = "") -> List[Dict]:
+        """Aplica vários deltas de stock com uma leitura e uma gravação.
+
+        Tudo ou nada: se algum código não existir nada é alterado. O stock
+        nunca fica negativo. Devolve os produtos alterados.
+        """
+        products, index = self._products()
+        found = []
+        for code, delta in deltas.items():
+            p = index.get(code, company, shop_type)
+            if p is None:
+                raise ValueError(f"Produto {code} não encontrado.")
+            found.append((code, int(delta), p))
+        changes = []
+        for code, delta, p in found:
+            p["stock"] = max(0, int(p.get("stock", 0)) + delta)
+            changes.append({"code": p.get("code"), "delta": delta, "stock": p["stock"]})
+        if found:
+            self._save_products(products)
+            self.movements.append({"timestamp": datetime.now().isoformat(), "reason": reason,
+                                   "company": company, "shop_type": shop_type, "changes": changes})
+        return [dict(p) for _, _, p in found]
+
+    def stock_movements(self) -> Iterator[Dict]:
+        return self.movements.stream()
+
+    # ---------- Vendas ----------
+    def iter_sales(self, since: Bound = None, until: Bound = None) -> Iterator[Dict]:
+        return self.sales.iter(since, until)
+
+    def list_sales(self, since: Bound = None, until: Bound = None) -> List[Dict]:
+        return self.sales.views(since, until)
+
+    def _shop_of(self, invoice: Dict):
+        """Loja de uma venda; as vendas antigas não a têm e usa-se a do vendedor."""
+        return sale_shop(invoice, self._users()[1].get)
+
+    def _append_sale(self, invoice: Dict) -> None:
+        partition, start, end = self.sales.append(invoice)
+        self.rollups.record(invoice, self._shop_of(invoice), partition, start, end,
+                            self.sales, self._shop_of)
+
+    @_locked
+    def add_sale(self, invoice: Dict) -> None:
+        self._append_sale(invoice)
+
+    @_locked
+    def checkout(self, invoice: Dict, company: Optional[str] = None,
+                 shop_type: Optional[str] = None) -> None:
+        """Valida e desconta o stock de todas as linhas e regista a venda.
+
+        Uma leitura, uma consulta O(1) ao índice por linha, uma escrita de
+        products.json e um append no diário. Se algo falhar, o stock volta ao
+        que era.
+        """
+        products, index = self._products()
+        wanted: Dict[str, int] = {}
+        found: Dict[str, Dict] = {}
+        for item in invoice["items"]:
+            code = norm(item["code"])
+            wanted[code] = wanted.get(code, 0) + int(item["qty"])
+            if code not in found:
+                prod_db = index.get(item["code"], company, shop_type)
+                if not prod_db:
+                    raise ValueError(f"Produto {item['code']} não encontrado na base de dados.")
+                found[code] = prod_db
+
+        for item in invoice["items"]:
+            prod_db = found[norm(item["code"])]
+            current_stock = int(prod_db.get("stock", 0))
+            if current_stock < wanted[norm(item["code"])]:
+                raise ValueError(f"Stock insuficiente para '{prod_db['name']}'. Stock atual: {current_stock}")
+
+        old_stock = {code: p.get("stock", 0) for code, p in found.items()}
+        saved = False
+        try:
+            for code, p in found.items():
+                p["stock"] = int(old_stock[code]) - wanted[code]
+            self._save_products(products)
+            saved = True
+            partition, start, end = self.sales.append(invoice)
+        except BaseException:
+            # Rollback: repor o stock em memória e, se já tinha sido gravado, no disco
+            for code, p in found.items():
+                p["stock"] = old_stock[code]
+            if saved:
+                self._save_products(products)
+            raise
+        self.rollups.record(invoice, self._shop_of(invoice), partition, start, end,
+                            self.sales, self._shop_of)
+
+    # ---------- Relatórios ----------
+    def shop_monthly_totals(self, company: str, shop_type: str) -> Dict[str, float]:
+        self._refresh()
+        return self.rollups.monthly(company, shop_type)
+
+    def shop_totals_by_seller(self, company: str, shop_type: str) -> Dict[str, float]:
+        self._refresh()
+        return self.rollups.by_seller(company, shop_type)
+
+    def shop_daily_totals(self, company: str, shop_type: str) -> Dict[str, float]:
+        self._refresh()
+        return self.rollups.daily(company, shop_type)
+
+    @_locked
+    def rebuild_rollups(self) -> int:
+        n = self.rollups.rebuild(self.sales, self._shop_of)
+        self.flush()
+        return n
+
+    def columns(self) -> "SalesColumns":
+        """Colunas das vendas, atualizadas com o que foi gravado desde a última consulta."""
+        self._refresh()
+        with self._lock:
+            if self._columns is None:
+                # Só aqui: as colunas usam o NumPy, que não é preciso no arranque
+                from .sales_columns import SalesColumns
+                self._columns = SalesColumns(self.sales_path.with_name("sales_columns.bin"),
+                                             self._lock)
+            if self._columns.catch_up(self.sales, self._shop_of) and not self._columns.path.exists():
+                self._columns.save()  # primeira construção: não a repetir na próxima abertura
+            return self._columns
+
+    def monthly_totals(self, allowed_sellers: Optional[List[str]] = None,
+                       since: Bound = None, until: Bound = None) -> Dict[str, float]:
+        if allowed_sellers is None and since is None and until is None:
+            # Sem filtros os totais por mês já estão no manifesto das partições
+            self._refresh()
+            return self.sales.monthly_totals()
+        return self.columns().totals("month", since, until, allowed_sellers)
+
+    def totals_by_seller(self, allowed_sellers: Optional[List[str]] = None,
+                         since: Bound = None, until: Bound = None) -> Dict[str, float]:
+        return self.columns().totals("seller", since, until, allowed_sellers)
+
+    def sales_totals(self, by: str = "month", since: Bound = None, until: Bound = None,
+                     allowed_sellers: Optional[List[str]] = None, company: Optional[str] = None,
+                     shop_type: Optional[str] = None) -> Dict[str, float]:
+        """Totais agrupados por mês, dia, vendedor, loja, hora ou dia da semana."""
+        return self.columns().totals(by, since, until, allowed_sellers, company, shop_type)
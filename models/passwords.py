@@ -0,0 +1,109 @@
+"""Hash das passwords com sal (PBKDF2 ou scrypt do ``hashlib``).
+
+Formato guardado no campo ``password`` dos utilizadores:
+
+    pbkdf2_sha256$<iterações>$<sal>$<hash>
+    scrypt$<n>$<r>$<p>$<sal>$<hash>
+
+(sal e hash em base64). O custo é configurável (``password_scheme`` e
+``password_cost`` em ``data/config.json``). As contas antigas ainda têm a
+password em texto simples: continuam a entrar e o SystemManager substitui-a
+pelo hash no primeiro login (``needs_rehash``), tal como quando o custo
+configurado muda.
+
+    python -m models.passwords   # hash de teste com o custo por omissão
+"""
+import base64
+import hashlib
+import hmac
+import os
+from typing import Optional
+
+SCHEMES = ("pbkdf2_sha256", "scrypt")
+DEFAULT_SCHEME = "pbkdf2_sha256"
+# Iterações do PBKDF2 / ``n`` do scrypt (r=8, p=1)
+DEFAULT_COST = {"pbkdf2_sha256": 200_000, "scrypt": 2 ** 14}
+SALT_BYTES = 16
+_SCRYPT_R, _SCRYPT_P = 8, 1
+
+
+def _b64(raw: bytes) -> str:
+    return base64.b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _unb64(text: str) -> bytes:
+    return base64.b64decode(text + "=" * (-len(text) % 4))
+
+
+def _derive(scheme: str, password: str, salt: bytes, cost: int,
+            r: int = _SCRYPT_R, p: int = _SCRYPT_P) -> bytes:
+    secret = password.encode("utf-8")
+    if scheme == "pbkdf2_sha256":
+        return hashlib.pbkdf2_hmac("sha256", secret, salt, cost)
+    if scheme == "scrypt":
+        return hashlib.scrypt(secret, salt=salt, n=cost, r=r, p=p,
+                              maxmem=256 * cost * r + (1 << 20))
+    raise ValueError(f"Esquema de password desconhecido: {scheme}")
+
+
+def is_hashed(stored: Optional[str]) -> bool:
+    return bool(stored) and stored.split("$", 1)[0] in SCHEMES
+
+
+def hash_password(password: str, scheme: str = DEFAULT_SCHEME, cost: Optional[int] = None) -> str:
+    """Hash novo (sal aleatório) no formato guardado."""
+    cost = cost or DEFAULT_COST[scheme]
+    salt = os.urandom(SALT_BYTES)
+    digest = _b64(_derive(scheme, password, salt, cost))
+    if scheme == "scrypt":
+        return f"scrypt${cost}${_SCRYPT_R}${_SCRYPT_P}${_b64(salt)}${digest}"
+    return f"{scheme}${cost}${_b64(salt)}${digest}"
+
+
+def verify_password(password: str, stored: Optional[str]) -> bool:
+    """Confere a password com o valor guardado (hash ou texto simples antigo)."""
+    if not stored:
+        return False
+    if not is_hashed(stored):
+        return hmac.compare_digest(password.encode("utf-8"), stored.encode("utf-8"))
+    parts = stored.split("$")
+    try:
+        if parts[0] == "scrypt":
+            _, n, r, p, salt, digest = parts
+            derived = _derive("scrypt", password, _unb64(salt), int(n), int(r), int(p))
+        else:
+            scheme, cost, salt, digest = parts
+            derived = _derive(scheme, password, _unb64(salt), int(cost))
+    except ValueError:
+        return False  # valor guardado mal formado
+    return hmac.compare_digest(derived, _unb64(digest))
+
+
+def needs_rehash(stored: Optional[str], scheme: str = DEFAULT_SCHEME,
+                 cost: Optional[int] = None) -> bool:
+    """True para texto simples ou hash com outro esquema/custo."""
+    if not is_hashed(stored):
+        return True
+    parts = stored.split("$")
+    return parts[0] != scheme or parts[1] != str(cost or DEFAULT_COST[scheme])
+
+
+# Hash de referência para utilizadores inexistentes: o login demora o mesmo
+# e não revela que usernames existem
+_DUMMY = {}
+
+
+def dummy_verify(password: str, scheme: str = DEFAULT_SCHEME, cost: Optional[int] = None) -> None:
+    key = (scheme, cost or DEFAULT_COST[scheme])
+    if key not in _DUMMY:
+        _DUMMY[key] = hash_password("", scheme, cost)
+    verify_password(password, _DUMMY[key])
+
+
+if __name__ == "__main__":
+    import time
+
+    for scheme in SCHEMES:
+        t0 = time.perf_counter()
+        hashed = hash_password("password", scheme)
+        print(f"{scheme}: {(time.perf_counter() - t0) * 1000:.0f} ms  {hashed}")
@@ -0,0 +1,103 @@
+"""Índice em memória dos produtos por (empresa, tipo de loja, código)."""
+from typing import Dict, Iterable, List, Optional, Tuple
+
+Key = Tuple[str, str, str]
+ShopKey = Tuple[str, str]
+
+
+def norm(value: Optional[str]) -> str:
+    """Normalização usada nas chaves: sem espaços nas pontas e casefold."""
+    return (value or "").strip().casefold()
+
+
+def product_key(p: Dict) -> Key:
+    return (norm(p.get("company")), norm(p.get("shop_type")), norm(p.get("code")))
+
+
+class ProductIndex:
+    """Índice dos produtos, mantido incrementalmente pelo backend JSON.
+
+    - ``by_key``: (empresa, loja, código) -> produto (chave única);
+    - ``by_shop``: (empresa, loja) -> {código: produto}, pela ordem do ficheiro;
+    - ``by_ptype``: (empresa, loja, ptype) -> {código: produto};
+    - ``by_code``: código -> produtos com esse código em qualquer loja (para
+      as chamadas antigas que só indicam o código).
+
+    Os produtos indexados são os próprios dicts da lista em cache, por isso
+    alterações de stock/preço feitas no sítio ficam logo visíveis.
+    ``generation`` guarda a geração da FILE_CACHE a que o índice corresponde.
+    """
+
+    def __init__(self) -> None:
+        self.generation = 0
+        self.by_key: Dict[Key, Dict] = {}
+        self.by_shop: Dict[ShopKey, Dict[str, Dict]] = {}
+        self.by_ptype: Dict[Key, Dict[str, Dict]] = {}
+        self.by_code: Dict[str, List[Dict]] = {}
+
+    def build(self, products: Iterable[Dict], generation: int = 0) -> None:
+        self.by_key.clear()
+        self.by_shop.clear()
+        self.by_ptype.clear()
+        self.by_code.clear()
+        for p in products:
+            self.add(p)
+        self.generation = generation
+
+    def state(self) -> Tuple:
+        """Estruturas do índice, para a imagem binária (partilham os dicts da lista)."""
+        return (self.by_key, self.by_shop, self.by_ptype, self.by_code)
+
+    def restore(self, state: Tuple, generation: int) -> None:
+        """Repõe um índice lido da imagem binária, sem o reconstruir."""
+        self.by_key, self.by_shop, self.by_ptype, self.by_code = state
+        self.generation = generation
+
+    def add(self, p: Dict) -> None:
+        key = product_key(p)
+        company, shop_type, code = key
+        # Registos duplicados antigos: o primeiro ganha (como nas pesquisas lineares)
+        if key in self.by_key:
+            return
+        self.by_key[key] = p
+        self.by_shop.setdefault((company, shop_type), {})[code] = p
+        self.by_ptype.setdefault((company, shop_type, norm(p.get("ptype"))), {})[code] = p
+        self.by_code.setdefault(code, []).append(p)
+
+    def remove(self, p: Dict, key: Optional[Key] = None, ptype: Optional[str] = None) -> None:
+        """Retira ``p`` do índice; ``key``/``ptype`` são os valores antes da alteração."""
+        key = key or product_key(p)
+        company, shop_type, code = key
+        if self.by_key.get(key) is not p:
+            return
+        del self.by_key[key]
+        self.by_shop.get((company, shop_type), {}).pop(code, None)
+        ptype_key = (company, shop_type, norm(p.get("ptype") if ptype is None else ptype))
+        self.by_ptype.get(ptype_key, {}).pop(code, None)
+        same_code = self.by_code.get(code, [])
+        if p in same_code:
+            same_code.remove(p)
+
+    def reindex(self, p: Dict, old_key: Key, old_ptype: Optional[str]) -> None:
+        """Atualiza o índice depois de mudar campos que fazem parte das chaves."""
+        if old_key == product_key(p) and norm(old_ptype) == norm(p.get("ptype")):
+            return
+        self.remove(p, old_key, old_ptype)
+        self.add(p)
+
+    def get(self, code: str, company: Optional[str] = None,
+            shop_type: Optional[str] = None) -> Optional[Dict]:
+        if company is not None and shop_type is not None:
+            return self.by_key.get((norm(company), norm(shop_type), norm(code)))
+        for p in self.by_code.get(norm(code), ()):
+            if ((company is None or norm(p.get("company")) == norm(company))
+                    and (shop_type is None or norm(p.get("shop_type")) == norm(shop_type))):
+                return p
+        return None
+
+    def shop(self, company: str, shop_type: str, ptype: Optional[str] = None) -> List[Dict]:
+        if ptype is not None:
+            bucket = self.by_ptype.get((norm(company), norm(shop_type), norm(ptype)), {})
+        else:
+            bucket = self.by_shop.get((norm(company), norm(shop_type)), {})
+        return list(bucket.values())
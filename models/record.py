@@ -0,0 +1,144 @@
+"""Base dos registos compactos: produtos, utilizadores, vendas e linhas de fatura.
+
+Cada registo guarda os campos em ``__slots__`` (sem um ``__dict__`` por
+instância) e é só de leitura, como as vistas que o backend devolve. Para as
+páginas, que sempre trabalharam com dicts, o registo é também um
+``Mapping``: ``p["name"]``, ``p.get("stock", 0)``, ``dict(p)`` e a
+comparação com dicts funcionam como antes. Chaves que o registo não conhece
+(ex.: ``vat`` dos admins) ficam em ``extra`` e continuam acessíveis.
+
+``from_dict``/``to_dict`` convertem de e para o formato gravado em JSON;
+``replace(**alterações)`` devolve uma cópia alterada.
+"""
+import sys
+from collections.abc import Mapping
+from operator import attrgetter
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+
+_new = object.__new__
+
+
+def _fill_plan(cls, attrs) -> Tuple[Tuple[str, Callable, Any, bool], ...]:
+    """(chave, setter do slot, valor por omissão, interned) de cada campo.
+
+    Escreve-se pelo descritor de cada slot, porque ``object.__setattr__`` é
+    lento numa classe que redefine ``__setattr__``.
+    """
+    return tuple((name, getattr(cls, attr).__set__, default, name in cls.INTERNED)
+                 for name, attr, default in zip(cls.FIELDS, attrs, cls.DEFAULTS))
+
+
+class Record(Mapping):
+    """Registo só de leitura com ``__slots__`` e interface de dict."""
+
+    __slots__ = ("extra",)
+
+    FIELDS: Tuple[str, ...] = ()
+    DEFAULTS: Tuple[Any, ...] = ()
+    # Atributo de cada campo, quando o nome da chave colide com um método
+    # do Mapping (ex.: a chave "items" de uma venda fica no atributo ``lines``)
+    ATTRS: Optional[Tuple[str, ...]] = None
+    # Campos com poucos valores diferentes (loja, tipo...): partilha-se a string
+    INTERNED: Tuple[str, ...] = ()
+
+    def __init_subclass__(cls, **kwargs) -> None:
+        super().__init_subclass__(**kwargs)
+        attrs = cls.ATTRS or cls.FIELDS
+        cls._ATTR = dict(zip(cls.FIELDS, attrs))
+        cls._KNOWN = frozenset(cls.FIELDS)
+        cls._DEFAULTS = dict(zip(cls.FIELDS, cls.DEFAULTS))
+        cls._FILL = _fill_plan(cls, attrs)
+        cls._VALUES = attrgetter(*attrs) if len(attrs) > 1 else None
+
+    def __init__(self, *args, **kwargs) -> None:
+        if len(args) > len(self.FIELDS):
+            raise TypeError(f"{type(self).__name__}: demasiados argumentos")
+        unknown = kwargs.keys() - self._KNOWN
+        if unknown:
+            raise TypeError(f"{type(self).__name__}: campos desconhecidos {sorted(unknown)}")
+        values = dict(self._DEFAULTS)
+        values.update(zip(self.FIELDS, args))
+        values.update(kwargs)
+        self._fill(values, None)
+
+    def _fill(self, data, extra: Optional[Dict]) -> None:
+        get = data.get
+        for name, put, default, interned in self._FILL:
+            value = get(name, default)
+            put(self, sys.intern(value) if interned and type(value) is str else value)
+        _put_extra(self, extra)
+
+    # ---------- Conversão ----------
+    @classmethod
+    def from_dict(cls, data) -> "Record":
+        """Cria o registo a partir de um dict (ou vista) lido do disco."""
+        if type(data) is cls:
+            return data
+        record = _new(cls)
+        extra = None
+        if not data.keys() <= cls._KNOWN:
+            extra = {k: v for k, v in data.items() if k not in cls._KNOWN}
+        record._fill(data, extra)
+        return record
+
+    def to_dict(self) -> Dict:
+        """Converte o registo para dicionário serializável em JSON."""
+        d = dict(zip(self.FIELDS, self._VALUES(self)))
+        if self.extra:
+            d.update(self.extra)
+        return d
+
+    def replace(self, **changes) -> "Record":
+        """Cópia do registo com alguns campos alterados."""
+        d = self.to_dict()
+        d.update(changes)
+        return type(self).from_dict(d)
+
+    # ---------- Só de leitura ----------
+    def __setattr__(self, name: str, value) -> None:
+        raise AttributeError(f"{type(self).__name__} é só de leitura (use replace())")
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError(f"{type(self).__name__} é só de leitura")
+
+    def __setitem__(self, key: str, value) -> None:
+        raise TypeError(f"{type(self).__name__} é só de leitura (use replace())")
+
+    def __reduce__(self):
+        return type(self).from_dict, (self.to_dict(),)
+
+    # ---------- Interface de dict ----------
+    def __getitem__(self, key: str):
+        attr = self._ATTR.get(key)
+        if attr is not None:
+            return getattr(self, attr)
+        if self.extra is not None and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def get(self, key: str, default=None):
+        attr = self._ATTR.get(key)
+        if attr is not None:
+            return getattr(self, attr)
+        if self.extra is not None:
+            return self.extra.get(key, default)
+        return default
+
+    def __contains__(self, key) -> bool:
+        return key in self._KNOWN or (self.extra is not None and key in self.extra)
+
+    def __iter__(self) -> Iterator[str]:
+        yield from self.FIELDS
+        if self.extra:
+            yield from self.extra
+
+    def __len__(self) -> int:
+        return len(self.FIELDS) + (len(self.extra) if self.extra else 0)
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{k}={v!r}" for k, v in self.items())
+        return f"{type(self).__name__}({fields})"
+
+
+_put_extra = Record.extra.__set__
@@ -0,0 +1,150 @@
+"""Cliente do servidor de armazenamento (ver ``storage_server``).
+
+``RemoteStorage`` tem a mesma API dos backends locais, por isso o
+SystemManager e as páginas não precisam de saber que os dados estão
+noutro processo. Mantém um pequeno conjunto de ligações abertas (uma por
+thread em uso) e ``pipeline()`` envia vários pedidos de uma vez.
+"""
+import contextlib
+import itertools
+import queue
+import socket
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from .storage_server import (
+    END, ERROR, EXPOSED, OK, STREAMED, StorageServerError, encode, parse_address,
+    recv_frame,
+)
+
+Call = Tuple[str, Sequence, Dict]
+
+# Pedidos enviados de cada vez num pipeline (cabem no buffer do socket)
+PIPELINE_WINDOW = 64
+
+# Erros de negócio que chegam do servidor com o mesmo tipo
+_ERRORS = {"ValueError": ValueError, "CorruptDataError": ValueError, "KeyError": KeyError}
+
+
+def _raise(error) -> None:
+    name, message = error
+    raise _ERRORS.get(name, StorageServerError)(message)
+
+
+class RemoteStorage:
+    """Backend que encaminha cada chamada para o servidor de armazenamento."""
+
+    name = "remote"
+
+    def __init__(self, address: str, root: Optional[Path] = None, pool_size: int = 4,
+                 timeout: float = 30.0) -> None:
+        self.family, self.address = parse_address(address, root)
+        self.timeout = timeout
+        self._pool: "queue.LifoQueue[socket.socket]" = queue.LifoQueue(maxsize=pool_size)
+        self._ids = itertools.count(1)
+        self._ids_lock = threading.Lock()
+
+    # ---------- Ligações ----------
+    def _connect(self) -> socket.socket:
+        sock = socket.socket(self.family, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        sock.connect(self.address)
+        if self.family == socket.AF_INET:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return sock
+
+    @contextlib.contextmanager
+    def _connection(self):
+        """Empresta uma ligação do pool; se algo correr mal a ligação é fechada."""
+        try:
+            sock = self._pool.get_nowait()
+        except queue.Empty:
+            sock = self._connect()
+        try:
+            yield sock
+        except BaseException:
+            sock.close()
+            raise
+        try:
+            self._pool.put_nowait(sock)
+        except queue.Full:
+            sock.close()
+
+    def _next_id(self) -> int:
+        with self._ids_lock:
+            return next(self._ids)
+
+    @staticmethod
+    def _read_reply(sock: socket.socket, req_id: int):
+        rid, status, value = recv_frame(sock)
+        if rid != req_id:
+            raise StorageServerError(f"Resposta fora de ordem ({rid} != {req_id}).")
+        return status, value
+
+    # ---------- Chamadas ----------
+    def call(self, method: str, *args, **kwargs) -> Any:
+        return self.pipeline([(method, args, kwargs)])[0]
+
+    def pipeline(self, calls: Sequence[Call]) -> List[Any]:
+        """Envia todos os pedidos de uma vez e só depois lê as respostas.
+
+        Devolve os resultados pela mesma ordem; se algum pedido falhar, o
+        primeiro erro é levantado depois de lidas todas as respostas (os
+        outros pedidos foram executados).
+        """
+        if any(method in STREAMED for method, _, _ in calls):
+            raise ValueError("Métodos com resultados em blocos não podem ir num pipeline.")
+        results, error = [], None
+        with self._connection() as sock:
+            for start in range(0, len(calls), PIPELINE_WINDOW):
+                window = calls[start:start + PIPELINE_WINDOW]
+                ids = [self._next_id() for _ in window]
+                sock.sendall(b"".join(encode([i, m, list(a), dict(k)])
+                                      for i, (m, a, k) in zip(ids, window)))
+                for req_id in ids:
+                    status, value = self._read_reply(sock, req_id)
+                    if status == ERROR and error is None:
+                        error = value
+                    results.append(value if status == OK else None)
+        if error is not None:
+            _raise(error)
+        return results
+
+    def _stream(self, method: str, *args, **kwargs) -> Iterator[Dict]:
+        req_id = self._next_id()
+        with self._connection() as sock:
+            sock.sendall(encode([req_id, method, list(args), kwargs]))
+            while True:
+                status, value = self._read_reply(sock, req_id)
+                if status == END:
+                    return
+                if status == ERROR:
+                    _raise(value)
+                yield from value
+
+    def __getattr__(self, name: str):
+        if name in EXPOSED:
+            return lambda *args, **kwargs: self.call(name, *args, **kwargs)
+        raise AttributeError(name)
+
+    def iter_sales(self, since=None, until=None) -> Iterator[Dict]:
+        return self._stream("iter_sales", since, until)
+
+    def stock_movements(self) -> Iterator[Dict]:
+        return self._stream("stock_movements")
+
+    def cache_stats(self) -> Dict[str, int]:
+        """Estatísticas da cache do servidor (vazio se o backend não tiver cache)."""
+        try:
+            return self.call("cache_stats")
+        except StorageServerError:
+            return {}
+
+    def close(self) -> None:
+        """Fecha as ligações (o servidor continua a correr)."""
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                return
@@ -0,0 +1,134 @@
+"""Fila de geração das faturas em HTML, fora do caminho do checkout.
+
+O checkout só grava a venda; o HTML é gerado por uma thread em segundo
+plano e guardado no arquivo de faturas (``invoice_archive``). Cada pedido fica primeiro registado em
+``invoices/render_queue-<caixa>.jsonl`` (uma linha ``{"invoice": ...}`` por
+pedido e ``{"done": id}`` quando o ficheiro fica pronto), por isso se o
+programa parar a meio os HTML em falta são gerados na abertura seguinte.
+
+``render_now()`` é o caminho rápido das reimpressões: gera logo a fatura
+pedida (se ainda não estiver no arquivo) sem esperar pela fila.
+"""
+import json
+import os
+import queue
+import threading
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+from .atomic_io import atomic_write
+from .invoice_archive import InvoiceArchive
+
+Render = Callable[[Dict], str]
+
+_STOP = object()
+
+
+class InvoiceRenderQueue:
+    """Gera os HTML das faturas numa thread, com a fila pendente em disco."""
+
+    def __init__(self, journal: Path, render: Render, archive: InvoiceArchive) -> None:
+        self.journal = Path(journal)
+        self.render = render
+        self.archive = archive
+        self.rendered = 0
+        self._lock = threading.Lock()
+        self._pending: Dict[str, Dict] = {}
+        self._queue: "queue.Queue" = queue.Queue()
+        self._load()
+        self._file = open(self.journal, "a", encoding="utf-8")
+        for invoice in list(self._pending.values()):
+            self._queue.put(invoice["id"])
+        self._thread = threading.Thread(target=self._run, name="invoice-render", daemon=True)
+        self._thread.start()
+
+    def _load(self) -> None:
+        """Lê os pedidos por terminar e compacta o ficheiro só com esses."""
+        try:
+            with open(self.journal, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # última linha cortada por uma falha
+                    if "invoice" in entry:
+                        self._pending[entry["invoice"]["id"]] = entry["invoice"]
+                    elif "done" in entry:
+                        self._pending.pop(entry["done"], None)
+        except FileNotFoundError:
+            pass
+        self.journal.parent.mkdir(parents=True, exist_ok=True)
+        atomic_write(self.journal, "".join(
+            json.dumps({"invoice": inv}, ensure_ascii=False) + "\n"
+            for inv in self._pending.values()).encode("utf-8"))
+
+    def _log(self, entry: Dict) -> None:
+        # Sem fsync: sobrevive a uma falha do programa; após uma falha de
+        # energia uma fatura em falta no arquivo é gerada por render_now()
+        self._file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self._file.flush()
+
+    def submit(self, invoice: Dict) -> None:
+        """Põe a fatura na fila (depois de a venda estar gravada)."""
+        with self._lock:
+            self._pending[invoice["id"]] = invoice
+            self._log({"invoice": invoice})
+        self._queue.put(invoice["id"])
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def _write(self, invoice: Dict) -> None:
+        self.archive.put(invoice, self.render(invoice))
+
+    def _render(self, invoice_id: str) -> None:
+        with self._lock:
+            invoice = self._pending.get(invoice_id)
+        if invoice is None:
+            return  # já gerada por render_now()
+        self._write(invoice)
+        with self._lock:
+            if self._pending.pop(invoice_id, None) is not None:
+                self._log({"done": invoice_id})
+                self.rendered += 1
+
+    def _run(self) -> None:
+        while True:
+            invoice_id = self._queue.get()
+            try:
+                if invoice_id is _STOP:
+                    return
+                self._render(invoice_id)
+            except Exception as e:
+                print(f"Erro ao gerar a fatura {invoice_id}: {e}")
+            finally:
+                self._queue.task_done()
+
+    def render_now(self, invoice: Dict) -> Path:
+        """Garante que a fatura está no arquivo e devolve o HTML extraído."""
+        with self._lock:
+            queued = invoice["id"] in self._pending
+        if queued:
+            self._render(invoice["id"])
+        elif invoice["id"] not in self.archive:
+            self._write(invoice)
+        return self.archive.view(invoice["id"])
+
+    def join(self) -> None:
+        """Espera até a fila estar vazia."""
+        self._queue.join()
+
+    def close(self) -> None:
+        """Termina as faturas em fila e para a thread."""
+        if self._file.closed:
+            return
+        self._queue.put(_STOP)
+        self._thread.join()
+        with self._lock:
+            self._file.close()
+            if not self._pending:
+                try:
+                    os.unlink(self.journal)
+                except OSError:
+                    pass
@@ -0,0 +1,49 @@
+"""Modelos de Venda (fatura) e de linha de fatura."""
+from typing import Callable, Dict, Optional, Tuple
+
+from .record import Record
+
+
+class InvoiceLine(Record):
+    """Uma linha da fatura: produto, quantidade e preço unitário s/ IVA."""
+
+    __slots__ = ("code", "name", "qty", "price_no_vat")
+
+    FIELDS = __slots__
+    DEFAULTS = ("", "", 0, 0.0)
+
+
+class Sale(Record):
+    """Uma venda registada; ``sale["items"]`` (atributo ``lines``) é a lista de ``InvoiceLine``."""
+
+    __slots__ = ("id", "timestamp", "seller", "company", "shop_type", "lines",
+                 "total_no_vat", "vat_rate", "total_with_vat", "html_path")
+
+    FIELDS = ("id", "timestamp", "seller", "company", "shop_type", "items",
+              "total_no_vat", "vat_rate", "total_with_vat", "html_path")
+    ATTRS = __slots__
+    DEFAULTS = ("", "", "", None, None, (), 0.0, 0.0, 0.0, None)
+    INTERNED = ("seller", "company", "shop_type")
+
+    def _fill(self, data, extra) -> None:
+        super()._fill(data, extra)
+        # Lista (não tuplo) para continuar igual ao dict gravado
+        _put_lines(self, [InvoiceLine.from_dict(i) for i in self.lines])
+
+    def to_dict(self) -> Dict:
+        d = super().to_dict()
+        d["items"] = [i.to_dict() for i in self.lines]
+        return d
+
+
+_put_lines = Sale.lines.__set__
+
+
+def sale_shop(invoice, find_seller: Callable[[str], Optional[Dict]]) -> Tuple[str, str]:
+    """(empresa, tipo) de uma venda; as vendas antigas não têm loja e usa-se a do vendedor."""
+    if invoice.get("company") is not None or invoice.get("shop_type") is not None:
+        return invoice.get("company") or "", invoice.get("shop_type") or ""
+    seller = find_seller(invoice.get("seller") or "")
+    if seller is None:
+        return "", ""
+    return seller.get("company") or "", seller.get("shop_type") or ""
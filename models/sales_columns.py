@@ -0,0 +1,447 @@
+"""Vendas em colunas para as análises do dashboard.
+
+Em vez de percorrer dicts e converter ``timestamp``/``total_with_vat`` a
+cada consulta, cada venda é convertida uma vez para quatro colunas:
+
+- ``ts``: segundos desde 1970 (a hora local tal como está na venda);
+- ``cents``: total c/ IVA em cêntimos (inteiro, sem erros de arredondamento);
+- ``seller`` e ``shop``: códigos em dicionários (lista de vendedores e de
+  lojas ``(empresa, tipo)``).
+
+As colunas ficam ordenadas por data, por isso um intervalo de datas é uma
+fatia encontrada por pesquisa binária (``searchsorted``) e os totais são
+somas por grupo (``bincount``/``reduceat``). Com NumPy instalado as contas
+são vetoriais; sem NumPy usam-se ``array`` e ``bisect`` com o mesmo
+resultado.
+
+Tal como os totais materializados (``sales_rollups``), guarda-se por
+partição mensal até que byte as vendas já foram convertidas: à abertura só
+se lê o que foi acrescentado desde então. As colunas são gravadas em
+``data/sales_columns.bin`` (cabeçalho JSON + colunas binárias) e lidas com
+mmap.
+"""
+import json
+import mmap
+import struct
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from .atomic_io import atomic_write
+from .sales_partitions import Bound, PartitionedSales, to_datetime
+
+# NumPy é opcional (sem ele as mesmas contas usam array/bisect) e só é
+# importado ao abrir as colunas: são ~90 ms que o arranque não precisa
+np = None
+_numpy_checked = False
+
+ShopResolver = Callable[[Dict], Tuple[str, str]]
+
+MAGIC = b"POSCOLS1"
+VERSION = 1
+_LEN = struct.Struct("<Q")
+_EPOCH = datetime(1970, 1, 1)
+# Vendas sem data válida: ficam antes de todas, fora de qualquer intervalo
+UNDATED = -(1 << 62)
+
+# Agrupamentos disponíveis em ``totals``
+GROUPS = ("month", "day", "seller", "shop", "hour", "weekday")
+
+
+def load_numpy():
+    """Importa o NumPy na primeira chamada; devolve o módulo ou None se não estiver instalado."""
+    global np, _numpy_checked
+    if not _numpy_checked:
+        try:
+            import numpy
+        except ImportError:
+            numpy = None
+        np, _numpy_checked = numpy, True
+    return np
+
+
+def to_epoch(value) -> int:
+    dt = value if isinstance(value, datetime) else datetime.fromisoformat(value)
+    return int((dt.replace(tzinfo=None) - _EPOCH).total_seconds())
+
+
+def from_epoch(ts: int) -> datetime:
+    return _EPOCH + timedelta(seconds=ts)
+
+
+def _month_of(ts: int) -> Tuple[int, int]:
+    dt = from_epoch(ts)
+    return dt.year, dt.month
+
+
+def _month_edges(first: int, last: int) -> Tuple[List[str], List[int]]:
+    """Meses entre ``first`` e ``last`` (epoch) e o início de cada um."""
+    year, month = _month_of(first)
+    end = _month_of(last)
+    names, starts = [], []
+    while (year, month) <= end:
+        names.append(f"{year:04d}-{month:02d}")
+        starts.append(to_epoch(datetime(year, month, 1)))
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return names, starts
+
+
+class SalesColumns:
+    """Colunas ``ts``/``cents``/``seller``/``shop`` das vendas, ordenadas por data."""
+
+    def __init__(self, path: Path, lock: Optional[threading.RLock] = None) -> None:
+        self.path = Path(path)
+        self._lock = lock or threading.RLock()
+        self._mmap: Optional[mmap.mmap] = None
+        load_numpy()
+        self.load()
+
+    # ---------- Estado ----------
+    def _reset(self) -> None:
+        self.offsets: Dict[str, int] = {}
+        self.sellers: List[str] = []
+        self.shops: List[Tuple[str, str]] = []
+        self._seller_code: Dict[str, int] = {}
+        self._shop_code: Dict[Tuple[str, str], int] = {}
+        self.ts, self.cents = array("q"), array("q")
+        self.seller, self.shop = array("i"), array("i")
+        self.sorted = True
+        self.dirty = False
+        self._np = None  # colunas NumPy (vistas do mmap ou sobre ``_buf``)
+        # Colunas NumPy com espaço livre no fim: as vendas novas são copiadas
+        # para lá e a capacidade duplica quando enche (sem copiar o histórico
+        # a cada consulta)
+        self._buf = None
+
+    def __len__(self) -> int:
+        return len(self.ts) + (len(self._np[0]) if self._np is not None else 0)
+
+    def load(self) -> None:
+        """Lê a cache do disco; se não existir ou for inválida começa vazia."""
+        with self._lock:
+            self._close_map()
+            self._reset()
+            try:
+                with open(self.path, "rb") as f:
+                    self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except (OSError, ValueError):
+                return
+            try:
+                self._load_map(self._mmap)
+            except (ValueError, KeyError, struct.error):
+                self._close_map()
+                self._reset()
+
+    def _load_map(self, m: mmap.mmap) -> None:
+        if m[:len(MAGIC)] != MAGIC:
+            raise ValueError("cache inválida")
+        pos = len(MAGIC)
+        (size,) = _LEN.unpack_from(m, pos)
+        pos += _LEN.size
+        header = json.loads(m[pos:pos + size])
+        if header.get("version") != VERSION:
+            raise ValueError("versão da cache")
+        pos += size
+        pos += -pos % 8
+        n = header["rows"]
+        self.offsets = header["offsets"]
+        self.sellers = header["sellers"]
+        self.shops = [tuple(s) for s in header["shops"]]
+        self._seller_code = {s: i for i, s in enumerate(self.sellers)}
+        self._shop_code = {s: i for i, s in enumerate(self.shops)}
+        self.sorted = True
+        if len(m) < pos + n * 24:
+            raise ValueError("cache truncada")
+        if np is not None:
+            # Sem cópia: as colunas são vistas sobre o ficheiro
+            ts = np.frombuffer(m, np.int64, n, pos)
+            cents = np.frombuffer(m, np.int64, n, pos + 8 * n)
+            seller = np.frombuffer(m, np.int32, n, pos + 16 * n)
+            shop = np.frombuffer(m, np.int32, n, pos + 20 * n)
+            self._np = (ts, cents, seller, shop)
+            return
+        for col, start, width in ((self.ts, pos, 8), (self.cents, pos + 8 * n, 8),
+                                  (self.seller, pos + 16 * n, 4), (self.shop, pos + 20 * n, 4)):
+            col.frombytes(m[start:start + width * n])
+
+    def _close_map(self) -> None:
+        self._np = None
+        self._buf = None
+        if self._mmap is not None:
+            try:
+                self._mmap.close()
+            except BufferError:
+                pass  # ainda há vistas NumPy em uso; o GC fecha-o
+            self._mmap = None
+
+    def close(self) -> None:
+        with self._lock:
+            self._close_map()
+            self._reset()
+
+    # ---------- Construção ----------
+    def _code(self, table: Dict, values: List, key) -> int:
+        code = table.get(key)
+        if code is None:
+            code = table[key] = len(values)
+            values.append(key)
+        return code
+
+    def append(self, invoice: Dict, shop: Tuple[str, str]) -> None:
+        """Acrescenta uma venda às colunas (não grava)."""
+        try:
+            ts = to_epoch(invoice["timestamp"])
+        except Exception:
+            ts = UNDATED
+        try:
+            cents = int(round(float(invoice.get("total_with_vat", 0.0)) * 100))
+        except (TypeError, ValueError):
+            cents = 0
+        if self.sorted and len(self) and ts < self._last_ts():
+            self.sorted = False
+        self.ts.append(ts)
+        self.cents.append(cents)
+        self.seller.append(self._code(self._seller_code, self.sellers, invoice.get("seller", "?")))
+        self.shop.append(self._code(self._shop_code, self.shops, tuple(shop)))
+        self.dirty = True
+
+    def _last_ts(self) -> int:
+        if len(self.ts):
+            return self.ts[-1]
+        return int(self._np[0][-1])
+
+    def catch_up(self, sales: PartitionedSales, resolve: ShopResolver) -> int:
+        """Converte as vendas das partições que ainda não estão nas colunas."""
+        with self._lock:
+            names = sales.partitions()
+            if any(name not in names for name in self.offsets):
+                return self.rebuild(sales, resolve)
+            n = 0
+            for name in names:
+                path = sales.journal(name).path
+                offset = self.offsets.get(name, 0)
+                size = path.stat().st_size
+                if size < offset:
+                    return self.rebuild(sales, resolve)
+                if size == offset:
+                    continue
+                with open(path, "rb") as f:
+                    f.seek(offset)
+                    for line in f:
+                        if not line.endswith(b"\n"):
+                            break  # escrita ainda em curso noutro processo
+                        offset += len(line)
+                        line = line.strip()
+                        if line:
+                            invoice = json.loads(line)
+                            self.append(invoice, resolve(invoice))
+                            n += 1
+                self.offsets[name] = offset
+                self.dirty = True
+            return n
+
+    def rebuild(self, sales: PartitionedSales, resolve: ShopResolver) -> int:
+        with self._lock:
+            self._close_map()
+            self._reset()
+            return self.catch_up(sales, resolve)
+
+    def _merge_tail(self) -> None:
+        """Passa as vendas acrescentadas (``array``) para o fim das colunas NumPy."""
+        n = len(self._np[0]) if self._np is not None else 0
+        need = n + len(self.ts)
+        if self._buf is None or len(self._buf[0]) < need:
+            capacity = max(need, 2 * (len(self._buf[0]) if self._buf is not None else n), 1024)
+            buf = tuple(np.empty(capacity, dtype) for dtype in (np.int64, np.int64, np.int32, np.int32))
+            if n:
+                for b, col in zip(buf, self._np):
+                    b[:n] = col
+            self._buf = buf
+        for b, col, dtype in zip(self._buf, (self.ts, self.cents, self.seller, self.shop),
+                                 (np.int64, np.int64, np.int32, np.int32)):
+            b[n:need] = np.frombuffer(col, dtype)
+        self._np = tuple(b[:need] for b in self._buf)
+        self.ts, self.cents = array("q"), array("q")
+        self.seller, self.shop = array("i"), array("i")
+
+    def _columns(self):
+        """As quatro colunas completas e ordenadas (NumPy ou ``array``)."""
+        with self._lock:
+            if np is not None:
+                if self._np is None or len(self.ts):
+                    self._merge_tail()
+                if not self.sorted:
+                    order = np.argsort(self._np[0], kind="stable")
+                    for col in self._np:
+                        col[:] = col[order]
+                    self.sorted = True
+                return self._np
+            if not self.sorted:
+                order = sorted(range(len(self.ts)), key=self.ts.__getitem__)
+                self.ts = array("q", (self.ts[i] for i in order))
+                self.cents = array("q", (self.cents[i] for i in order))
+                self.seller = array("i", (self.seller[i] for i in order))
+                self.shop = array("i", (self.shop[i] for i in order))
+                self.sorted = True
+            return self.ts, self.cents, self.seller, self.shop
+
+    def save(self) -> None:
+        """Grava a cache (só se houver vendas novas desde a última gravação)."""
+        with self._lock:
+            if not self.dirty:
+                return
+            ts, cents, seller, shop = self._columns()
+            header = json.dumps({
+                "version": VERSION, "rows": len(ts), "offsets": self.offsets,
+                "sellers": self.sellers, "shops": self.shops,
+            }, ensure_ascii=False).encode("utf-8")
+            head = MAGIC + _LEN.pack(len(header)) + header
+            head += b"\0" * (-len(head) % 8)
+            cols = [bytes(c) if np is None else c.tobytes() for c in (ts, cents, seller, shop)]
+            data = b"".join([head] + cols)
+            self.dirty = False
+        atomic_write(self.path, data)
+
+    # ---------- Consultas ----------
+    def _select(self, since: Bound, until: Bound, sellers: Optional[Iterable[str]],
+                company: Optional[str], shop_type: Optional[str]):
+        """Fatia do intervalo e os filtros de vendedor/loja como códigos."""
+        ts, cents, seller, shop = self._columns()
+        lo, hi = 0, len(ts)
+        if since is not None or until is not None:
+            # Com intervalo as vendas sem data ficam de fora
+            lo = self._search(ts, UNDATED + 1)
+        if since is not None:
+            lo = max(lo, self._search(ts, to_epoch(to_datetime(since))))
+        if until is not None:
+            hi = self._search(ts, to_epoch(to_datetime(until)))
+        seller_codes = None
+        if sellers is not None:
+            seller_codes = {self._seller_code[s] for s in sellers if s in self._seller_code}
+        shop_codes = None
+        if company is not None or shop_type is not None:
+            shop_codes = {i for i, (c, t) in enumerate(self.shops)
+                          if (company is None or c == company)
+                          and (shop_type is None or t == shop_type)}
+        return (ts, cents, seller, shop), max(lo, 0), max(hi, lo), seller_codes, shop_codes
+
+    @staticmethod
+    def _search(ts, value: int) -> int:
+        if np is not None:
+            return int(np.searchsorted(ts, value, side="left"))
+        return bisect_left(ts, value)
+
+    def totals(self, by: str = "month", since: Bound = None, until: Bound = None,
+               sellers: Optional[Iterable[str]] = None, company: Optional[str] = None,
+               shop_type: Optional[str] = None) -> Dict[str, float]:
+        """Total c/ IVA por grupo (``GROUPS``) das vendas que passam os filtros.
+
+        Chaves: mês ``AAAA-MM``, dia ``AAAA-MM-DD``, vendedor, loja
+        ``empresa/tipo``, hora ``HH`` ou dia da semana ``0`` (segunda) a ``6``.
+        """
+        if by not in GROUPS:
+            raise ValueError(f"Agrupamento desconhecido: {by}")
+        with self._lock:
+            cols, lo, hi, seller_codes, shop_codes = self._select(
+                since, until, sellers, company, shop_type)
+            if hi <= lo:
+                return {}
+            if np is not None:
+                return self._totals_np(by, cols, lo, hi, seller_codes, shop_codes)
+            return self._totals_py(by, cols, lo, hi, seller_codes, shop_codes)
+
+    def _totals_np(self, by, cols, lo, hi, seller_codes, shop_codes) -> Dict[str, float]:
+        ts, cents, seller, shop = (c[lo:hi] for c in cols)
+        mask = None
+        if seller_codes is not None:
+            mask = np.isin(seller, np.fromiter(seller_codes, np.int32, len(seller_codes)))
+        if shop_codes is not None:
+            m = np.isin(shop, np.fromiter(shop_codes, np.int32, len(shop_codes)))
+            mask = m if mask is None else mask & m
+        if by in ("month", "day", "hour", "weekday"):
+            dated = ts > UNDATED
+            mask = dated if mask is None else mask & dated
+        if mask is not None:
+            ts, cents, seller, shop = ts[mask], cents[mask], seller[mask], shop[mask]
+        if not len(ts):
+            return {}
+        if by == "month":
+            # ts está ordenado: cada mês é uma fatia contígua
+            names, starts = _month_edges(int(ts[0]), int(ts[-1]))
+            idx = np.searchsorted(ts, np.asarray(starts, np.int64), side="left")
+            sums = np.add.reduceat(cents, idx)
+            counts = np.diff(np.append(idx, len(ts)))
+            return {name: int(s) / 100 for name, s, c in zip(names, sums, counts) if c}
+        if by == "seller":
+            keys, codes = self.sellers, seller
+        elif by == "shop":
+            keys, codes = [f"{c}/{t}" for c, t in self.shops], shop
+        elif by == "day":
+            days = ts // 86400
+            first = int(days[0])
+            codes = days - first
+            keys = None
+        elif by == "hour":
+            keys, codes = [f"{h:02d}" for h in range(24)], (ts % 86400) // 3600
+        else:
+            keys, codes = [str(d) for d in range(7)], (ts // 86400 + 3) % 7
+        sums = np.bincount(codes, weights=cents)
+        present = np.bincount(codes)
+        if keys is None:
+            return {from_epoch((first + int(i)) * 86400).strftime("%Y-%m-%d"):
+                    round(float(sums[i]) / 100, 2) for i in np.nonzero(present)[0]}
+        return {keys[i]: round(float(sums[i]) / 100, 2) for i in np.nonzero(present)[0]}
+
+    def _totals_py(self, by, cols, lo, hi, seller_codes, shop_codes) -> Dict[str, float]:
+        ts, cents, seller, shop = cols
+        if by == "month" and seller_codes is None and shop_codes is None:
+            # Sem filtros por linha: uma soma por fatia de mês (pesquisa binária)
+            lo = max(lo, bisect_left(ts, UNDATED + 1, lo, hi))
+            if hi <= lo:
+                return {}
+            names, starts = _month_edges(ts[lo], ts[hi - 1])
+            bounds = [max(lo, bisect_left(ts, s, lo, hi)) for s in starts] + [hi]
+            return {name: sum(cents[a:b]) / 100
+                    for name, a, b in zip(names, bounds, bounds[1:]) if b > a}
+        if by == "month":
+            first = bisect_left(ts, UNDATED + 1, lo, hi)
+            if first >= hi:
+                return {}
+            names, starts = _month_edges(ts[first], ts[hi - 1])
+        sums: Dict = {}
+        for i in range(lo, hi):
+            if seller_codes is not None and seller[i] not in seller_codes:
+                continue
+            if shop_codes is not None and shop[i] not in shop_codes:
+                continue
+            t = ts[i]
+            if by == "seller":
+                key = seller[i]
+            elif by == "shop":
+                key = shop[i]
+            elif t == UNDATED:
+                continue
+            elif by == "month":
+                key = bisect_right(starts, t) - 1
+            elif by == "day":
+                key = t // 86400
+            elif by == "hour":
+                key = (t % 86400) // 3600
+            else:
+                key = (t // 86400 + 3) % 7
+            sums[key] = sums.get(key, 0) + cents[i]
+        if by == "seller":
+            return {self.sellers[k]: v / 100 for k, v in sums.items()}
+        if by == "shop":
+            return {"/".join(self.shops[k]): v / 100 for k, v in sums.items()}
+        if by == "month":
+            return {names[k]: v / 100 for k, v in sorted(sums.items())}
+        if by == "day":
+            return {from_epoch(k * 86400).strftime("%Y-%m-%d"): v / 100
+                    for k, v in sorted(sums.items())}
+        if by == "hour":
+            return {f"{k:02d}": v / 100 for k, v in sorted(sums.items())}
+        return {str(k): v / 100 for k, v in sorted(sums.items())}
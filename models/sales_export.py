@@ -0,0 +1,117 @@
+"""Exportação de vendas em streaming (CSV ou JSON Lines, opcionalmente gzip).
+
+As vendas chegam uma a uma do backend e cada linha é escrita logo, por isso
+a memória usada não depende do número de vendas exportadas. O ficheiro é
+escrito com um nome temporário e só no fim passa a ter o nome pedido: uma
+exportação cancelada ou falhada não deixa um ficheiro a meio.
+
+Há dois níveis de detalhe:
+
+- ``"headers"``: uma linha por fatura (totais);
+- ``"items"``: uma linha por linha de fatura, com os dados da fatura repetidos.
+
+O formato sai da extensão do ficheiro (``.csv``, ``.jsonl``, com ``.gz``
+no fim para comprimir), ou pode ser indicado explicitamente.
+"""
+import csv
+import gzip
+import json
+import os
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+Progress = Optional[Callable[[int], None]]
+Cancelled = Optional[Callable[[], bool]]
+
+FORMATS = ("csv", "jsonl")
+DETAILS = ("headers", "items")
+
+HEADER_FIELDS = ["id", "timestamp", "seller", "company", "shop_type",
+                 "total_no_vat", "vat_rate", "total_with_vat"]
+ITEM_FIELDS = ["invoice_id", "timestamp", "seller", "company", "shop_type",
+               "code", "name", "qty", "price_no_vat", "subtotal"]
+
+# De quantas em quantas vendas se chama o progresso e se verifica o cancelamento
+PROGRESS_EVERY = 500
+
+
+class ExportCancelled(Exception):
+    """A exportação foi cancelada pelo utilizador."""
+
+
+def guess_format(path: Path) -> Tuple[str, bool]:
+    """(formato, gzip) a partir do nome do ficheiro; CSV por omissão."""
+    suffixes = [s.lower() for s in Path(path).suffixes]
+    compress = bool(suffixes) and suffixes[-1] == ".gz"
+    if compress:
+        suffixes = suffixes[:-1]
+    fmt = "jsonl" if suffixes and suffixes[-1] in (".jsonl", ".json") else "csv"
+    return fmt, compress
+
+
+def sale_rows(s: Dict, detail: str = "headers") -> Iterator[Dict]:
+    """Linhas a exportar de uma venda (com ``"items"``, nenhuma se não tiver artigos)."""
+    if detail == "headers":
+        yield {f: s.get(f) for f in HEADER_FIELDS}
+        return
+    for it in s.get("items", []):
+        qty, price = it.get("qty", 0), it.get("price_no_vat", 0.0)
+        yield {
+            "invoice_id": s.get("id"), "timestamp": s.get("timestamp"),
+            "seller": s.get("seller"), "company": s.get("company"),
+            "shop_type": s.get("shop_type"), "code": it.get("code"),
+            "name": it.get("name"), "qty": qty, "price_no_vat": price,
+            "subtotal": round(qty * price, 2),
+        }
+
+
+def write_export(sales: Iterable[Dict], path: Path, detail: str = "headers",
+                 fmt: Optional[str] = None, compress: Optional[bool] = None,
+                 progress: Progress = None, cancelled: Cancelled = None) -> int:
+    """Escreve as vendas em ``path`` e devolve o número de vendas exportadas.
+
+    ``progress(n)`` recebe o número de vendas lidas; se ``cancelled()``
+    devolver True a exportação para com ``ExportCancelled``. As vendas são
+    contadas mesmo que não produzam linhas (sem artigos, com ``"items"``).
+    """
+    path = Path(path)
+    guessed_fmt, guessed_gzip = guess_format(path)
+    fmt = fmt or guessed_fmt
+    compress = guessed_gzip if compress is None else compress
+    if fmt not in FORMATS:
+        raise ValueError(f"Formato de exportação inválido: {fmt}")
+    if detail not in DETAILS:
+        raise ValueError(f"Detalhe de exportação inválido: {detail}")
+    fields: List[str] = HEADER_FIELDS if detail == "headers" else ITEM_FIELDS
+
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    opener = gzip.open if compress else open
+    count = 0
+    try:
+        with opener(tmp, "wt", encoding="utf-8", newline="") as f:
+            if fmt == "csv":
+                writer = csv.DictWriter(f, fieldnames=fields, delimiter=";")
+                writer.writeheader()
+                write = writer.writerow
+            else:
+                def write(row, _dumps=json.dumps):
+                    f.write(_dumps(row, ensure_ascii=False) + "\n")
+            for sale in sales:
+                count += 1
+                if count % PROGRESS_EVERY == 0:
+                    if cancelled and cancelled():
+                        raise ExportCancelled("Exportação cancelada.")
+                    if progress:
+                        progress(count)
+                for row in sale_rows(sale, detail):
+                    write(row)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            tmp.unlink()
+        except OSError:
+            pass
+        raise
+    if progress:
+        progress(count)
+    return count
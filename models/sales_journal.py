@@ -0,0 +1,211 @@
+"""Diário de vendas append-only em JSON Lines (uma fatura por linha)."""
+import json
+import os
+from pathlib import Path
+from types import MappingProxyType
+from typing import Any, Dict, Iterator, List, Tuple
+
+from .file_cache import FILE_CACHE, file_stamp
+
+CHUNK_SIZE = 1 << 16
+
+
+def iter_json_array(path: Path, chunk_size: int = CHUNK_SIZE) -> Iterator[Any]:
+    """Percorre os elementos de um ficheiro ``[...]`` sem o carregar inteiro.
+
+    Lê blocos de ``chunk_size`` caracteres e interpreta um elemento de cada
+    vez com ``JSONDecoder.raw_decode``. Um ficheiro vazio ou que não seja uma
+    lista não produz nada; JSON inválido levanta ``ValueError``.
+    """
+    decoder = json.JSONDecoder()
+    with open(path, encoding="utf-8") as f:
+        buf, pos, eof = "", 0, False
+
+        def fill() -> None:
+            nonlocal buf, pos, eof
+            chunk = f.read(chunk_size)
+            eof = not chunk
+            buf, pos = buf[pos:] + chunk, 0
+
+        def skip_ws() -> bool:
+            """Avança até ao próximo carácter útil; False no fim do ficheiro."""
+            nonlocal pos
+            while True:
+                while pos < len(buf) and buf[pos].isspace():
+                    pos += 1
+                if pos < len(buf):
+                    return True
+                if eof:
+                    return False
+                fill()
+
+        if not skip_ws() or buf[pos] != "[":
+            return
+        pos += 1
+        while skip_ws():
+            if buf[pos] == "]":
+                return
+            if buf[pos] == ",":
+                pos += 1
+                continue
+            try:
+                value, end = decoder.raw_decode(buf, pos)
+            except ValueError:
+                if eof:
+                    raise
+                fill()
+                continue
+            if end == len(buf) and not eof:
+                # Pode ser um número cortado a meio pelo bloco: ler mais e repetir
+                fill()
+                continue
+            pos = end
+            yield value
+        raise ValueError(f"Lista JSON incompleta: {path}")
+
+
+def iter_jsonl(path: Path) -> Iterator[Dict]:
+    """Linhas completas de um ficheiro .jsonl, uma a uma e sem o alterar.
+
+    Uma última linha sem ``\\n`` (escrita interrompida) é ignorada.
+    """
+    with open(path, "rb") as f:
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+class SalesJournal:
+    """Ficheiro .jsonl onde cada fatura é acrescentada no fim.
+
+    Cada ``append`` escreve uma única linha e faz fsync, por isso o custo de
+    registar uma venda não depende do tamanho do histórico. Uma linha
+    incompleta no fim (falha a meio de uma escrita) é descartada ao abrir.
+
+    ``records()``/``views()`` passam pela FILE_CACHE: quando o ficheiro
+    cresce só se interpretam as linhas novas. Iterar o diário usa a cache se
+    já estiver carregada e, caso contrário, lê o ficheiro linha a linha sem
+    o guardar em memória.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if not self.path.exists():
+            self.path.touch()
+        self._repair_tail()
+
+    def _repair_tail(self) -> None:
+        """Corta uma última linha sem '\\n' deixada por uma escrita interrompida."""
+        size = self.path.stat().st_size
+        if size == 0:
+            return
+        with self.path.open("rb+") as f:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) == b"\n":
+                return
+            # Recuar até ao último '\n' completo
+            pos = size
+            block = 4096
+            while pos > 0:
+                step = min(block, pos)
+                pos -= step
+                f.seek(pos)
+                chunk = f.read(step)
+                idx = chunk.rfind(b"\n")
+                if idx != -1:
+                    f.truncate(pos + idx + 1)
+                    return
+            f.truncate(0)
+
+    @staticmethod
+    def encode(record: Dict) -> bytes:
+        return (json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+
+    def append(self, record: Dict) -> Tuple[int, int]:
+        """Acrescenta uma fatura e garante que chegou ao disco (fsync).
+
+        Devolve os offsets (início, fim) da linha escrita.
+        """
+        data = self.encode(record)
+        before = file_stamp(self.path)
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, data)
+            os.fsync(fd)
+            end = os.lseek(fd, 0, os.SEEK_CUR)
+        finally:
+            os.close(fd)
+        FILE_CACHE.appended(self.path, record, before)
+        return end - len(data), end
+
+    @staticmethod
+    def _read_from(path: Path, records: list, offset: int) -> int:
+        """Lê as linhas completas a partir de ``offset``; devolve o novo offset."""
+        with open(path, "rb") as f:
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    # Escrita ainda em curso noutro processo: fica para a próxima
+                    break
+                offset += len(line)
+                line = line.strip()
+                if line:
+                    records.append(json.loads(line))
+        return offset
+
+    @classmethod
+    def _load_all(cls, path: Path) -> Tuple[list, int]:
+        records: list = []
+        return records, cls._read_from(path, records, 0)
+
+    def records(self) -> List[Dict]:
+        """Lista interna em cache (só para leitura dentro dos backends)."""
+        return FILE_CACHE.get(self.path, self._load_all, self._read_from)
+
+    def views(self) -> List[MappingProxyType]:
+        """Faturas como vistas só de leitura."""
+        return FILE_CACHE.view(self.path, self._load_all, self._read_from)
+
+    def stream(self) -> Iterator[Dict]:
+        """Faturas uma a uma, com memória constante se o diário não estiver em cache."""
+        cached = FILE_CACHE.peek(self.path)
+        if cached is not None:
+            # Só até ao fim atual: appends durante a iteração ficam de fora
+            for i in range(len(cached)):
+                yield cached[i]
+            return
+        yield from iter_jsonl(self.path)
+
+    def __iter__(self) -> Iterator[Dict]:
+        return self.stream()
+
+    def migrate_legacy(self, legacy: Path) -> int:
+        """Converte o antigo sales.json (lista) para este diário.
+
+        O diário é escrito num ficheiro temporário e só depois trocado, e o
+        ficheiro antigo fica guardado como ``sales.json.migrated``. Um
+        sales.json ilegível ou incompleto levanta o erro (``ValueError`` se o
+        JSON for inválido) e fica intacto, tal como o diário.
+        """
+        legacy = Path(legacy)
+        n = 0
+        tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+        try:
+            with tmp.open("wb") as f:
+                for r in iter_json_array(legacy):
+                    if isinstance(r, dict):
+                        f.write(self.encode(r))
+                        n += 1
+                f.flush()
+                os.fsync(f.fileno())
+        except BaseException:
+            tmp.unlink(missing_ok=True)
+            raise
+        os.replace(tmp, self.path)
+        FILE_CACHE.invalidate(self.path)
+        legacy.replace(legacy.with_name(legacy.name + ".migrated"))
+        return n
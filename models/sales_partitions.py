@@ -0,0 +1,258 @@
+"""Vendas particionadas por mês: ``data/sales/AAAA-MM.jsonl`` + manifesto.
+
+Cada partição é um SalesJournal (append-only). O manifesto
+(``data/sales/manifest.json``) guarda, por partição, a primeira e a última
+data, o número de vendas, o total faturado e o tamanho do ficheiro. As
+leituras por intervalo de datas só abrem as partições que o intervalo toca,
+e as partições antigas leem-se sem carregar as mais recentes.
+
+O manifesto é apenas um acelerador: a lista de partições vem da pasta e
+uma partição cujo tamanho não bate certo com o manifesto é recontada.
+"""
+import json
+import os
+import shutil
+import threading
+from datetime import date, datetime
+from pathlib import Path
+from types import MappingProxyType
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
+
+from .atomic_io import GroupCommitter, fsync_dir
+from .sales_journal import SalesJournal, iter_json_array
+
+Bound = Union[None, str, date, datetime]
+
+# Vendas sem data válida ficam numa partição própria, antes de todas as outras
+UNDATED = "0000-00"
+
+
+def to_datetime(value: Bound) -> Optional[datetime]:
+    """Converte um limite (data, datetime ou texto ISO) para datetime."""
+    if value is None or isinstance(value, datetime):
+        return value
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day)
+    return datetime.fromisoformat(value)
+
+
+def partition_of(invoice: Dict) -> str:
+    try:
+        return datetime.fromisoformat(invoice["timestamp"]).strftime("%Y-%m")
+    except Exception:
+        return UNDATED
+
+
+class PartitionedSales:
+    """Conjunto de partições mensais de vendas."""
+
+    def __init__(self, folder: Path, committer: Optional[GroupCommitter] = None,
+                 lock: Optional[threading.RLock] = None) -> None:
+        self.folder = Path(folder)
+        self.folder.mkdir(parents=True, exist_ok=True)
+        self.committer = committer or GroupCommitter("always")
+        self._lock = lock or threading.RLock()
+        self.manifest_path = self.folder / "manifest.json"
+        self._journals: Dict[str, SalesJournal] = {}
+        self.refresh()
+
+    def refresh(self) -> None:
+        """Relê o manifesto do disco (ex.: escrito por outra caixa) e confirma-o."""
+        try:
+            manifest = json.loads(self.manifest_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            manifest = {}
+        self.manifest: Dict[str, Dict] = manifest.get("partitions", {}) if isinstance(manifest, dict) else {}
+        self._reconcile()
+
+    # ---------- Partições ----------
+    def partitions(self) -> List[str]:
+        """Nomes das partições existentes, por ordem cronológica."""
+        return sorted(p.stem for p in self.folder.glob("*.jsonl"))
+
+    def journal(self, name: str) -> SalesJournal:
+        j = self._journals.get(name)
+        if j is None:
+            j = self._journals[name] = SalesJournal(self.folder / f"{name}.jsonl")
+        return j
+
+    @staticmethod
+    def _new_stats() -> Dict:
+        return {"first": None, "last": None, "count": 0, "total": 0.0, "size": 0}
+
+    @staticmethod
+    def _add_stats(stats: Dict, invoice: Dict) -> None:
+        ts = invoice.get("timestamp")
+        if isinstance(ts, str):
+            if stats["first"] is None or ts < stats["first"]:
+                stats["first"] = ts
+            if stats["last"] is None or ts > stats["last"]:
+                stats["last"] = ts
+        stats["count"] += 1
+        stats["total"] = round(stats["total"] + float(invoice.get("total_with_vat", 0.0)), 2)
+
+    def _recount(self, name: str) -> None:
+        stats = self._new_stats()
+        for invoice in self.journal(name):
+            self._add_stats(stats, invoice)
+        stats["size"] = (self.folder / f"{name}.jsonl").stat().st_size
+        self.manifest[name] = stats
+
+    def _reconcile(self) -> None:
+        """Recontar as partições cujo ficheiro não corresponde ao manifesto."""
+        changed = False
+        names = self.partitions()
+        for name in list(self.manifest):
+            if name not in names:
+                del self.manifest[name]
+                changed = True
+        for name in names:
+            self.journal(name)  # repara uma eventual linha cortada
+            size = (self.folder / f"{name}.jsonl").stat().st_size
+            if self.manifest.get(name, {}).get("size") != size:
+                self._recount(name)
+                changed = True
+        if changed:
+            self.save_manifest()
+
+    def _encode_manifest(self) -> bytes:
+        with self._lock:
+            return json.dumps({"partitions": self.manifest}, ensure_ascii=False,
+                              separators=(",", ":")).encode("utf-8")
+
+    def save_manifest(self) -> None:
+        self.committer.write(self.manifest_path, self._encode_manifest)
+
+    # ---------- Escrita ----------
+    def append(self, invoice: Dict) -> Tuple[str, int, int]:
+        """Acrescenta a venda à partição do seu mês; devolve (partição, início, fim)."""
+        name = partition_of(invoice)
+        start, end = self.journal(name).append(invoice)
+        with self._lock:
+            stats = self.manifest.setdefault(name, self._new_stats())
+            if stats["size"] == start:
+                self._add_stats(stats, invoice)
+                stats["size"] = end
+            else:
+                # Outra caixa escreveu nesta partição: recontar só esta
+                self._recount(name)
+        self.save_manifest()
+        return name, start, end
+
+    # ---------- Leitura ----------
+    def select(self, since: Bound = None, until: Bound = None) -> List[str]:
+        """Partições que podem ter vendas em [since, until)."""
+        since_dt, until_dt = to_datetime(since), to_datetime(until)
+        lo = since_dt.strftime("%Y-%m") if since_dt else None
+        hi = until_dt.strftime("%Y-%m") if until_dt else None
+        selected = []
+        for name in self.partitions():
+            if name == UNDATED:
+                # Vendas sem data só aparecem em consultas sem limites
+                if lo is None and hi is None:
+                    selected.append(name)
+                continue
+            if lo is not None and name < lo:
+                continue
+            if hi is not None and name > hi:
+                continue
+            selected.append(name)
+        return selected
+
+    def _scan(self, since: Bound, until: Bound, cached: bool) -> Iterator[Dict]:
+        since_dt, until_dt = to_datetime(since), to_datetime(until)
+        lo = since_dt.strftime("%Y-%m") if since_dt else None
+        hi = until_dt.strftime("%Y-%m") if until_dt else None
+        for name in self.select(since, until):
+            journal = self.journal(name)
+            records = journal.views() if cached else journal.stream()
+            # Só as partições das pontas precisam de ver a data de cada venda
+            if name == UNDATED or (name != lo and name != hi):
+                yield from records
+                continue
+            for invoice in records:
+                try:
+                    ts = datetime.fromisoformat(invoice["timestamp"])
+                except Exception:
+                    continue
+                if (since_dt is None or ts >= since_dt) and (until_dt is None or ts < until_dt):
+                    yield invoice
+
+    def iter(self, since: Bound = None, until: Bound = None) -> Iterator[Dict]:
+        """Vendas com ``since <= timestamp < until``, lendo só as partições necessárias.
+
+        As partições que não estejam em cache são lidas linha a linha, por
+        isso a memória usada não depende do tamanho do histórico.
+        """
+        return self._scan(since, until, cached=False)
+
+    def views(self, since: Bound = None, until: Bound = None) -> List[MappingProxyType]:
+        """Como ``iter``, mas numa lista de vistas só de leitura (partições em cache)."""
+        return list(self._scan(since, until, cached=True))
+
+    def __iter__(self) -> Iterator[Dict]:
+        return self.iter()
+
+    def monthly_totals(self, since: Bound = None, until: Bound = None) -> Dict[str, float]:
+        """Total por mês sem ler vendas, a partir do manifesto (limites ao mês)."""
+        return {
+            name: self.manifest[name]["total"]
+            for name in self.select(since, until)
+            if name != UNDATED and name in self.manifest
+        }
+
+
+def migrate_to_partitions(folder: Path, *sources: Path) -> int:
+    """Converte o diário único (sales.jsonl) e/ou o sales.json antigo em partições.
+
+    As partições são escritas numa pasta temporária que só no fim passa a
+    ser ``folder``; os ficheiros de origem ficam guardados com o sufixo
+    ``.migrated``. Se a pasta já tiver partições não se importa nada. Todas
+    as origens são importadas, pela ordem dada; uma venda cujo número já
+    veio de uma origem anterior é ignorada. As vendas são lidas e escritas
+    uma a uma; um sales.json com JSON inválido levanta ``ValueError`` e
+    fica intacto. Devolve quantas vendas foram escritas.
+    """
+    folder = Path(folder)
+    sources = tuple(Path(s) for s in sources if Path(s).exists())
+    n = 0
+    if not any(folder.glob("*.jsonl")) and sources:
+        tmp = folder.with_name(folder.name + ".migrating")
+        shutil.rmtree(tmp, ignore_errors=True)
+        tmp.mkdir(parents=True)
+        # Um ficheiro aberto por mês: a memória não depende do tamanho do histórico
+        files: Dict[str, BinaryIO] = {}
+        # Números de fatura das origens já importadas (só os números, não as vendas)
+        seen: Set[str] = set()
+        try:
+            for source in sources:
+                if source.suffix == ".jsonl":
+                    records: Iterable = SalesJournal(source).stream()
+                else:
+                    records = iter_json_array(source)
+                ids = set()
+                for r in records:
+                    if not isinstance(r, dict) or r.get("id") in seen:
+                        continue
+                    ids.add(r.get("id"))
+                    name = partition_of(r)
+                    if name not in files:
+                        files[name] = open(tmp / f"{name}.jsonl", "wb")
+                    files[name].write(SalesJournal.encode(r))
+                    n += 1
+                seen |= ids
+            for f in files.values():
+                f.flush()
+                os.fsync(f.fileno())
+        finally:
+            for f in files.values():
+                f.close()
+        fsync_dir(tmp)
+        # Pode existir só com um manifesto vazio
+        shutil.rmtree(folder, ignore_errors=True)
+        os.replace(tmp, folder)
+        fsync_dir(folder.parent)
+    # Também no caso de uma migração interrompida depois de trocar a pasta
+    for source in sources:
+        os.replace(source, source.with_name(source.name + ".migrated"))
+    return n
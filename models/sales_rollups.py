@@ -0,0 +1,178 @@
+"""Totais de vendas materializados por loja (mês, vendedor e dia).
+
+Os totais ficam em ``data/sales_rollups.json`` e são atualizados em O(1) a
+cada fatura, por isso o dashboard não precisa de percorrer o histórico.
+O ficheiro guarda, por partição mensal de vendas, até que byte já foi
+contabilizado. As próprias partições (append-only, com fsync) servem de
+diário das alterações: os totais em memória avançam a cada fatura, mas o
+ficheiro só é regravado a cada ``SAVE_EVERY`` faturas e no ``flush``/fecho.
+Se o programa parar antes, as vendas a seguir aos offsets gravados (no
+máximo ``SAVE_EVERY``) são recontadas na abertura seguinte.
+
+Reconstrução completa (recuperação):
+
+    python -m models.sales_rollups data
+"""
+import json
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple
+
+from .atomic_io import GroupCommitter
+from .sales_journal import SalesJournal
+from .sales_partitions import PartitionedSales
+
+ShopResolver = Callable[[Dict], Tuple[str, str]]
+
+# Versão 1 guardava um único offset (diário sales.jsonl); é reconstruída
+VERSION = 2
+# Faturas contabilizadas em memória antes de regravar o ficheiro dos totais
+SAVE_EVERY = 256
+
+
+def _empty() -> Dict:
+    return {"version": VERSION, "offsets": {}, "count": 0, "shops": {}}
+
+
+class SalesRollups:
+    """Agregados por (empresa, loja) × mês / vendedor / dia."""
+
+    def __init__(self, path: Path, committer: Optional[GroupCommitter] = None,
+                 lock: Optional[threading.RLock] = None, data: Optional[Dict] = None) -> None:
+        self.path = Path(path)
+        self.committer = committer or GroupCommitter("always")
+        self._lock = lock or threading.RLock()
+        self.save_every = SAVE_EVERY
+        # Faturas já nos totais em memória mas ainda não no ficheiro
+        self.unsaved = 0
+        # ``data``: totais já lidos (imagem binária); senão lê-se o JSON
+        if isinstance(data, dict) and data.get("version") == VERSION:
+            self.data = data
+        else:
+            self.reload()
+
+    def reload(self) -> None:
+        """Relê os totais do disco (ex.: gravados por outra caixa)."""
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            data = None
+        if not isinstance(data, dict) or data.get("version") != VERSION:
+            data = _empty()
+        self.data = data
+        self.unsaved = 0
+
+    def offset(self, partition: str) -> int:
+        return self.data["offsets"].get(partition, 0)
+
+    def _shop(self, company: str, shop_type: str) -> Dict:
+        shops = self.data["shops"].setdefault(company or "", {})
+        return shops.setdefault(shop_type or "", {"months": {}, "sellers": {}, "days": {}, "count": 0})
+
+    def apply(self, invoice: Dict, shop: Tuple[str, str]) -> None:
+        """Soma uma fatura aos totais da loja (não grava)."""
+        bucket = self._shop(*shop)
+        total = float(invoice.get("total_with_vat", 0.0))
+        seller = invoice.get("seller", "?")
+        bucket["sellers"][seller] = round(bucket["sellers"].get(seller, 0.0) + total, 2)
+        try:
+            dt = datetime.fromisoformat(invoice["timestamp"])
+        except Exception:
+            dt = None
+        if dt is not None:
+            month, day = dt.strftime("%Y-%m"), dt.strftime("%Y-%m-%d")
+            bucket["months"][month] = round(bucket["months"].get(month, 0.0) + total, 2)
+            bucket["days"][day] = round(bucket["days"].get(day, 0.0) + total, 2)
+        bucket["count"] += 1
+        self.data["count"] += 1
+
+    def record(self, invoice: Dict, shop: Tuple[str, str], partition: str, start: int,
+               end: int, sales: PartitionedSales, resolve: ShopResolver) -> None:
+        """Contabiliza a fatura escrita na ``partition`` entre ``start`` e ``end``.
+
+        Se houver vendas de outra caixa ainda por contar, lê-se primeiro o
+        que falta das partições. O ficheiro só é regravado a cada
+        ``save_every`` faturas (a venda já está em disco na partição).
+        """
+        if start != self.offset(partition):
+            self.catch_up(sales, resolve, save=False)
+        else:
+            self.apply(invoice, shop)
+            self.data["offsets"][partition] = end
+            self.unsaved += 1
+        if self.unsaved >= self.save_every:
+            self.save()
+
+    def catch_up(self, sales: PartitionedSales, resolve: ShopResolver, save: bool = True) -> int:
+        """Aplica as vendas das partições que ainda não estão nos totais."""
+        offsets = self.data["offsets"]
+        names = sales.partitions()
+        if any(name not in names for name in offsets):
+            # Partição apagada ou reescrita: só uma reconstrução é segura
+            return self.rebuild(sales, resolve)
+        n = 0
+        for name in names:
+            path = sales.journal(name).path
+            size = path.stat().st_size
+            if size < self.offset(name):
+                return self.rebuild(sales, resolve)
+            if size == self.offset(name):
+                continue
+            tail: list = []
+            offsets[name] = SalesJournal._read_from(path, tail, self.offset(name))
+            for invoice in tail:
+                self.apply(invoice, resolve(invoice))
+            n += len(tail)
+        if n:
+            if save:
+                self.save()
+            else:
+                self.unsaved += n
+        return n
+
+    def rebuild(self, sales: PartitionedSales, resolve: ShopResolver) -> int:
+        """Recalcula todos os totais a partir das partições."""
+        self.data = _empty()
+        n = self.catch_up(sales, resolve, save=False)
+        self.save()
+        return n
+
+    def _encode(self) -> bytes:
+        with self._lock:
+            return json.dumps(self.data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    def save(self) -> None:
+        self.unsaved = 0
+        self.committer.write(self.path, self._encode)
+
+    def save_pending(self) -> None:
+        """Grava os totais se houver faturas contabilizadas só em memória."""
+        if self.unsaved:
+            self.save()
+
+    # ---------- Consultas ----------
+    def _get(self, company: str, shop_type: str, kind: str) -> Dict[str, float]:
+        bucket = self.data["shops"].get(company or "", {}).get(shop_type or "")
+        return dict(bucket[kind]) if bucket else {}
+
+    def monthly(self, company: str, shop_type: str) -> Dict[str, float]:
+        return self._get(company, shop_type, "months")
+
+    def by_seller(self, company: str, shop_type: str) -> Dict[str, float]:
+        return self._get(company, shop_type, "sellers")
+
+    def daily(self, company: str, shop_type: str) -> Dict[str, float]:
+        return self._get(company, shop_type, "days")
+
+
+if __name__ == "__main__":
+    import sys
+
+    from .json_storage import JsonStorage
+
+    data_dir = Path(sys.argv[1] if len(sys.argv) > 1 else "data")
+    storage = JsonStorage(data_dir / "users.json", data_dir / "products.json", data_dir / "sales.json")
+    n = storage.rebuild_rollups()
+    storage.close()
+    print(f"Totais reconstruídos a partir de {n} vendas -> {storage.rollups.path}")
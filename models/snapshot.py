@@ -0,0 +1,149 @@
+"""Imagem binária dos dados para um arranque rápido.
+
+Ler ``users.json``/``products.json`` e os totais das vendas
+(``sales_rollups.json``) com ``json.loads`` domina o primeiro login e a
+primeira construção da página de vendas quando o catálogo é grande. A
+imagem ``data/snapshot.bin`` guarda os mesmos registos em formato
+``marshal`` e lê-se com uma única leitura:
+
+    MAGIC | versão | versão marshal | Python (maior, menor) | CRC32 | tamanho | corpo
+
+O corpo é ``{nome: (assinatura, dados)}``, em que a assinatura é a do
+ficheiro JSON de origem (inode, mtime_ns, tamanho) no momento em que a
+imagem foi gravada. Os índices dos produtos e dos utilizadores vão na
+mesma imagem: o ``marshal`` mantém as referências partilhadas, por isso
+voltam a apontar para os mesmos dicts da lista e não são reconstruídos.
+
+Na abertura só se usam as entradas cuja assinatura ainda corresponde ao
+ficheiro; as outras (ex.: alteradas por outra caixa) são lidas do JSON
+como antes. Uma imagem inválida, de outra versão ou com
+o CRC errado é ignorada por inteiro. O JSON continua a ser a fonte de
+verdade: a imagem é apenas um acelerador e pode ser apagada.
+
+Comparação com o caminho JSON:
+
+    python -m models.snapshot data
+"""
+import gc
+import json
+import marshal
+import struct
+import sys
+import time
+import zlib
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from .atomic_io import atomic_write
+from .file_cache import Stamp, file_stamp
+
+MAGIC = b"POSSNAP1"
+VERSION = 1
+_HEADER = struct.Struct("<8sHHBBxxIQ")
+
+Entries = Dict[str, Tuple[Stamp, Any]]
+
+
+def encode(entries: Entries) -> bytes:
+    """Serializa as entradas (chamar com os dados protegidos pelo lock do backend)."""
+    body = marshal.dumps({name: (tuple(stamp), data) for name, (stamp, data) in entries.items()})
+    head = _HEADER.pack(MAGIC, VERSION, marshal.version, sys.version_info[0],
+                        sys.version_info[1], zlib.crc32(body), len(body))
+    return head + body
+
+
+def decode(raw: bytes) -> Entries:
+    """Lê uma imagem; ValueError se não for utilizável."""
+    if len(raw) < _HEADER.size:
+        raise ValueError("imagem truncada")
+    magic, version, marshal_version, major, minor, crc, size = _HEADER.unpack_from(raw)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("formato desconhecido")
+    if (marshal_version, major, minor) != (marshal.version, *sys.version_info[:2]):
+        raise ValueError("gravada por outra versão do Python")
+    body = memoryview(raw)[_HEADER.size:]
+    if len(body) != size or zlib.crc32(body) != crc:
+        raise ValueError("CRC errado")
+    entries = marshal.loads(body)
+    if not isinstance(entries, dict):
+        raise ValueError("conteúdo inválido")
+    return entries
+
+
+class Snapshot:
+    """Imagem ``snapshot.bin`` de um backend JSON."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        # Assinaturas gravadas na última leitura/escrita (evita regravar o mesmo)
+        self.stamps: Dict[str, Stamp] = {}
+        self.report: Dict[str, Any] = {}
+
+    def load(self, sources: Dict[str, Path]) -> Entries:
+        """Entradas ainda válidas para ``sources`` ({nome: ficheiro JSON}).
+
+        Preenche ``report`` com o tempo de leitura e o que foi usado ou não.
+        """
+        t0 = time.perf_counter()
+        fresh: Entries = {}
+        error: Optional[str] = None
+        # Criar centenas de milhares de dicts dispara o GC vezes sem conta; nada
+        # do que o marshal cria tem ciclos, por isso pode ficar parado até ao fim
+        gc_was_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            entries = decode(self.path.read_bytes())
+        except FileNotFoundError:
+            entries, error = {}, "sem imagem"
+        except (OSError, ValueError, EOFError, TypeError) as e:
+            entries, error = {}, str(e)
+        finally:
+            if gc_was_enabled:
+                gc.enable()
+        for name, source in sources.items():
+            entry = entries.get(name)
+            if entry is None:
+                continue
+            stamp, data = entry
+            if tuple(stamp) == file_stamp(source):
+                fresh[name] = (tuple(stamp), data)
+                self.stamps[name] = tuple(stamp)
+        self.report = {
+            "seconds": time.perf_counter() - t0,
+            "loaded": sorted(fresh),
+            "stale": sorted(set(sources) - set(fresh)),
+            "error": error,
+        }
+        return fresh
+
+    def changed(self, entries: Entries) -> bool:
+        return {name: tuple(stamp) for name, (stamp, _) in entries.items()} != self.stamps
+
+    def save(self, raw: bytes, entries: Entries) -> None:
+        """Grava a imagem já serializada com ``encode(entries)``."""
+        atomic_write(self.path, raw, fsync=False)
+        self.stamps = {name: tuple(stamp) for name, (stamp, _) in entries.items()}
+
+
+def compare(data_dir: Path) -> Dict[str, float]:
+    """Tempo de leitura dos ficheiros JSON vs. a imagem (segundos)."""
+    sources = {"users": data_dir / "users.json", "products": data_dir / "products.json",
+               "rollups": data_dir / "sales_rollups.json"}
+    t0 = time.perf_counter()
+    for path in sources.values():
+        try:
+            json.loads(path.read_bytes())
+        except (OSError, ValueError):
+            pass
+    json_seconds = time.perf_counter() - t0
+    snapshot = Snapshot(data_dir / "snapshot.bin")
+    snapshot.load(sources)
+    return {"json": json_seconds, "snapshot": snapshot.report["seconds"],
+            "loaded": snapshot.report["loaded"], "error": snapshot.report["error"]}
+
+
+if __name__ == "__main__":
+    result = compare(Path(sys.argv[1] if len(sys.argv) > 1 else "data"))
+    print(f"JSON: {result['json'] * 1000:.1f} ms | imagem: {result['snapshot'] * 1000:.1f} ms "
+          f"(válidas: {', '.join(result['loaded']) or 'nenhuma'}"
+          f"{'; ' + result['error'] if result['error'] else ''})")
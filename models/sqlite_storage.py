@@ -0,0 +1,652 @@
+"""Backend de persistência em SQLite (modo WAL, tabelas com índices).
+
+Mantém exatamente os mesmos formatos de dicionário que o backend JSON, para
+que as páginas não precisem de saber qual backend está ativo.
+
+Migração única a partir dos ficheiros JSON:
+
+    python -m models.sqlite_storage data/pos.db --from data
+"""
+import json
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Optional, List, Dict, Iterable, Iterator
+
+from .sales_journal import iter_json_array, iter_jsonl
+from .sales_partitions import Bound, to_datetime
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    username   TEXT PRIMARY KEY COLLATE NOCASE,
+    email      TEXT COLLATE NOCASE,
+    password   TEXT,
+    role       TEXT,
+    company    TEXT COLLATE NOCASE,
+    vat        TEXT,
+    shop_type  TEXT COLLATE NOCASE,
+    photo_path TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_users_email ON users(email);
+CREATE INDEX IF NOT EXISTS idx_users_shop ON users(company, shop_type, role);
+
+CREATE TABLE IF NOT EXISTS products (
+    rowid_     INTEGER PRIMARY KEY,
+    code       TEXT NOT NULL COLLATE NOCASE,
+    name       TEXT,
+    price_no_vat REAL,
+    ptype      TEXT,
+    image_path TEXT,
+    stock      INTEGER DEFAULT 0,
+    min_stock  INTEGER DEFAULT 0,
+    company    TEXT NOT NULL DEFAULT '' COLLATE NOCASE,
+    shop_type  TEXT NOT NULL DEFAULT '' COLLATE NOCASE
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_products_key ON products(company, shop_type, code);
+CREATE INDEX IF NOT EXISTS idx_products_ptype ON products(company, shop_type, ptype);
+CREATE INDEX IF NOT EXISTS idx_products_code ON products(code);
+
+CREATE TABLE IF NOT EXISTS sales (
+    seq        INTEGER PRIMARY KEY,
+    id         TEXT NOT NULL,
+    timestamp  TEXT,
+    seller     TEXT,
+    company    TEXT,
+    shop_type  TEXT,
+    total_no_vat REAL,
+    vat_rate   REAL,
+    total_with_vat REAL,
+    html_path  TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_sales_id ON sales(id);
+CREATE INDEX IF NOT EXISTS idx_sales_seller ON sales(seller, timestamp);
+CREATE INDEX IF NOT EXISTS idx_sales_ts ON sales(timestamp);
+
+CREATE TABLE IF NOT EXISTS sale_items (
+    sale_seq   INTEGER NOT NULL REFERENCES sales(seq) ON DELETE CASCADE,
+    line_no    INTEGER NOT NULL,
+    code       TEXT,
+    name       TEXT,
+    qty        INTEGER,
+    price_no_vat REAL,
+    image_path TEXT,
+    PRIMARY KEY (sale_seq, line_no)
+);
+CREATE INDEX IF NOT EXISTS idx_sale_items_code ON sale_items(code);
+
+-- Entradas/contagens de stock em massa (uma linha por produto alterado)
+CREATE TABLE IF NOT EXISTS stock_movements (
+    id         INTEGER PRIMARY KEY,
+    batch      INTEGER NOT NULL,
+    timestamp  TEXT,
+    reason     TEXT,
+    company    TEXT,
+    shop_type  TEXT,
+    code       TEXT,
+    delta      INTEGER,
+    stock      INTEGER
+);
+
+-- Totais materializados por loja: kind = 'month' | 'seller' | 'day'
+CREATE TABLE IF NOT EXISTS sales_rollups (
+    company    TEXT NOT NULL,
+    shop_type  TEXT NOT NULL,
+    kind       TEXT NOT NULL,
+    bucket     TEXT NOT NULL,
+    total      REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (company, shop_type, kind, bucket)
+);
+"""
+
+ROLLUP_REBUILD = """
+INSERT INTO sales_rollups (company, shop_type, kind, bucket, total)
+SELECT {company}, {shop_type},
+       :kind, {bucket}, ROUND(SUM(s.total_with_vat), 2)
+FROM sales s LEFT JOIN users u ON u.username = s.seller
+WHERE {bucket} IS NOT NULL
+GROUP BY 1, 2, 4
+"""
+# Loja de uma venda em ``sales s LEFT JOIN users u``: as vendas antigas não
+# a têm e usa-se a do vendedor (como ``JsonStorage._shop_of``)
+_SALE_COMPANY = "COALESCE(s.company, u.company, '')"
+_SALE_SHOP_TYPE = "COALESCE(s.shop_type, u.shop_type, '')"
+ROLLUP_BUCKETS = {
+    "month": "strftime('%Y-%m', s.timestamp)",
+    "day": "strftime('%Y-%m-%d', s.timestamp)",
+    "seller": "COALESCE(s.seller, '?')",
+}
+
+USER_FIELDS = ("username", "email", "password", "role", "company", "vat", "shop_type", "photo_path")
+PRODUCT_FIELDS = ("code", "name", "price_no_vat", "ptype", "image_path", "stock",
+                  "min_stock", "company", "shop_type")
+SALE_FIELDS = ("id", "timestamp", "seller", "company", "shop_type", "total_no_vat", "vat_rate",
+               "total_with_vat", "html_path")
+ITEM_FIELDS = ("code", "name", "qty", "price_no_vat", "image_path")
+
+
+def _row_to_dict(row: sqlite3.Row, fields: Iterable[str]) -> Dict:
+    """Converte uma linha em dict, omitindo colunas a NULL (como no JSON)."""
+    return {f: row[f] for f in fields if row[f] is not None}
+
+
+class SqliteStorage:
+    """Backend SQLite com as mesmas operações que o JsonStorage."""
+
+    name = "sqlite"
+
+    def __init__(self, db_path: Path) -> None:
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        # O login corre numa QThread: a ligação é partilhada e protegida por lock
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        self._conn.executescript(SCHEMA)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _query(self, sql: str, params: Iterable = ()) -> List[sqlite3.Row]:
+        with self._lock:
+            return self._conn.execute(sql, tuple(params)).fetchall()
+
+    # ---------- Utilizadores ----------
+    def list_users(self) -> List[Dict]:
+        return [_row_to_dict(r, USER_FIELDS) for r in self._query("SELECT * FROM users ORDER BY rowid")]
+
+    def find_user(self, username: str) -> Optional[Dict]:
+        rows = self._query("SELECT * FROM users WHERE username = ?", (username,))
+        return _row_to_dict(rows[0], USER_FIELDS) if rows else None
+
+    def find_user_by_email(self, email: str) -> Optional[Dict]:
+        rows = self._query("SELECT * FROM users WHERE email = ? ORDER BY rowid LIMIT 1", (email,))
+        return _row_to_dict(rows[0], USER_FIELDS) if rows else None
+
+    def add_user(self, payload: Dict) -> Dict:
+        cols = [f for f in USER_FIELDS if f in payload]
+        sql = f"INSERT INTO users ({', '.join(cols)}) VALUES ({', '.join('?' * len(cols))})"
+        try:
+            with self._lock, self._conn:
+                self._conn.execute(sql, [payload[c] for c in cols])
+        except sqlite3.IntegrityError:
+            raise ValueError("Username já existe.")
+        return payload
+
+    def update_user(self, username: str, changes: Dict) -> Optional[Dict]:
+        cols = [f for f in changes if f in USER_FIELDS and f != "username"]
+        with self._lock, self._conn:
+            if cols:
+                sets = ", ".join(f"{c} = ?" for c in cols)
+                cur = self._conn.execute(
+                    f"UPDATE users SET {sets} WHERE username = ? COLLATE BINARY",
+                    [changes[c] for c in cols] + [username],
+                )
+                if cur.rowcount == 0:
+                    return None
+        rows = self._query("SELECT * FROM users WHERE username = ? COLLATE BINARY", (username,))
+        return _row_to_dict(rows[0], USER_FIELDS) if rows else None
+
+    def shop_users(self, company: str, shop_type: str, role: Optional[str] = None) -> List[Dict]:
+        sql = "SELECT * FROM users WHERE company = ? AND shop_type = ?"
+        params = [company, shop_type]
+        if role is not None:
+            sql += " AND role = ?"
+            params.append(role)
+        return [_row_to_dict(r, USER_FIELDS) for r in self._query(sql + " ORDER BY rowid", params)]
+
+    # ---------- Produtos ----------
+    @staticmethod
+    def _product_where(code: str, company: Optional[str], shop_type: Optional[str]):
+        sql = "code = ?"
+        params = [code]
+        if company is not None:
+            sql += " AND company = ?"
+            params.append(company)
+        if shop_type is not None:
+            sql += " AND shop_type = ?"
+            params.append(shop_type)
+        return sql, params
+
+    def list_products(self) -> List[Dict]:
+        return [_row_to_dict(r, PRODUCT_FIELDS)
+                for r in self._query("SELECT * FROM products ORDER BY rowid_")]
+
+    def shop_products(self, company: str, shop_type: str,
+                      ptype: Optional[str] = None) -> List[Dict]:
+        sql = "SELECT * FROM products WHERE company = ? AND shop_type = ?"
+        params = [company, shop_type]
+        if ptype is not None:
+            sql += " AND ptype = ? COLLATE NOCASE"
+            params.append(ptype)
+        return [_row_to_dict(r, PRODUCT_FIELDS) for r in self._query(sql + " ORDER BY rowid_", params)]
+
+    def find_product(self, code: str, company: Optional[str] = None,
+                     shop_type: Optional[str] = None) -> Optional[Dict]:
+        where, params = self._product_where(code, company, shop_type)
+        rows = self._query(f"SELECT * FROM products WHERE {where} ORDER BY rowid_ LIMIT 1", params)
+        return _row_to_dict(rows[0], PRODUCT_FIELDS) if rows else None
+
+    def add_product(self, payload: Dict) -> Dict:
+        row = {f: payload.get(f) for f in PRODUCT_FIELDS}
+        row["company"] = row["company"] or ""
+        row["shop_type"] = row["shop_type"] or ""
+        sql = (f"INSERT INTO products ({', '.join(PRODUCT_FIELDS)}) "
+               f"VALUES ({', '.join('?' * len(PRODUCT_FIELDS))})")
+        try:
+            with self._lock, self._conn:
+                self._conn.execute(sql, [row[f] for f in PRODUCT_FIELDS])
+        except sqlite3.IntegrityError:
+            raise ValueError("Código de produto duplicado nesta loja.")
+        return payload
+
+    def add_products(self, payloads: List[Dict]) -> int:
+        """Acrescenta vários produtos numa única transação (tudo ou nada)."""
+        rows = []
+        for payload in payloads:
+            row = [payload.get(f) for f in PRODUCT_FIELDS]
+            row[PRODUCT_FIELDS.index("company")] = payload.get("company") or ""
+            row[PRODUCT_FIELDS.index("shop_type")] = payload.get("shop_type") or ""
+            rows.append(row)
+        sql = (f"INSERT INTO products ({', '.join(PRODUCT_FIELDS)}) "
+               f"VALUES ({', '.join('?' * len(PRODUCT_FIELDS))})")
+        try:
+            with self._lock, self._conn:
+                self._conn.executemany(sql, rows)
+        except sqlite3.IntegrityError:
+            raise ValueError("Código de produto duplicado nesta loja.")
+        return len(rows)
+
+    def _locate_product(self, code, company, shop_type) -> int:
+        where, params = self._product_where(code, company, shop_type)
+        rows = self._conn.execute(
+            f"SELECT rowid_ FROM products WHERE {where} ORDER BY rowid_ LIMIT 1", params
+        ).fetchall()
+        if not rows:
+            raise ValueError("Produto não encontrado.")
+        return rows[0][0]
+
+    def _product_by_rowid(self, rowid: int) -> Dict:
+        row = self._conn.execute("SELECT * FROM products WHERE rowid_ = ?", (rowid,)).fetchone()
+        return _row_to_dict(row, PRODUCT_FIELDS)
+
+    def update_product(self, code: str, changes: Dict, company: Optional[str] = None,
+                       shop_type: Optional[str] = None) -> Dict:
+        cols = [f for f in changes if f in PRODUCT_FIELDS]
+        with self._lock, self._conn:
+            rowid = self._locate_product(code, company, shop_type)
+            if cols:
+                sets = ", ".join(f"{c} = ?" for c in cols)
+                self._conn.execute(f"UPDATE products SET {sets} WHERE rowid_ = ?",
+                                   [changes[c] for c in cols] + [rowid])
+            return self._product_by_rowid(rowid)
+
+    def adjust_stock(self, code: str, delta: int, company: Optional[str] = None,
+                     shop_type: Optional[str] = None) -> Dict:
+        with self._lock, self._conn:
+            rowid = self._locate_product(code, company, shop_type)
+            self._conn.execute(
+                "UPDATE products SET stock = MAX(0, COALESCE(stock, 0) + ?) WHERE rowid_ = ?",
+                (int(delta), rowid),
+            )
+            return self._product_by_rowid(rowid)
+
+    def adjust_stock_bulk(self, deltas: Dict[str, int], company: Optional[str] = None,
+                          shop_type: Optional[str] = None, reason: str = "") -> List[Dict]:
+        """Aplica vários deltas de stock numa única transação (tudo ou nada)."""
+        with self._lock, self._conn:
+            rowids = []
+            for code, delta in deltas.items():
+                try:
+                    rowids.append((self._locate_product(code, company, shop_type), int(delta)))
+                except ValueError:
+                    raise ValueError(f"Produto {code} não encontrado.")
+            self._conn.executemany(
+                "UPDATE products SET stock = MAX(0, COALESCE(stock, 0) + ?) WHERE rowid_ = ?",
+                [(delta, rowid) for rowid, delta in rowids],
+            )
+            changed = [self._product_by_rowid(rowid) for rowid, _ in rowids]
+            batch = self._conn.execute(
+                "SELECT COALESCE(MAX(batch), 0) + 1 FROM stock_movements").fetchone()[0]
+            now = datetime.now().isoformat()
+            self._conn.executemany(
+                "INSERT INTO stock_movements (batch, timestamp, reason, company, shop_type, code, delta, stock) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [(batch, now, reason, company, shop_type, p["code"], delta, p["stock"])
+                 for p, (_, delta) in zip(changed, rowids)],
+            )
+            return changed
+
+    def stock_movements(self) -> Iterator[Dict]:
+        """Movimentos agrupados por lote, no mesmo formato do backend JSON."""
+        rows = self._query("SELECT * FROM stock_movements ORDER BY id")
+        current: Optional[Dict] = None
+        for r in rows:
+            if current is None or current["batch"] != r["batch"]:
+                if current is not None:
+                    del current["batch"]
+                    yield current
+                current = {"batch": r["batch"], "timestamp": r["timestamp"], "reason": r["reason"],
+                           "company": r["company"], "shop_type": r["shop_type"], "changes": []}
+            current["changes"].append({"code": r["code"], "delta": r["delta"], "stock": r["stock"]})
+        if current is not None:
+            del current["batch"]
+            yield current
+
+    # ---------- Vendas ----------
+    def _load_items(self, seqs: List[int]) -> Dict[int, List[Dict]]:
+        items: Dict[int, List[Dict]] = {s: [] for s in seqs}
+        if not seqs:
+            return items
+        # Agrupar em lotes para não exceder o limite de parâmetros do SQLite
+        for i in range(0, len(seqs), 500):
+            chunk = seqs[i:i + 500]
+            rows = self._conn.execute(
+                f"SELECT * FROM sale_items WHERE sale_seq IN ({', '.join('?' * len(chunk))}) "
+                "ORDER BY sale_seq, line_no", chunk,
+            ).fetchall()
+            for r in rows:
+                items[r["sale_seq"]].append(_row_to_dict(r, ITEM_FIELDS))
+        return items
+
+    @staticmethod
+    def _range_filter(since: Bound, until: Bound):
+        """Condição sobre ``timestamp`` (texto ISO) para ``since <= t < until``."""
+        where, params = "", []
+        if since is not None:
+            where += " AND timestamp >= ?"
+            params.append(to_datetime(since).isoformat())
+        if until is not None:
+            where += " AND timestamp < ?"
+            params.append(to_datetime(until).isoformat())
+        return where, params
+
+    def iter_sales(self, since: Bound = None, until: Bound = None,
+                   batch: int = 500) -> Iterator[Dict]:
+        """Percorre as vendas por blocos, sem as carregar todas para memória."""
+        where, params = self._range_filter(since, until)
+        last = 0
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    f"SELECT * FROM sales WHERE seq > ?{where} ORDER BY seq LIMIT ?",
+                    [last] + params + [batch],
+                ).fetchall()
+                items = self._load_items([r["seq"] for r in rows])
+            if not rows:
+                return
+            for r in rows:
+                sale = _row_to_dict(r, SALE_FIELDS)
+                sale["items"] = items[r["seq"]]
+                yield sale
+            last = rows[-1]["seq"]
+
+    def list_sales(self, since: Bound = None, until: Bound = None) -> List[Dict]:
+        return list(self.iter_sales(since, until))
+
+    def _insert_sale(self, invoice: Dict) -> None:
+        cur = self._conn.execute(
+            f"INSERT INTO sales ({', '.join(SALE_FIELDS)}) VALUES ({', '.join('?' * len(SALE_FIELDS))})",
+            [invoice.get(f) for f in SALE_FIELDS],
+        )
+        seq = cur.lastrowid
+        self._conn.executemany(
+            f"INSERT INTO sale_items (sale_seq, line_no, {', '.join(ITEM_FIELDS)}) "
+            f"VALUES (?, ?, {', '.join('?' * len(ITEM_FIELDS))})",
+            [[seq, n] + [it.get(f) for f in ITEM_FIELDS]
+             for n, it in enumerate(invoice.get("items", []))],
+        )
+        self._add_to_rollups(invoice)
+
+    def _add_to_rollups(self, invoice: Dict) -> None:
+        company, shop_type = invoice.get("company"), invoice.get("shop_type")
+        if company is None and shop_type is None:
+            # Vendas antigas: usar a loja do vendedor
+            row = self._conn.execute("SELECT company, shop_type FROM users WHERE username = ?",
+                                     (invoice.get("seller"),)).fetchone()
+            company, shop_type = (row[0], row[1]) if row else ("", "")
+        shop = (company or "", shop_type or "")
+        total = float(invoice.get("total_with_vat") or 0.0)
+        buckets = [("seller", invoice.get("seller") or "?")]
+        try:
+            dt = datetime.fromisoformat(invoice["timestamp"])
+            buckets += [("month", dt.strftime("%Y-%m")), ("day", dt.strftime("%Y-%m-%d"))]
+        except Exception:
+            pass
+        self._conn.executemany(
+            "INSERT INTO sales_rollups (company, shop_type, kind, bucket, total) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT DO UPDATE SET total = ROUND(total + excluded.total, 2)",
+            [shop + (kind, bucket, total) for kind, bucket in buckets],
+        )
+
+    def add_sale(self, invoice: Dict) -> None:
+        with self._lock, self._conn:
+            self._insert_sale(invoice)
+
+    def checkout(self, invoice: Dict, company: Optional[str] = None,
+                 shop_type: Optional[str] = None) -> None:
+        """Desconta o stock e regista a venda numa única transação."""
+        wanted: Dict[str, int] = {}
+        for item in invoice["items"]:
+            code = item["code"].lower()
+            wanted[code] = wanted.get(code, 0) + int(item["qty"])
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            rows = {}
+            for item in invoice["items"]:
+                code = item["code"].lower()
+                if code not in rows:
+                    where, params = self._product_where(item["code"], company, shop_type)
+                    rows[code] = self._conn.execute(
+                        f"SELECT rowid_, name, stock FROM products WHERE {where} "
+                        "ORDER BY rowid_ LIMIT 1", params,
+                    ).fetchone()
+                row = rows[code]
+                if row is None:
+                    raise ValueError(f"Produto {item['code']} não encontrado na base de dados.")
+                current_stock = int(row["stock"] or 0)
+                if current_stock < wanted[code]:
+                    raise ValueError(f"Stock insuficiente para '{row['name']}'. Stock atual: {current_stock}")
+            self._conn.executemany(
+                "UPDATE products SET stock = stock - ? WHERE rowid_ = ?",
+                [(wanted[code], row["rowid_"]) for code, row in rows.items()],
+            )
+            self._insert_sale(invoice)
+
+    # ---------- Relatórios ----------
+    @staticmethod
+    def _seller_filter(allowed_sellers: Optional[List[str]]):
+        if allowed_sellers is None:
+            return "", []
+        sellers = list(allowed_sellers)
+        if not sellers:
+            return " AND 0", []
+        return f" AND seller IN ({', '.join('?' * len(sellers))})", sellers
+
+    def monthly_totals(self, allowed_sellers: Optional[List[str]] = None,
+                       since: Bound = None, until: Bound = None) -> Dict[str, float]:
+        where, params = self._seller_filter(allowed_sellers)
+        range_where, range_params = self._range_filter(since, until)
+        where, params = where + range_where, params + range_params
+        rows = self._query(
+            "SELECT strftime('%Y-%m', timestamp) AS month, SUM(total_with_vat) "
+            f"FROM sales WHERE month IS NOT NULL{where} GROUP BY month ORDER BY month",
+            params,
+        )
+        return {r[0]: float(r[1] or 0.0) for r in rows}
+
+    def totals_by_seller(self, allowed_sellers: Optional[List[str]] = None,
+                         since: Bound = None, until: Bound = None) -> Dict[str, float]:
+        where, params = self._seller_filter(allowed_sellers)
+        range_where, range_params = self._range_filter(since, until)
+        where, params = where + range_where, params + range_params
+        rows = self._query(
+            "SELECT COALESCE(seller, '?'), SUM(total_with_vat) "
+            f"FROM sales WHERE 1{where} GROUP BY 1 ORDER BY MIN(seq)",
+            params,
+        )
+        return {r[0]: float(r[1] or 0.0) for r in rows}
+
+    # Expressão SQL de cada agrupamento de ``sales_totals`` (ver sales_columns.GROUPS)
+    _GROUP_BY = {
+        "month": "strftime('%Y-%m', timestamp)",
+        "day": "strftime('%Y-%m-%d', timestamp)",
+        "seller": "COALESCE(seller, '?')",
+        "shop": f"{_SALE_COMPANY} || '/' || {_SALE_SHOP_TYPE}",
+        "hour": "strftime('%H', timestamp)",
+        "weekday": "CAST((CAST(strftime('%w', timestamp) AS INTEGER) + 6) % 7 AS TEXT)",
+    }
+
+    def sales_totals(self, by: str = "month", since: Bound = None, until: Bound = None,
+                     allowed_sellers: Optional[List[str]] = None, company: Optional[str] = None,
+                     shop_type: Optional[str] = None) -> Dict[str, float]:
+        """Totais agrupados por mês, dia, vendedor, loja, hora ou dia da semana."""
+        key = self._GROUP_BY.get(by)
+        if key is None:
+            raise ValueError(f"Agrupamento desconhecido: {by}")
+        where, params = self._seller_filter(allowed_sellers)
+        range_where, range_params = self._range_filter(since, until)
+        where, params = where + range_where, params + range_params
+        for column, value in ((_SALE_COMPANY, company), (_SALE_SHOP_TYPE, shop_type)):
+            if value is not None:
+                where += f" AND {column} = ?"
+                params.append(value)
+        # O join com os utilizadores só é preciso quando a loja entra na consulta
+        # (as outras colunas só existem em ``sales``)
+        source = "sales s"
+        if by == "shop" or company is not None or shop_type is not None:
+            source += " LEFT JOIN users u ON u.username = s.seller"
+        rows = self._query(
+            f"SELECT {key} AS k, SUM(s.total_with_vat) FROM {source} "
+            f"WHERE k IS NOT NULL{where} GROUP BY k ORDER BY k",
+            params,
+        )
+        return {r[0]: round(float(r[1] or 0.0), 2) for r in rows}
+
+    def _rollup(self, company: str, shop_type: str, kind: str) -> Dict[str, float]:
+        rows = self._query(
+            "SELECT bucket, total FROM sales_rollups WHERE company = ? AND shop_type = ? AND kind = ? "
+            "ORDER BY rowid", (company or "", shop_type or "", kind),
+        )
+        return {r[0]: r[1] for r in rows}
+
+    def shop_monthly_totals(self, company: str, shop_type: str) -> Dict[str, float]:
+        return self._rollup(company, shop_type, "month")
+
+    def shop_totals_by_seller(self, company: str, shop_type: str) -> Dict[str, float]:
+        return self._rollup(company, shop_type, "seller")
+
+    def shop_daily_totals(self, company: str, shop_type: str) -> Dict[str, float]:
+        return self._rollup(company, shop_type, "day")
+
+    def rebuild_rollups(self) -> int:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM sales_rollups")
+            for kind, bucket in ROLLUP_BUCKETS.items():
+                self._conn.execute(ROLLUP_REBUILD.format(bucket=bucket, company=_SALE_COMPANY,
+                                                         shop_type=_SALE_SHOP_TYPE),
+                                   {"kind": kind})
+            return self._conn.execute("SELECT COUNT(*) FROM sales").fetchone()[0]
+
+    # ---------- Migração ----------
+    def import_json(self, users: List[Dict], products: List[Dict],
+                    sales: Iterable[Dict]) -> Dict[str, int]:
+        """Importa registos no formato JSON numa única transação.
+
+        Devolve quantos registos foram lidos e, em ``"duplicates"``, quantos
+        repetiam um já existente: utilizadores e produtos com a mesma chave
+        substituem o anterior (fica o último); vendas com o mesmo número de
+        fatura ficam todas, como no ficheiro de origem.
+        """
+        duplicates = 0
+        with self._lock, self._conn:
+            for u in users:
+                cols = [f for f in USER_FIELDS if f in u]
+                duplicates += self._exists("users", "username = ?", [u.get("username")])
+                self._conn.execute(
+                    f"INSERT OR REPLACE INTO users ({', '.join(cols)}) "
+                    f"VALUES ({', '.join('?' * len(cols))})",
+                    [u[c] for c in cols],
+                )
+            for p in products:
+                row = [p.get(f) for f in PRODUCT_FIELDS]
+                row[PRODUCT_FIELDS.index("company")] = p.get("company") or ""
+                row[PRODUCT_FIELDS.index("shop_type")] = p.get("shop_type") or ""
+                duplicates += self._exists("products", "company = ? AND shop_type = ? AND code = ?",
+                                           [row[PRODUCT_FIELDS.index(f)]
+                                            for f in ("company", "shop_type", "code")])
+                self._conn.execute(
+                    f"INSERT OR REPLACE INTO products ({', '.join(PRODUCT_FIELDS)}) "
+                    f"VALUES ({', '.join('?' * len(PRODUCT_FIELDS))})",
+                    row,
+                )
+            n_sales = 0
+            for s in sales:
+                duplicates += self._exists("sales", "id = ?", [s.get("id")])
+                self._insert_sale(s)
+                n_sales += 1
+        return {"users": len(users), "products": len(products), "sales": n_sales,
+                "duplicates": duplicates}
+
+    def _exists(self, table: str, where: str, params: List) -> bool:
+        return self._conn.execute(f"SELECT 1 FROM {table} WHERE {where} LIMIT 1",
+                                  params).fetchone() is not None
+
+
+def _json_sales(data_dir: Path) -> Iterator[Dict]:
+    """Vendas de uma pasta ``data/`` JSON, só em leitura.
+
+    Usa as partições mensais (``sales/*.jsonl``) ou, numa pasta ainda não
+    migrada, o ``sales.jsonl`` único ou o ``sales.json`` antigo.
+    """
+    partitions = sorted((data_dir / "sales").glob("*.jsonl"))
+    if partitions:
+        for path in partitions:
+            yield from iter_jsonl(path)
+    elif (data_dir / "sales.jsonl").exists():
+        yield from iter_jsonl(data_dir / "sales.jsonl")
+    elif (data_dir / "sales.json").exists():
+        for r in iter_json_array(data_dir / "sales.json"):
+            if isinstance(r, dict):
+                yield r
+
+
+def migrate_json_to_sqlite(data_dir: Path, db_path: Path) -> Dict[str, int]:
+    """Migração única: copia data/*.json para uma base de dados SQLite nova.
+
+    A pasta de origem só é lida: não se abre um JsonStorage (que migraria
+    as vendas para partições, criaria o lock, os totais e a imagem).
+    """
+    from .json_storage import JsonStorage
+
+    data_dir = Path(data_dir)
+    db_path = Path(db_path)
+    if db_path.exists():
+        raise ValueError(f"A base de dados {db_path} já existe.")
+    users = JsonStorage._parse(data_dir / "users.json")[0]
+    products = JsonStorage._parse(data_dir / "products.json")[0]
+    dst = SqliteStorage(db_path)
+    try:
+        return dst.import_json(users, products, _json_sales(data_dir))
+    finally:
+        dst.close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Migra os ficheiros JSON do POS para SQLite.")
+    parser.add_argument("db", type=Path, help="Caminho da nova base de dados (ex.: data/pos.db)")
+    parser.add_argument("--from", dest="data_dir", type=Path, default=Path("data"),
+                        help="Pasta com users.json, products.json e sales.json")
+    args = parser.parse_args()
+    counts = migrate_json_to_sqlite(args.data_dir, args.db)
+    print(f"Migrados: {counts['users']} utilizadores, {counts['products']} produtos, "
+          f"{counts['sales']} vendas -> {args.db}")
+    if counts["duplicates"]:
+        print(f"Atenção: {counts['duplicates']} registos repetidos (utilizador, produto ou "
+              "número de fatura já importado)")
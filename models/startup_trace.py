@@ -0,0 +1,140 @@
+"""Perfil do arranque: tempos dos imports e das fases até ao login.
+
+    python main.py --startup-trace                 # grava em data/startup_trace.txt
+    python main.py --startup-trace=/tmp/trace.txt
+
+Com a opção ativa, ``StartupTrace`` substitui ``builtins.__import__`` para
+medir cada módulo carregado pela primeira vez (tempo acumulado, com os
+imports que ele próprio faz, como no ``python -X importtime``). As fases
+são marcadas pelo ``main.py`` com ``mark``. Os imports adiados (ex.: o
+matplotlib ao abrir o dashboard) continuam a ser registados depois do
+arranque, com o instante em que aconteceram. Sem a opção, ``mark`` e
+``write`` não fazem nada e os imports não são tocados.
+"""
+import builtins
+import importlib.util
+import sys
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+OPTION = "--startup-trace"
+DEFAULT_PATH = Path(__file__).resolve().parents[1] / "data" / "startup_trace.txt"
+# Imports mais lentos listados no topo do relatório
+TOP = 15
+
+
+class StartupTrace:
+    """Fases e imports do arranque; inativo se ``path`` for None."""
+
+    def __init__(self, path: Optional[Path] = None) -> None:
+        self.path = Path(path) if path is not None else None
+        self.t0 = time.perf_counter()
+        self.phases: List[Tuple[str, float]] = []
+        # (início, segundos acumulados, profundidade, módulo)
+        self.imports: List[Tuple[float, float, int, str]] = []
+        self.extra: Dict[str, Any] = {}
+        self._original_import = None
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_argv(cls, argv: List[str]) -> "StartupTrace":
+        """Lê (e retira de ``argv``) a opção ``--startup-trace[=ficheiro]``.
+
+        Ativa a medição dos imports logo aqui, por isso deve ser chamado
+        antes dos imports pesados.
+        """
+        path = None
+        for arg in list(argv[1:]):
+            if arg == OPTION or arg.startswith(OPTION + "="):
+                argv.remove(arg)
+                path = arg.partition("=")[2] or DEFAULT_PATH
+        trace = cls(path)
+        if trace.enabled:
+            trace.install()
+        return trace
+
+    @property
+    def enabled(self) -> bool:
+        return self.path is not None
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.t0
+
+    # ---------- Imports ----------
+    def install(self) -> None:
+        if self._original_import is None:
+            self._original_import = builtins.__import__
+            builtins.__import__ = self._import
+
+    def uninstall(self) -> None:
+        if self._original_import is not None:
+            builtins.__import__ = self._original_import
+            self._original_import = None
+
+    def _import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        original = self._original_import
+        if level:
+            try:
+                name_abs = importlib.util.resolve_name("." * level + name, (globals or {}).get("__package__"))
+            except (ImportError, ValueError):
+                name_abs = name
+        else:
+            name_abs = name
+        # Caminho rápido: já carregado (a grande maioria das chamadas)
+        if name_abs in sys.modules and not fromlist:
+            return original(name, globals, locals, fromlist, level)
+        depth = getattr(self._local, "depth", 0)
+        loaded = len(sys.modules)
+        self._local.depth = depth + 1
+        start = time.perf_counter()
+        try:
+            return original(name, globals, locals, fromlist, level)
+        finally:
+            seconds = time.perf_counter() - start
+            self._local.depth = depth
+            if len(sys.modules) > loaded:
+                with self._lock:
+                    self.imports.append((start - self.t0, seconds, depth, name_abs))
+
+    # ---------- Fases ----------
+    def mark(self, phase: str) -> None:
+        """Regista o instante de uma fase (desde a criação do trace, no topo do main.py)."""
+        if self.enabled:
+            self.phases.append((phase, self.elapsed()))
+
+    def report(self) -> str:
+        lines = [f"# Arranque do POS ({datetime.now().isoformat(timespec='seconds')}, "
+                 f"Python {sys.version.split()[0]})", "", "Fases (ms desde o início):"]
+        previous = 0.0
+        for phase, at in self.phases:
+            lines.append(f"  {at * 1000:9.1f}  (+{(at - previous) * 1000:7.1f})  {phase}")
+            previous = at
+        for key, value in self.extra.items():
+            lines.append(f"  {key}: {value}")
+        with self._lock:
+            imports = list(self.imports)
+        top_level = [i for i in imports if i[2] == 0]
+        lines += ["", f"Imports mais lentos (ms acumulados, {len(imports)} módulos):"]
+        for start, seconds, _, name in sorted(top_level, key=lambda i: -i[1])[:TOP]:
+            lines.append(f"  {seconds * 1000:9.1f}  {name}  (aos {start * 1000:.0f} ms)")
+        lines += ["", "Todos os imports, por ordem (início ms | acumulado ms | módulo):"]
+        for start, seconds, depth, name in sorted(imports):
+            lines.append(f"  {start * 1000:9.1f} | {seconds * 1000:8.2f} | {'  ' * depth}{name}")
+        return "\n".join(lines) + "\n"
+
+    def write(self) -> Optional[Path]:
+        """Grava o relatório (pode ser chamado várias vezes; reescreve o ficheiro)."""
+        if not self.enabled:
+            return None
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self.path.write_text(self.report(), encoding="utf-8")
+        except OSError as e:
+            print(f"Erro ao gravar {self.path}: {e}")
+            return None
+        return self.path
+
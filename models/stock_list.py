@@ -0,0 +1,26 @@
+"""Leitura de listas de stock lidas por scanner ou coladas de outro programa."""
+import re
+from typing import Dict, List, Tuple
+
+# "código", "código 5", "código;5", "código,5", "código\t5" ou "código x5"
+_LINE = re.compile(r"^\s*(?P<code>[^\s;,\t]+)(?:\s*[;,\t]\s*|\s+x?)?(?P<qty>-?\d+)?\s*$", re.IGNORECASE)
+
+
+def parse_stock_list(text: str) -> Tuple[Dict[str, int], List[Tuple[int, str]]]:
+    """Soma as quantidades por código; uma linha só com o código conta 1.
+
+    Devolve ``(quantidades, erros)`` com os erros como (nº da linha, texto).
+    Os códigos repetidos são somados (o scanner lê um artigo de cada vez).
+    """
+    totals: Dict[str, int] = {}
+    errors: List[Tuple[int, str]] = []
+    for n, line in enumerate(text.splitlines(), start=1):
+        if not line.strip():
+            continue
+        m = _LINE.match(line)
+        if m is None:
+            errors.append((n, line))
+            continue
+        code = m.group("code")
+        totals[code] = totals.get(code, 0) + int(m.group("qty") or 1)
+    return totals, errors
@@ -0,0 +1,220 @@
+"""Servidor de armazenamento: um processo guarda os dados em memória e as
+caixas acedem-lhe por socket Unix ou TCP local.
+
+Todas as caixas usam o mesmo backend (JSON ou SQLite) através de
+``RemoteStorage``: as leituras saem da memória do servidor e as escritas
+são serializadas num único sítio, sem cada caixa ter de ler os ficheiros.
+
+Protocolo (simples e compacto): cada mensagem é um frame com 4 bytes de
+tamanho (big-endian) seguidos de JSON UTF-8.
+
+- pedido: ``[id, método, args, kwargs]``
+- resposta: ``[id, estado, valor]`` com estado ``OK``, ``ERROR``
+  (valor = [tipo, mensagem]), ou ``CHUNK``/``END`` para os métodos que
+  devolvem um iterador (as vendas vão em blocos de ``CHUNK_SIZE``).
+
+As respostas saem pela ordem dos pedidos, por isso o cliente pode enviar
+vários pedidos seguidos antes de ler as respostas (pipelining).
+
+Arranque (usa o backend indicado em ``server_storage`` no data/config.json):
+
+    python -m models.storage_server --address unix:data/pos.sock
+"""
+import json
+import os
+import socket
+import socketserver
+import struct
+import threading
+from datetime import date
+from pathlib import Path
+from types import MappingProxyType
+from typing import Any, Optional, Tuple
+
+HEADER = struct.Struct(">I")
+MAX_FRAME = 64 * 1024 * 1024
+CHUNK_SIZE = 500
+
+OK, ERROR, CHUNK, END = 0, 1, 2, 3
+
+# API do backend disponível remotamente
+EXPOSED = frozenset({
+    "list_users", "find_user", "find_user_by_email", "add_user", "update_user", "shop_users",
+    "list_products", "shop_products", "find_product", "add_product", "add_products",
+    "update_product", "adjust_stock", "adjust_stock_bulk",
+    "list_sales", "add_sale", "checkout",
+    "monthly_totals", "totals_by_seller", "shop_monthly_totals", "shop_totals_by_seller",
+    "shop_daily_totals", "sales_totals", "rebuild_rollups", "cache_stats", "flush",
+})
+# Métodos que devolvem um iterador: a resposta vai em blocos
+STREAMED = frozenset({"iter_sales", "stock_movements"})
+
+
+class StorageServerError(RuntimeError):
+    """Erro do servidor que não corresponde a um erro de negócio conhecido."""
+
+
+def parse_address(address: str, root: Optional[Path] = None) -> Tuple[int, Any]:
+    """``unix:caminho`` (ou só o caminho) ou ``tcp:host:porta`` -> (família, endereço)."""
+    if address.startswith("tcp:"):
+        host, _, port = address[4:].rpartition(":")
+        return socket.AF_INET, (host or "127.0.0.1", int(port))
+    path = Path(address[5:] if address.startswith("unix:") else address)
+    if root is not None and not path.is_absolute():
+        path = root / path
+    return socket.AF_UNIX, str(path)
+
+
+def _default(obj):
+    if isinstance(obj, MappingProxyType):
+        return dict(obj)
+    if isinstance(obj, date):
+        return obj.isoformat()
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    raise TypeError(f"Não serializável: {type(obj).__name__}")
+
+
+def encode(message) -> bytes:
+    payload = json.dumps(message, ensure_ascii=False, separators=(",", ":"),
+                         default=_default).encode("utf-8")
+    return HEADER.pack(len(payload)) + payload
+
+
+def recv_exact(sock: socket.socket, n: int) -> bytes:
+    buf = bytearray()
+    while len(buf) < n:
+        chunk = sock.recv(n - len(buf))
+        if not chunk:
+            raise ConnectionError("Ligação fechada.")
+        buf += chunk
+    return bytes(buf)
+
+
+def recv_frame(sock: socket.socket):
+    (size,) = HEADER.unpack(recv_exact(sock, HEADER.size))
+    if size > MAX_FRAME:
+        raise ConnectionError(f"Frame demasiado grande ({size} bytes).")
+    return json.loads(recv_exact(sock, size))
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    """Uma ligação de uma caixa: responde aos pedidos pela ordem em que chegam."""
+
+    def handle(self):
+        storage = self.server.storage
+        sock = self.request
+        while True:
+            try:
+                req_id, method, args, kwargs = recv_frame(sock)
+            except (ConnectionError, OSError):
+                return
+            try:
+                if method in STREAMED:
+                    self._stream(req_id, getattr(storage, method)(*args, **kwargs))
+                    continue
+                if method not in EXPOSED:
+                    raise AttributeError(f"Método não disponível: {method}")
+                reply = [req_id, OK, getattr(storage, method)(*args, **kwargs)]
+            except Exception as e:
+                reply = [req_id, ERROR, [type(e).__name__, str(e)]]
+            try:
+                sock.sendall(encode(reply))
+            except OSError:
+                return
+
+    def _stream(self, req_id, iterator):
+        chunk = []
+        for record in iterator:
+            chunk.append(record)
+            if len(chunk) >= CHUNK_SIZE:
+                self.request.sendall(encode([req_id, CHUNK, chunk]))
+                chunk = []
+        if chunk:
+            self.request.sendall(encode([req_id, CHUNK, chunk]))
+        self.request.sendall(encode([req_id, END, None]))
+
+
+class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class _TcpServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class StorageServer:
+    """Serve um backend (JsonStorage/SqliteStorage) às caixas."""
+
+    def __init__(self, storage, address: str, root: Optional[Path] = None) -> None:
+        self.storage = storage
+        self.family, self.address = parse_address(address, root)
+        if self.family == socket.AF_UNIX:
+            self._remove_stale_socket()
+            self._server = _UnixServer(self.address, _Handler)
+        else:
+            self._server = _TcpServer(self.address, _Handler)
+            # Porta 0: o sistema escolhe uma livre
+            self.address = self._server.server_address
+        self._server.storage = storage
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        if self.family == socket.AF_UNIX:
+            return f"unix:{self.address}"
+        return f"tcp:{self.address[0]}:{self.address[1]}"
+
+    def _remove_stale_socket(self) -> None:
+        if not os.path.exists(self.address):
+            return
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(self.address)
+        except OSError:
+            os.unlink(self.address)  # ficou de um servidor que já não corre
+        else:
+            raise StorageServerError(f"Já há um servidor a correr em {self.address}.")
+        finally:
+            probe.close()
+
+    def serve_forever(self) -> None:
+        self._server.serve_forever()
+
+    def start(self) -> "StorageServer":
+        """Corre o servidor numa thread (testes, ou embebido noutro programa)."""
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+        if self.family == socket.AF_UNIX and os.path.exists(self.address):
+            os.unlink(self.address)
+        self.storage.close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from .config import load_config
+    from .system_manager import ROOT_DIR, SystemManager
+
+    config = load_config()
+    parser = argparse.ArgumentParser(description="Servidor de armazenamento partilhado pelas caixas.")
+    parser.add_argument("--address", default=config["server_address"],
+                        help="unix:caminho ou tcp:host:porta (por omissão o do config.json)")
+    args = parser.parse_args()
+    backend = SystemManager.from_config(dict(config, storage=config["server_storage"])).storage
+    server = StorageServer(backend, args.address, ROOT_DIR)
+    print(f"Servidor de armazenamento ({backend.name}) em {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
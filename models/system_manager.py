@@ -1,13 +1,27 @@
-"""SystemManager: persistência em JSON e regras de negócio do POS."""
-import json
+"""SystemManager: regras de negócio do POS sobre um backend de persistência."""
+import functools
 from pathlib import Path
-from typing import Optional, List, Dict
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, Iterator, List, Optional
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime
-import csv
+import time
 
 from .admin import Admin
 from .vendor import Vendor
 from .product import Product
+from .user import User
+from .sale import Sale, sale_shop
+from .json_storage import JsonStorage
+from . import passwords
+from .invoice_series import InvoiceNumberAllocator, parse_invoice_id
+from .render_queue import InvoiceRenderQueue
+from .invoice_template import TemplateSet, render_all
+from .invoice_archive import InvoiceArchive
+from .product_index import norm
+
+if TYPE_CHECKING:
+    # catalog_import (csv) e sales_export (csv, gzip) só são importados quando usados
+    from .catalog_import import ImportReport
 
 # Diretórios base
 ROOT_DIR = Path(__file__).resolve().parents[1]
@@ -16,50 +30,108 @@ INVOICE_DIR = ROOT_DIR / "invoices"
 
 
 class SystemManager:
-    """Classe responsável por gerir utilizadores, produtos e vendas."""
+    """Classe responsável por gerir utilizadores, produtos e vendas.
+
+    A persistência é delegada num backend (``JsonStorage`` por omissão ou
+    ``SqliteStorage``); aqui ficam apenas as regras de negócio.
+    """
 
     USERS = DATA_DIR / "users.json"
     PRODUCTS = DATA_DIR / "products.json"
     SALES = DATA_DIR / "sales.json"
-    
+    INVOICES = INVOICE_DIR
+
+    def __init__(self, storage=None, terminal: Optional[str] = None,
+                 invoice_block: int = 100, background_render: bool = True,
+                 password_scheme: str = passwords.DEFAULT_SCHEME,
+                 password_cost: Optional[int] = None, login_workers: int = 2) -> None:
+        self.INVOICES.mkdir(parents=True, exist_ok=True)
+        if storage is None:
+            storage = JsonStorage(self.USERS, self.PRODUCTS, self.SALES)
+        self.storage = storage
+        # Série de faturação desta caixa (criada na primeira venda)
+        self.terminal = terminal
+        self.invoice_block = invoice_block
+        self._invoice_numbers: Optional[InvoiceNumberAllocator] = None
+        # HTML das faturas gerado numa thread, fora do checkout
+        self.background_render = background_render
+        self._render_queue: Optional[InvoiceRenderQueue] = None
+        self.templates = TemplateSet()
+        self._archive: Optional[InvoiceArchive] = None
+        # Hash das passwords e verificação dos logins num pool limitado
+        self.password_scheme = password_scheme
+        self.password_cost = password_cost or passwords.DEFAULT_COST[password_scheme]
+        self.login_workers = login_workers
+        self._login_pool: Optional[ThreadPoolExecutor] = None
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict] = None) -> "SystemManager":
+        """Cria o SystemManager com o backend escolhido em data/config.json."""
+        from .config import load_config
+
+        config = config or load_config()
+        series = {"terminal": config.get("terminal"),
+                  "invoice_block": config.get("invoice_block", 100),
+                  "background_render": config.get("background_render", True),
+                  "password_scheme": config.get("password_scheme", passwords.DEFAULT_SCHEME),
+                  "password_cost": config.get("password_cost"),
+                  "login_workers": config.get("login_workers", 2)}
+        backend = config.get("storage", "json")
+        if backend == "sqlite":
+            from .sqlite_storage import SqliteStorage
+            return cls(storage=SqliteStorage(ROOT_DIR / config["sqlite_path"]), **series)
+        if backend == "remote":
+            from .remote_storage import RemoteStorage
+            return cls(storage=RemoteStorage(config.get("server_address", "unix:data/pos.sock"),
+                                             ROOT_DIR), **series)
+        if backend != "json":
+            raise ValueError(f"Backend de armazenamento desconhecido: {backend}")
+        return cls(storage=JsonStorage(
+            cls.USERS, cls.PRODUCTS, cls.SALES,
+            durability=config.get("durability", "always"),
+            commit_window=config.get("commit_window_ms", 50) / 1000,
+            multi_terminal=config.get("multi_terminal", True),
+            snapshot=config.get("snapshot", True),
+        ), **series)
+
+    def close(self) -> None:
+        """Grava o que estiver pendente e liberta o backend."""
+        if self._render_queue is not None:
+            self._render_queue.close()
+            self._render_queue = None
+        if self._archive is not None:
+            self._archive.close()
+            self._archive = None
+        if self._invoice_numbers is not None:
+            self._invoice_numbers.close()
+            self._invoice_numbers = None
+        if self._login_pool is not None:
+            self._login_pool.shutdown()
+            self._login_pool = None
+        self.storage.close()
+
+    def save_snapshot(self) -> bool:
+        """Atualiza a imagem binária de arranque (só no backend JSON); devolve se gravou."""
+        save = getattr(self.storage, "save_snapshot", None)
+        return save() if save else False
+
+    def snapshot_report(self) -> Dict:
+        """Tempo de leitura da imagem na abertura e que partes ainda eram válidas."""
+        report = getattr(self.storage, "snapshot_report", None)
+        return report() if report else {}
+
+    def cache_stats(self) -> Dict[str, int]:
+        """Contadores de acertos/falhas da cache de leitura (vazio no SQLite)."""
+        stats = getattr(self.storage, "cache_stats", None)
+        return stats() if stats else {}
+
     def get_shop_sellers(self, company: str, shop_type: str) -> List[str]:
         """Retorna uma lista de usernames de vendedores que pertencem a uma loja específica."""
-        users = self.list_users()
-        sellers = []
-        for u in users:
-            # Verifica se é vendedor e se pertence à empresa/tipo de loja
-            if (u.get("role") == "VENDOR" and 
-                u.get("company") == company and 
-                u.get("shop_type") == shop_type):
-                sellers.append(u.get("username"))
+        sellers = [u.get("username") for u in self.storage.shop_users(company, shop_type, "VENDOR")]
         # Incluir também os admins dessa loja, caso eles façam vendas
-        for u in users:
-             if (u.get("role") == "ADMIN" and 
-                u.get("company") == company and 
-                u.get("shop_type") == shop_type):
-                sellers.append(u.get("username"))
+        sellers += [u.get("username") for u in self.storage.shop_users(company, shop_type, "ADMIN")]
         return sellers
 
-    def __init__(self) -> None:
-        DATA_DIR.mkdir(exist_ok=True)
-        INVOICE_DIR.mkdir(exist_ok=True)
-        for f in (self.USERS, self.PRODUCTS, self.SALES):
-            if not f.exists():
-                f.write_text("[]", encoding="utf-8")
-
-    # ---------- Helpers JSON ----------
-    def _load_json(self, path: Path) -> list:
-        try:
-            return json.loads(path.read_text(encoding="utf-8"))
-        except Exception:
-            return []
-
-    def _save_json(self, path: Path, data: list) -> None:
-        path.write_text(
-            json.dumps(data, ensure_ascii=False, indent=2),
-            encoding="utf-8",
-        )
-
     # ---------- Utilizadores ----------
     def register_admin(
         self,
@@ -73,19 +145,14 @@ class SystemManager:
         photo_path: str = "",
     ) -> Dict:
         """Regista um novo Administrador."""
-        users = self._load_json(self.USERS)
-        if any(u["username"].lower() == username.lower() for u in users):
-            raise ValueError("Username já existe.")
-        admin = Admin(username=username, email=email, password=password)
+        admin = Admin(username=username, email=email, password=self._hash(password))
         payload = admin.to_dict() | {
             "company": company,
             "vat": vat,
             "shop_type": shop_type,
             "photo_path": photo_path,
         }
-        users.append(payload)
-        self._save_json(self.USERS, users)
-        return payload
+        return self.storage.add_user(payload)
 
     def add_vendor(
         self,
@@ -104,63 +171,74 @@ class SystemManager:
         - company
         - shop_type (RESTAURACAO, FARMACIA, OFICINA, OUTRO)
         """
-        users = self._load_json(self.USERS)
-        if any(u["username"].lower() == username.lower() for u in users):
-            raise ValueError("Username já existe.")
-        vendor = Vendor(username=username, email=email, password=password)
+        vendor = Vendor(username=username, email=email, password=self._hash(password))
         payload = vendor.to_dict() | {
             "photo_path": photo_path,
             "company": company,
             "shop_type": shop_type,
         }
-        users.append(payload)
-        self._save_json(self.USERS, users)
-        return payload
-
-    def list_users(self) -> List[Dict]:
-        """Devolve a lista de utilizadores.
-
-        O ficheiro users.json é guardado como uma LISTA simples de dicts.
-        """
-        data = self._load_json(self.USERS)
-
-        # Caso "normal": é uma lista de utilizadores
-        if isinstance(data, list):
-            return data
-
-        # Se por acaso estiver no formato {"users": [...]}, também lidamos com isso
-        if isinstance(data, dict) and isinstance(data.get("users"), list):
-            return data["users"]
-
-        return []
-
+        return self.storage.add_user(payload)
+
+    def list_users(self) -> List[User]:
+        """Devolve a lista de utilizadores (registos ``User`` só de leitura)."""
+        return [User.from_dict(u) for u in self.storage.list_users()]
+
+    def list_shop_users(self, company: str, shop_type: str,
+                        role: Optional[str] = None) -> List[User]:
+        """Utilizadores de uma loja (opcionalmente só de um role)."""
+        return [User.from_dict(u) for u in self.storage.shop_users(company, shop_type, role)]
+
+    def find_user_by_email(self, email: str) -> Optional[Dict]:
+        """Procura um utilizador pelo email (sem distinguir maiúsculas)."""
+        return self.storage.find_user_by_email(email)
+
+    def _hash(self, password: str) -> str:
+        return passwords.hash_password(password, self.password_scheme, self.password_cost)
+
+    def _check_password(self, user: Optional[Dict], password: str) -> bool:
+        """Confere a password; passwords antigas (texto simples ou outro custo) são
+        substituídas pelo hash atual."""
+        if user is None:
+            # Mesmo tempo de resposta para usernames que não existem
+            passwords.dummy_verify(password, self.password_scheme, self.password_cost)
+            return False
+        stored = user.get("password")
+        if not passwords.verify_password(password, stored):
+            return False
+        if passwords.needs_rehash(stored, self.password_scheme, self.password_cost):
+            self.storage.update_user(user["username"], {"password": self._hash(password)})
+        return True
 
     def login(self, username: str, password: str):
         """
         Autentica um utilizador.
+
+        Procura-o pelo username (O(1) no diretório) e confere o hash da
+        password. Devolve o utilizador sem o campo ``password``, ou None.
         """
         try:
-            users = self.list_users()
-            
-            # Verifica se users é realmente uma lista
-            if not isinstance(users, list):
+            u = self.storage.find_user(username)
+            if not self._check_password(u, password):
                 return None
-            
-            for u in users:
-                # Verifica se u é um dicionário
-                if not isinstance(u, dict):
-                    continue
-                
-                # Compara username e password
-                if u.get("username", "").lower() == username.lower() and u.get("password") == password:
-                    return u
-            
-            return None
-        
+            u = dict(u)
+            u.pop("password", None)
+            return u
+
         except Exception as e:
             print(f"Erro no login: {e}")
             return None
 
+    def login_async(self, username: str, password: str) -> Future:
+        """``login`` num pool de ``login_workers`` threads (o hash é lento de propósito).
+
+        O ``hashlib`` larga o GIL durante o cálculo, por isso a interface
+        continua a responder e vários logins avançam em paralelo.
+        """
+        if self._login_pool is None:
+            self._login_pool = ThreadPoolExecutor(max_workers=self.login_workers,
+                                                  thread_name_prefix="login")
+        return self._login_pool.submit(self.login, username, password)
+
 
     # ---------- Produtos ----------
     def add_product(self, p: Product) -> Dict:
@@ -170,52 +248,92 @@ class SystemManager:
         O código só tem de ser único dentro da mesma empresa + tipo de loja.
         Permite ter código "01" em RESTAURACAO e "01" em FARMACIA, por exemplo.
         """
-        products = self._load_json(self.PRODUCTS)
-
-        for x in products:
-            if (
-                x["code"].lower() == p.code.lower()
-                and x.get("company") == p.company
-                and x.get("shop_type") == p.shop_type
-            ):
-                raise ValueError("Código de produto duplicado nesta loja.")
-
-        payload = p.to_dict()
-        products.append(payload)
-        self._save_json(self.PRODUCTS, products)
-        return payload
-
-    def update_product(self, code: str, **updates) -> Dict:
-        """Atualiza campos de um produto (por código)."""
-        products = self._load_json(self.PRODUCTS)
-        found = None
-        for p in products:
-            if p["code"].lower() == code.lower():
-                for k, v in updates.items():
-                    if v is not None:
-                        p[k] = v
-                found = p
-                break
-        if found is None:
-            raise ValueError("Produto não encontrado.")
-        self._save_json(self.PRODUCTS, products)
-        return found
-
-    def list_products(self) -> List[Dict]:
-        """Devolve a lista completa de produtos (filtragem é feita nas páginas)."""
-        return self._load_json(self.PRODUCTS)
-
-    def adjust_stock(self, code: str, delta: int) -> Dict:
+        return self.storage.add_product(p.to_dict())
+
+    def import_products(self, rows: Iterable, company: Optional[str] = None,
+                        shop_type: Optional[str] = None,
+                        progress: Optional[Callable[[int], None]] = None) -> "ImportReport":
+        """Importa produtos em massa com uma única gravação.
+
+        ``rows`` são dicts ou pares (número da linha, dict), como os de
+        ``catalog_import.read_catalog``. Cada linha é validada contra os
+        códigos já existentes na loja e os anteriores do próprio ficheiro;
+        as linhas com erros ficam no relatório e as restantes são gravadas.
+        ``company``/``shop_type`` (se dados) substituem os das linhas.
+        """
+        from . import catalog_import
+        numbered = (r if isinstance(r, tuple) else (n, r) for n, r in enumerate(rows, start=1))
+
+        def existing(c: str, st: str):
+            return (norm(p.get("code")) for p in self.storage.shop_products(c, st))
+
+        report = catalog_import.validate(numbered, existing, company, shop_type, progress)
+        self.storage.add_products(report.imported)
+        return report
+
+    def import_catalog_file(self, path: Path, company: Optional[str] = None,
+                            shop_type: Optional[str] = None,
+                            progress: Optional[Callable[[int], None]] = None) -> "ImportReport":
+        """Importa um catálogo CSV ou JSON Lines (ver ``import_products``)."""
+        from . import catalog_import
+        return self.import_products(catalog_import.read_catalog(path), company, shop_type, progress)
+
+    def update_product(self, code: str, *, company: Optional[str] = None,
+                       shop_type: Optional[str] = None, **updates) -> Dict:
+        """Atualiza campos de um produto.
+
+        Com ``company``/``shop_type`` procura só nessa loja (o mesmo código
+        pode existir em lojas diferentes); sem eles usa o primeiro com o código.
+        """
+        changes = {k: v for k, v in updates.items() if v is not None}
+        return self.storage.update_product(code, changes, company, shop_type)
+
+    def list_products(self) -> List[Product]:
+        """Devolve a lista completa de produtos (registos ``Product`` só de leitura)."""
+        return [Product.from_dict(p) for p in self.storage.list_products()]
+
+    def list_shop_products(self, company: str, shop_type: str,
+                           ptype: Optional[str] = None) -> List[Product]:
+        """Produtos de uma loja (opcionalmente só de um tipo), sem filtrar o catálogo todo."""
+        return [Product.from_dict(p) for p in self.storage.shop_products(company, shop_type, ptype)]
+
+    def find_product(self, code: str, company: Optional[str] = None,
+                     shop_type: Optional[str] = None) -> Optional[Dict]:
+        """Procura um produto pelo código, opcionalmente dentro de uma loja."""
+        return self.storage.find_product(code, company, shop_type)
+
+    def adjust_stock(self, code: str, delta: int, company: Optional[str] = None,
+                     shop_type: Optional[str] = None) -> Dict:
         """Altera o stock de um produto (delta pode ser positivo ou negativo)."""
-        products = self._load_json(self.PRODUCTS)
-        for p in products:
-            if p["code"].lower() == code.lower():
-                p["stock"] = int(p.get("stock", 0)) + int(delta)
-                if p["stock"] < 0:
-                    p["stock"] = 0
-                self._save_json(self.PRODUCTS, products)
-                return p
-        raise ValueError("Produto não encontrado.")
+        return self.storage.adjust_stock(code, delta, company, shop_type)
+
+    def adjust_stock_bulk(self, deltas: Dict[str, int], reason: str = "",
+                          company: Optional[str] = None,
+                          shop_type: Optional[str] = None) -> List[Dict]:
+        """Altera o stock de vários produtos com uma só gravação (ex.: receção de mercadoria).
+
+        ``deltas`` é {código: delta}. Como em ``adjust_stock``, o stock nunca
+        fica abaixo de zero. Se algum código não existir na loja nada é
+        alterado (ValueError). O ``reason`` fica no registo de movimentos.
+        Devolve os produtos alterados.
+        """
+        return self.storage.adjust_stock_bulk(deltas, company, shop_type, reason)
+
+    def stock_take(self, counts: Dict[str, int], company: Optional[str] = None,
+                   shop_type: Optional[str] = None,
+                   reason: str = "Contagem de stock") -> List[Dict]:
+        """Acerta o stock para as quantidades contadas ({código: quantidade})."""
+        deltas = {}
+        for code, counted in counts.items():
+            p = self.storage.find_product(code, company, shop_type)
+            if p is None:
+                raise ValueError(f"Produto {code} não encontrado.")
+            deltas[code] = int(counted) - int(p.get("stock", 0))
+        return self.adjust_stock_bulk(deltas, reason, company, shop_type)
+
+    def stock_movements(self) -> Iterator[Dict]:
+        """Registo das alterações de stock em massa, do mais antigo para o mais recente."""
+        return self.storage.stock_movements()
 
     # ---------- Vendas / Faturas ----------
     def create_invoice(
@@ -225,305 +343,233 @@ class SystemManager:
         seller_username: str,
         vat_rate: float = 0.23,
     ) -> Dict:
-        """Cria uma fatura, VALIDA STOCK, desconta stock e gera HTML."""
-        
-        # 1. Validação de Stock (Antes de processar qualquer coisa)
-        products = self._load_json(self.PRODUCTS)
-        product_map = {p["code"]: p for p in products} # Mapa para acesso rápido
-
-        for item in items:
-            code = item["code"]
-            qty_needed = item["qty"]
-            
-            # Encontrar produto na base de dados para ver o stock real
-            # Nota: Num cenário real, devíamos filtrar também por company/shop_type para garantir unicidade
-            prod_db = None
-            for p in products:
-                if p["code"] == code: # Assumindo código único ou lógica de filtro prévia
-                    prod_db = p
-                    break
-            
-            if not prod_db:
-                raise ValueError(f"Produto {code} não encontrado na base de dados.")
-            
-            current_stock = int(prod_db.get("stock", 0))
-            if current_stock < qty_needed:
-                raise ValueError(f"Stock insuficiente para '{prod_db['name']}'. Stock atual: {current_stock}")
-
-        # 2. Se passou a validação, descontar o stock
-        for item in items:
-            self.adjust_stock(item["code"], -item["qty"])
-
-        # 3. Criar a fatura (Código original)
+        """Cria uma fatura, VALIDA STOCK, desconta stock e gera HTML.
+
+        Todo o checkout é uma única unidade de trabalho no backend: as linhas
+        são validadas e o stock descontado em memória, e só depois o stock e
+        a venda são gravados. Se alguma linha falhar, nada é alterado.
+
+        Com ``background_render`` a função retorna logo que a venda está
+        gravada e o HTML é gerado em segundo plano (ver ``invoice_html``).
+        """
+        # Os produtos procurados são os da loja do vendedor (se o conhecermos)
+        seller = self.storage.find_user(seller_username)
+        company = seller.get("company") if seller else None
+        shop_type = seller.get("shop_type") if seller else None
+
+        # Cópia das linhas: o carrinho da página é limpo depois da venda
+        items = [dict(i) for i in items]
+
+        # Criar a fatura
         total_no_vat = round(
             sum(i["qty"] * i["price_no_vat"] for i in items), 2
         )
         total_vat = round(total_no_vat * vat_rate, 2)
         total_with_vat = round(total_no_vat + total_vat, 2)
         now = datetime.now()
-        invoice_id = now.strftime("INV%Y%m%d%H%M%S")
-        invoice = {
-            "id": invoice_id,
-            "timestamp": now.isoformat(),
-            "seller": seller_username,
-            "items": items,
-            "total_no_vat": total_no_vat,
-            "vat_rate": vat_rate,
-            "total_with_vat": total_with_vat,
-        }
-
-        sales = self._load_json(self.SALES)
-        sales.append(invoice)
-        self._save_json(self.SALES, sales)
+        # O número só fica consumido se o checkout gravar a venda
+        with self.invoice_numbers().issue(now) as invoice_id:
+            invoice = {
+                "id": invoice_id,
+                "timestamp": now.isoformat(),
+                "seller": seller_username,
+                "company": company,
+                "shop_type": shop_type,
+                "items": items,
+                "total_no_vat": total_no_vat,
+                "vat_rate": vat_rate,
+                "total_with_vat": total_with_vat,
+            }
+
+            # A referência no arquivo é conhecida antes de gravar: uma única escrita
+            invoice["html_path"] = self.archive().reference(invoice)
+            self.storage.checkout(invoice, company=company, shop_type=shop_type)
 
         # Gerar HTML
-        html_path = INVOICE_DIR / f"{invoice_id}.html"
-        self._generate_invoice_html(invoice, html_path)
-        invoice["html_path"] = str(html_path)
-
-        # Atualizar registo com caminho do HTML
-        sales = self._load_json(self.SALES)
-        for s in sales:
-            if s.get("id") == invoice_id:
-                s["html_path"] = invoice["html_path"]
-        self._save_json(self.SALES, sales)
+        if self.background_render:
+            self.render_queue().submit(invoice)
+        else:
+            self.archive().put(invoice, self._invoice_html(invoice))
 
         return invoice
 
-    def _generate_invoice_html(self, invoice: Dict, path: Path) -> None:
-        """Gera um ficheiro HTML bonito para a fatura."""
-        seller = invoice["seller"]
-        date_str = datetime.fromisoformat(invoice["timestamp"]).strftime(
-            "%d/%m/%Y %H:%M"
-        )
-        rows = ""
-        for it in invoice["items"]:
-            subtotal = it["qty"] * it["price_no_vat"]
-            rows += (
-                f"<tr>"
-                f"<td>{it['code']}</td>"
-                f"<td>{it['name']}</td>"
-                f"<td>{it['qty']}</td>"
-                f"<td>{it['price_no_vat']:.2f}€</td>"
-                f"<td>{subtotal:.2f}€</td>"
-                f"</tr>"
-            )
-
-        html = f"""<!DOCTYPE html>
-<html lang="pt">
-<head>
-<meta charset="UTF-8">
-<title>Fatura {invoice['id']}</title>
-<style>
-body {{
-  font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', sans-serif;
-  background:#f5f5f5;
-}}
-.invoice-container {{
-  max-width: 800px;
-  margin:40px auto;
-  background:#fff;
-  padding:24px;
-  border-radius:8px;
-  box-shadow:0 4px 12px rgba(0,0,0,0.08);
-}}
-.header {{
-  display:flex;
-  justify-content:space-between;
-  margin-bottom:20px;
-}}
-.header-left h1 {{
-  margin:0;
-  font-size:24px;
-}}
-.header-right {{
-  text-align:right;
-  font-size:14px;
-  color:#555;
-}}
-table {{
-  width:100%;
-  border-collapse:collapse;
-  margin-top:20px;
-}}
-th, td {{
-  border-bottom:1px solid #ddd;
-  padding:8px;
-  text-align:left;
-  font-size:14px;
-}}
-th {{
-  background:#fafafa;
-}}
-.totals {{
-  margin-top:20px;
-  float:right;
-  font-size:14px;
-}}
-.totals div {{
-  display:flex;
-  justify-content:space-between;
-}}
-.footer {{
-  clear:both;
-  margin-top:40px;
-  font-size:12px;
-  color:#777;
-  text-align:center;
-}}
-</style>
-</head>
-<body>
-<div class="invoice-container">
-  <div class="header">
-    <div class="header-left">
-      <h1>Fatura</h1>
-      <div>Nº: {invoice['id']}</div>
-    </div>
-    <div class="header-right">
-      <div>Data: {date_str}</div>
-      <div>Responsável: {seller}</div>
-    </div>
-  </div>
-  <table>
-    <thead>
-      <tr>
-        <th>Código</th>
-        <th>Produto</th>
-        <th>Qtd</th>
-        <th>Preço s/ IVA</th>
-        <th>Subtotal</th>
-      </tr>
-    </thead>
-    <tbody>
-      {rows}
-    </tbody>
-  </table>
-  <div class="totals">
-    <div><span>Total s/ IVA:</span><span>{invoice['total_no_vat']:.2f}€</span></div>
-    <div><span>IVA ({int(invoice['vat_rate']*100)}%):</span><span>{invoice['total_no_vat']*invoice['vat_rate']:.2f}€</span></div>
-    <div><strong>Total c/ IVA:</strong><strong>{invoice['total_with_vat']:.2f}€</strong></div>
-  </div>
-  <div class="footer">
-    Sistema POS - Documento gerado automaticamente.
-  </div>
-</div>
-</body>
-</html>"""
-        path.write_text(html, encoding="utf-8")
-
-    def list_sales(self) -> List[Dict]:
-        """Lista todas as vendas/faturas registadas."""
-        return self._load_json(self.SALES)
+    def render_queue(self) -> InvoiceRenderQueue:
+        """Fila de HTML desta caixa; retoma os pedidos pendentes ao abrir."""
+        if self._render_queue is None:
+            terminal = self.invoice_numbers().terminal
+            self._render_queue = InvoiceRenderQueue(
+                self.INVOICES / f"render_queue-{terminal}.jsonl", self._invoice_html,
+                self.archive())
+        return self._render_queue
+
+    def archive(self) -> InvoiceArchive:
+        """Arquivo das faturas (packs mensais em invoices/).
+
+        Na primeira abertura passa para o arquivo os ``INV*.html`` soltos.
+        """
+        if self._archive is None:
+            self._archive = InvoiceArchive(self.INVOICES)
+            self._archive.migrate()
+        return self._archive
+
+    def invoice_html(self, invoice: Dict) -> Path:
+        """HTML da fatura extraído do arquivo, gerando-o já se faltar (reimpressão)."""
+        if self.background_render:
+            return self.render_queue().render_now(invoice)
+        archive = self.archive()
+        if invoice["id"] not in archive:
+            archive.put(invoice, self._invoice_html(invoice))
+        return archive.view(invoice["id"])
+
+    def invoice_numbers(self) -> InvoiceNumberAllocator:
+        """Numerador de faturas desta caixa (invoices/series/)."""
+        if self._invoice_numbers is None:
+            self._invoice_numbers = InvoiceNumberAllocator(
+                self.INVOICES / "series", self._last_invoice_number,
+                terminal=self.terminal, block=self.invoice_block)
+        return self._invoice_numbers
+
+    def _last_invoice_number(self, year: int, terminal: str) -> int:
+        """Maior número da série gravado nas vendas (recuperação após falha)."""
+        last = 0
+        for sale in self.storage.iter_sales(since=datetime(year, 1, 1),
+                                            until=datetime(year + 1, 1, 1)):
+            parsed = parse_invoice_id(sale.get("id"))
+            if parsed and parsed[0] == year and parsed[1] == terminal:
+                last = max(last, parsed[2])
+        return last
+
+    def _invoice_html(self, invoice: Dict) -> str:
+        """HTML da fatura, com o modelo do tipo de loja (ver ``invoice_template``)."""
+        return self.templates.render(invoice)
+
+    def render_invoices(self, ids: Optional[Iterable[str]] = None,
+                        workers: int = 1) -> Dict[str, float]:
+        """Regenera o HTML das faturas (todas, ou só ``ids``) com os modelos atuais.
+
+        Com ``workers > 1`` o trabalho é repartido por um pool de processos.
+        Devolve ``{"rendered", "seconds", "per_second"}``.
+        """
+        wanted = set(ids) if ids is not None else None
+        sales = self.iter_sales(filter=lambda s: wanted is None or s["id"] in wanted)
+        t0 = time.perf_counter()
+        rendered = render_all(sales, self.archive(), self.templates.folder, workers=workers)
+        seconds = time.perf_counter() - t0
+        return {"rendered": rendered, "seconds": seconds,
+                "per_second": rendered / seconds if seconds else 0.0}
+
+    def list_sales(self, since=None, until=None) -> List[Sale]:
+        """Lista as vendas/faturas registadas, opcionalmente com ``since <= data < until``.
+
+        Os limites podem ser ``date``, ``datetime`` ou texto ISO; no backend
+        JSON só se leem as partições mensais que o intervalo toca. Devolve
+        registos ``Sale`` (``iter_sales`` continua a dar os dicts gravados).
+        """
+        return [Sale.from_dict(s) for s in self.storage.list_sales(since, until)]
+
+    def iter_sales(self, filter: Optional[Callable[[Dict], bool]] = None,
+                   since=None, until=None) -> Iterator[Dict]:
+        """Percorre as vendas uma a uma, sem as carregar todas para memória.
+
+        ``filter(venda)`` escolhe as vendas a devolver; ``since``/``until``
+        como em ``list_sales``.
+        """
+        for s in self.storage.iter_sales(since, until):
+            if filter is None or filter(s):
+                yield s
 
     # ---------- Relatórios / Export ----------
-    def export_sales_csv(self, path: Path) -> None:
-        """Exporta vendas para CSV simples (para Excel, etc.)."""
-        sales = self.list_sales()
-        with path.open("w", newline="", encoding="utf-8") as f:
-            writer = csv.writer(f, delimiter=";")
-            writer.writerow(
-                ["id", "timestamp", "seller", "total_no_vat", "vat_rate", "total_with_vat"]
-            )
-            for s in sales:
-                writer.writerow(
-                    [
-                        s.get("id"),
-                        s.get("timestamp"),
-                        s.get("seller"),
-                        s.get("total_no_vat"),
-                        s.get("vat_rate"),
-                        s.get("total_with_vat"),
-                    ]
-                )
-
-    def monthly_totals(self, allowed_sellers: List[str] = None) -> Dict[str, float]:
+    def export_sales(self, path: Path, since=None, until=None, *,
+                     company: Optional[str] = None, shop_type: Optional[str] = None,
+                     seller: Optional[str] = None, detail: str = "headers",
+                     fmt: Optional[str] = None, compress: Optional[bool] = None,
+                     progress=None, cancelled=None) -> int:
+        """Exporta as vendas em streaming (ver ``sales_export``); devolve quantas.
+
+        Filtra por intervalo (``since <= data < until``), loja (empresa e
+        tipo) e vendedor. ``detail="items"`` escreve uma linha por artigo.
+        O formato (CSV/JSONL, gzip) sai da extensão se não for indicado.
+        As vendas antigas, sem loja, contam na loja do vendedor (como nos totais).
+        """
+        sellers = functools.lru_cache(maxsize=None)(self.storage.find_user)
+
+        def wanted(s: Dict) -> bool:
+            if seller is not None and s.get("seller") != seller:
+                return False
+            if company is None and shop_type is None:
+                return True
+            c, t = sale_shop(s, sellers)
+            return (company is None or c == company) and (shop_type is None or t == shop_type)
+
+        from . import sales_export
+        sales = self.iter_sales(filter=wanted, since=since, until=until)
+        return sales_export.write_export(sales, path, detail=detail, fmt=fmt, compress=compress,
+                                         progress=progress, cancelled=cancelled)
+
+    def export_sales_csv(self, path: Path, since=None, until=None) -> None:
+        """Exporta vendas para CSV simples (para Excel, etc.), opcionalmente só de um intervalo."""
+        self.export_sales(path, since, until, fmt="csv", compress=False)
+
+    def monthly_totals(self, allowed_sellers: List[str] = None,
+                       since=None, until=None) -> Dict[str, float]:
         """
         Total faturado por mês. 
-        Se allowed_sellers for fornecido, filtra apenas vendas desses utilizadores.
+        Se allowed_sellers for fornecido, filtra apenas vendas desses utilizadores;
+        since/until limitam o intervalo de datas.
         """
-        res: Dict[str, float] = {}
-        for s in self.list_sales():
-            # Filtro de segurança: Só processa se o vendedor estiver na lista permitida
-            if allowed_sellers is not None and s.get("seller") not in allowed_sellers:
-                continue
-
-            try:
-                dt = datetime.fromisoformat(s["timestamp"])
-            except Exception:
-                continue
-            key = dt.strftime("%Y-%m")
-            res[key] = res.get(key, 0.0) + float(s.get("total_with_vat", 0.0))
-        return res
-
-    def totals_by_seller(self, allowed_sellers: List[str] = None) -> Dict[str, float]:
+        return self.storage.monthly_totals(allowed_sellers, since, until)
+
+    def totals_by_seller(self, allowed_sellers: List[str] = None,
+                         since=None, until=None) -> Dict[str, float]:
         """
         Total faturado por vendedor.
-        Se allowed_sellers for fornecido, filtra apenas esses utilizadores.
+        Se allowed_sellers for fornecido, filtra apenas esses utilizadores;
+        since/until limitam o intervalo de datas.
         """
-        res: Dict[str, float] = {}
-        for s in self.list_sales():
-            seller = s.get("seller", "?")
-            
-            # Filtro de segurança
-            if allowed_sellers is not None and seller not in allowed_sellers:
-                continue
-
-            res[seller] = res.get(seller, 0.0) + float(
-                s.get("total_with_vat", 0.0)
-            )
-        return res
+        return self.storage.totals_by_seller(allowed_sellers, since, until)
+
+    def sales_totals(self, by: str = "month", since=None, until=None, *,
+                     allowed_sellers: List[str] = None, company: Optional[str] = None,
+                     shop_type: Optional[str] = None) -> Dict[str, float]:
+        """Total faturado agrupado por ``by``: "month", "day", "seller", "shop",
+        "hour" ou "weekday" (0 = segunda), com os mesmos filtros dos outros totais.
+        """
+        return self.storage.sales_totals(by, since, until, allowed_sellers, company, shop_type)
     
+    def shop_monthly_totals(self, company: str, shop_type: str) -> Dict[str, float]:
+        """Total faturado por mês numa loja (totais materializados, O(1))."""
+        return self.storage.shop_monthly_totals(company, shop_type)
+
+    def shop_totals_by_seller(self, company: str, shop_type: str) -> Dict[str, float]:
+        """Total faturado por vendedor numa loja (totais materializados, O(1))."""
+        return self.storage.shop_totals_by_seller(company, shop_type)
+
+    def shop_daily_totals(self, company: str, shop_type: str) -> Dict[str, float]:
+        """Total faturado por dia numa loja (totais materializados, O(1))."""
+        return self.storage.shop_daily_totals(company, shop_type)
+
+    def rebuild_rollups(self) -> int:
+        """Recalcula os totais materializados a partir de todas as vendas."""
+        return self.storage.rebuild_rollups()
+
     def change_user_password(self, username: str, old_password: str, new_password: str) -> bool:
         """
         Altera a password de um utilizador.
 
         Retorna True se alterar com sucesso, False caso contrário.
         """
-        users = self.list_users()
-
-        # Garantir que é uma lista válida
-        if not isinstance(users, list):
+        user = self.storage.find_user(username)
+        if user is None or user.get("username") != username:
             return False
+        # Verificar password antiga
+        if not passwords.verify_password(old_password, user.get("password")):
+            return False
+        return self.storage.update_user(username, {"password": self._hash(new_password)}) is not None
 
-        changed = False
-
-        for user in users:
-            if not isinstance(user, dict):
-                continue
-            if user.get("username") == username:
-                # Verificar password antiga
-                if user.get("password") != old_password:
-                    return False
-                # Atualizar
-                user["password"] = new_password
-                changed = True
-                break
-
-        if changed:
-            # Guardar como LISTA simples
-            self._save_json(self.USERS, users)
-            return True
-
-        return False
+    def reset_password(self, username: str, new_password: str) -> bool:
+        """Redefine a password sem pedir a antiga (fluxo de recuperação)."""
+        return self.storage.update_user(username, {"password": self._hash(new_password)}) is not None
 
     def update_user_photo(self, username: str, photo_path: str) -> bool:
         """Atualiza a foto de perfil do utilizador (suporta URL ou caminho local)."""
-        users = self.list_users()
-        changed = False
-        
-        # Garantir que é uma lista válida
-        if not isinstance(users, list):
-            return False
-
-        for u in users:
-            if isinstance(u, dict) and u.get("username") == username:
-                u["photo_path"] = photo_path
-                changed = True
-                break
-        
-        if changed:
-            self._save_json(self.USERS, users)
-            return True
-            
-        return False
+        return self.storage.update_user(username, {"photo_path": photo_path}) is not None
@@ -1,18 +1,20 @@
 """Modelo base de Utilizador."""
-from dataclasses import dataclass
+from .record import Record
 
-@dataclass
-class User:
-    """Classe base para Admin e Vendedor."""
-    username: str
-    email: str
-    password: str  # texto simples para projeto académico
-    role: str      # "ADMIN" ou "VENDOR"
 
-    def to_dict(self) -> dict:
-        return {
-            "username": self.username,
-            "email": self.email,
-            "password": self.password,
-            "role": self.role,
-        }
+class User(Record):
+    """Classe base para Admin e Vendedor.
+
+    ``password`` é o hash com sal de ``models/passwords.py``
+    (``algoritmo$custo$sal$hash``, ex.: ``pbkdf2_sha256$200000$...``); contas
+    antigas com texto simples passam a hash no primeiro login, tal como as
+    de outro esquema/custo. ``role`` é "ADMIN" ou "VENDOR". A loja (``company``/``shop_type``) e a foto são preenchidas no
+    registo; outros campos (ex.: ``vat`` dos admins) ficam em ``extra``.
+    """
+
+    __slots__ = ("username", "email", "password", "role",
+                 "company", "shop_type", "photo_path")
+
+    FIELDS = __slots__
+    DEFAULTS = ("", "", "", "", "", "", "")
+    INTERNED = ("role", "company", "shop_type")
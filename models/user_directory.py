@@ -0,0 +1,73 @@
+"""Diretório de utilizadores com índices por username, email e loja."""
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .product_index import norm
+
+ShopKey = Tuple[str, str]
+
+
+class UserDirectory:
+    """Índices em memória sobre a lista de utilizadores em cache.
+
+    - ``by_username`` / ``by_email``: chave em casefold -> utilizador;
+    - ``members``: (empresa, loja) -> {role: [utilizadores]}, pela ordem do
+      ficheiro.
+
+    Tal como o ProductIndex, guarda referências para os dicts da cache e é
+    reconstruído quando a geração da FILE_CACHE muda por fora do backend.
+    """
+
+    def __init__(self) -> None:
+        self.generation = 0
+        self.by_username: Dict[str, Dict] = {}
+        self.by_email: Dict[str, Dict] = {}
+        self.members: Dict[ShopKey, Dict[str, List[Dict]]] = {}
+
+    def build(self, users: Iterable[Dict], generation: int = 0) -> None:
+        self.by_username.clear()
+        self.by_email.clear()
+        self.members.clear()
+        for u in users:
+            self.add(u)
+        self.generation = generation
+
+    def state(self) -> Tuple:
+        """Estruturas do diretório, para a imagem binária (partilham os dicts da lista)."""
+        return (self.by_username, self.by_email, self.members)
+
+    def restore(self, state: Tuple, generation: int) -> None:
+        """Repõe um diretório lido da imagem binária, sem o reconstruir."""
+        self.by_username, self.by_email, self.members = state
+        self.generation = generation
+
+    def add(self, u: Dict) -> None:
+        username = norm(u.get("username"))
+        if username in self.by_username:
+            return
+        self.by_username[username] = u
+        email = norm(u.get("email"))
+        if email:
+            self.by_email.setdefault(email, u)
+        shop = (norm(u.get("company")), norm(u.get("shop_type")))
+        self.members.setdefault(shop, {}).setdefault(u.get("role"), []).append(u)
+
+    def reindex_email(self, u: Dict, old_email: Optional[str]) -> None:
+        old, new = norm(old_email), norm(u.get("email"))
+        if old == new:
+            return
+        if self.by_email.get(old) is u:
+            del self.by_email[old]
+        if new:
+            self.by_email.setdefault(new, u)
+
+    def get(self, username: str) -> Optional[Dict]:
+        return self.by_username.get(norm(username))
+
+    def get_by_email(self, email: str) -> Optional[Dict]:
+        return self.by_email.get(norm(email))
+
+    def shop(self, company: str, shop_type: str, role: Optional[str] = None) -> List[Dict]:
+        roles = self.members.get((norm(company), norm(shop_type)), {})
+        if role is not None:
+            return list(roles.get(role, ()))
+        return [u for members in roles.values() for u in members]
@@ -2,9 +2,11 @@ from PyQt5.QtWidgets import (
     QWidget, QVBoxLayout, QLabel, QSizePolicy, QHBoxLayout, QFrame
 )
 from PyQt5.QtCore import Qt
+# Só importado quando o dashboard é aberto (main.py); o pyplot não é preciso:
+# as figuras são criadas diretamente e o estilo vem de matplotlib.style
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.figure import Figure
-import matplotlib.pyplot as plt
+from matplotlib import style as mpl_style
 
 class DashboardPage(QWidget):
     """Dashboard com gráficos de faturação (Visual Dark Mode)."""
@@ -15,7 +17,7 @@ class DashboardPage(QWidget):
         self.user = current_user
         
         # Configurar matplotlib para dark mode
-        plt.style.use('dark_background')
+        mpl_style.use('dark_background')
         
         self._build()
         self.refresh()
@@ -90,14 +92,13 @@ class DashboardPage(QWidget):
         return card
 
     def refresh(self):
-        # 1. Filtros de Loja
+        # 1. Loja do utilizador
         my_company = self.user.get("company")
         my_shop_type = self.user.get("shop_type")
-        allowed_sellers = self.sm.get_shop_sellers(my_company, my_shop_type)
         
-        # 2. Dados
-        monthly = self.sm.monthly_totals(allowed_sellers=allowed_sellers)
-        by_seller = self.sm.totals_by_seller(allowed_sellers=allowed_sellers)
+        # 2. Dados (totais materializados: não percorre o histórico de vendas)
+        monthly = self.sm.shop_monthly_totals(my_company, my_shop_type)
+        by_seller = self.sm.shop_totals_by_seller(my_company, my_shop_type)
         
         # 3. Atualizar Cartões KPI
         total_val = sum(monthly.values()) if monthly else 0
@@ -1,11 +1,41 @@
-from PyQt5.QtWidgets import QWidget, QVBoxLayout, QLabel, QListWidget, QPushButton, QHBoxLayout, QInputDialog, QMessageBox, QListWidgetItem
+from PyQt5.QtWidgets import (
+    QWidget, QVBoxLayout, QLabel, QListWidget, QPushButton, QHBoxLayout, QInputDialog,
+    QMessageBox, QListWidgetItem, QDialog, QPlainTextEdit, QComboBox, QDialogButtonBox
+)
 from PyQt5.QtCore import Qt
 from PyQt5.QtGui import QIcon
 from pathlib import Path
+from models.stock_list import parse_stock_list
 
 # Diretório base do projeto
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+class StockListDialog(QDialog):
+    """Lista de códigos/quantidades (scanner ou colada) para receção ou contagem."""
+    MODES = ["Receber mercadoria", "Contagem de stock"]
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Receber mercadoria / Contagem de stock")
+        self.resize(420, 480)
+        v = QVBoxLayout(self)
+        self.mode = QComboBox()
+        self.mode.addItems(self.MODES)
+        v.addWidget(self.mode)
+        hint = QLabel("Uma linha por artigo: \"código quantidade\" (ou só o código, que conta 1).")
+        hint.setWordWrap(True)
+        hint.setStyleSheet("color: #aaa;")
+        v.addWidget(hint)
+        self.text = QPlainTextEdit()
+        v.addWidget(self.text)
+        buttons = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
+        buttons.accepted.connect(self.accept)
+        buttons.rejected.connect(self.reject)
+        v.addWidget(buttons)
+
+    def is_stock_take(self) -> bool:
+        return self.mode.currentIndex() == 1
+
 class InventoryPage(QWidget):
     """Página de Inventário (stock)."""
     def __init__(self, system_manager, admin_user: dict):
@@ -30,20 +60,21 @@ class InventoryPage(QWidget):
         self.btn_inc = QPushButton("Adicionar stock")
         self.btn_dec = QPushButton("Remover stock")
         self.btn_edit_min = QPushButton("Definir stock mínimo")
+        self.btn_bulk = QPushButton("Receber mercadoria / Contagem")
         buttons.addWidget(self.btn_inc)
         buttons.addWidget(self.btn_dec)
         buttons.addWidget(self.btn_edit_min)
+        buttons.addWidget(self.btn_bulk)
         v.addLayout(buttons)
 
         self.btn_inc.clicked.connect(lambda: self._change_stock(+1))
         self.btn_dec.clicked.connect(lambda: self._change_stock(-1))
         self.btn_edit_min.clicked.connect(self._set_min_stock)
+        self.btn_bulk.clicked.connect(self._bulk_stock)
 
     def refresh(self):
         self.list.clear()
-        for p in self.sm.list_products():
-            if p.get("shop_type") != self.shop_type or p.get("company") != self.company:
-                continue
+        for p in self.sm.list_shop_products(self.company, self.shop_type):
             stock = int(p.get("stock", 0))
             min_stock = int(p.get("min_stock", 0))
             txt = f'{p["code"]} — {p["name"]} | Stock: {stock} (mín: {min_stock})'
@@ -72,7 +103,7 @@ class InventoryPage(QWidget):
         if not ok:
             return
         delta = qty * direction
-        updated = self.sm.adjust_stock(p["code"], delta)
+        updated = self.sm.adjust_stock(p["code"], delta, company=self.company, shop_type=self.shop_type)
         QMessageBox.information(self, "Stock atualizado", f'Novo stock de {updated["name"]}: {updated["stock"]}')
         self.refresh()
 
@@ -84,5 +115,29 @@ class InventoryPage(QWidget):
                                         int(p.get("min_stock", 0)), 0, 100000, 1)
         if not ok:
             return
-        self.sm.update_product(p["code"], min_stock=value)
-        self.refresh()
\ No newline at end of file
+        self.sm.update_product(p["code"], company=self.company, shop_type=self.shop_type,
+                               min_stock=value)
+        self.refresh()
+
+    def _bulk_stock(self):
+        dialog = StockListDialog(self)
+        if dialog.exec_() != QDialog.Accepted:
+            return
+        quantities, errors = parse_stock_list(dialog.text.toPlainText())
+        if errors:
+            lines = "\n".join(f"Linha {n}: {txt}" for n, txt in errors[:20])
+            QMessageBox.warning(self, "Lista inválida", f"Corrija estas linhas:\n{lines}")
+            return
+        if not quantities:
+            return
+        try:
+            if dialog.is_stock_take():
+                changed = self.sm.stock_take(quantities, company=self.company, shop_type=self.shop_type)
+            else:
+                changed = self.sm.adjust_stock_bulk(quantities, reason="Receção de mercadoria",
+                                                    company=self.company, shop_type=self.shop_type)
+        except ValueError as e:
+            QMessageBox.critical(self, "Erro", str(e))
+            return
+        QMessageBox.information(self, "Stock atualizado", f"{len(changed)} produtos atualizados.")
+        self.refresh()
@@ -0,0 +1,56 @@
+import time
+from typing import Callable, Optional
+
+from PyQt5.QtWidgets import QWidget, QVBoxLayout, QLabel
+from PyQt5.QtCore import Qt, QEvent, QTimer, pyqtSignal
+
+
+class LazyPage(QWidget):
+    """Lugar de uma página no QStackedWidget; a página só é criada quando é precisa.
+
+    ``factory()`` devolve a página verdadeira. ``ensure()`` cria-a (uma vez) e
+    coloca-a dentro deste widget, por isso os índices do stack não mudam.
+    ``built`` é emitido com a página e o tempo de construção, para ligar os
+    sinais dela; ``first_paint`` é emitido no primeiro desenho visível.
+    """
+    built = pyqtSignal(object, float)
+    first_paint = pyqtSignal()
+
+    def __init__(self, title: str, factory: Callable[[], QWidget]):
+        super().__init__()
+        self.title = title
+        self._factory = factory
+        self.page: Optional[QWidget] = None
+        self.build_seconds = 0.0
+        self._painted = False
+        self._layout = QVBoxLayout(self)
+        self._layout.setContentsMargins(0, 0, 0, 0)
+        self._placeholder = QLabel(f"A carregar {title}...")
+        self._placeholder.setAlignment(Qt.AlignCenter)
+        self._placeholder.setStyleSheet("color: #888; font-size: 14px;")
+        self._layout.addWidget(self._placeholder)
+
+    def ensure(self) -> QWidget:
+        if self.page is None:
+            t0 = time.perf_counter()
+            self.page = self._factory()
+            self._layout.removeWidget(self._placeholder)
+            self._placeholder.deleteLater()
+            self._layout.addWidget(self.page)
+            self.page.installEventFilter(self)
+            self.build_seconds = time.perf_counter() - t0
+            self.built.emit(self.page, self.build_seconds)
+        return self.page
+
+    def showEvent(self, event):
+        # Também cobre o stack mostrar esta página sem passar pelo menu
+        self.ensure()
+        super().showEvent(event)
+
+    def eventFilter(self, obj, event):
+        if obj is self.page and not self._painted and event.type() == QEvent.Paint:
+            self._painted = True
+            self.page.removeEventFilter(self)
+            # Emitido a seguir ao desenho, já com a página no ecrã
+            QTimer.singleShot(0, self.first_paint.emit)
+        return super().eventFilter(obj, event)
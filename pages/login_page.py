@@ -2,39 +2,22 @@ from PyQt5.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLineEdit, QPushButton,
     QLabel, QMessageBox, QFrame, QGraphicsDropShadowEffect, QProgressBar
 )
-from PyQt5.QtCore import pyqtSignal, Qt, QThread, QTimer
+from PyQt5.QtCore import pyqtSignal, Qt, QTimer
 from PyQt5.QtGui import QColor, QCursor
-import time
-
-# --- WORKER THREAD (Processa o login em segundo plano) ---
-class LoginWorker(QThread):
-    finished = pyqtSignal(object) # Emite o user ou None
-
-    def __init__(self, sm, username, password):
-        super().__init__()
-        self.sm = sm
-        self.username = username
-        self.password = password
-
-    def run(self):
-        # Pequeno delay artificial (0.5s) apenas para a animação ser vista
-        # e dar a sensação de "processamento" suave, tipo Windows
-        time.sleep(0.5)
-        
-        # Tenta fazer login
-        user = self.sm.login(self.username, self.password)
-        self.finished.emit(user)
 
 # --- PÁGINA DE LOGIN ---
 class LoginPage(QWidget):
-    """Página de Login com Loading e Threading."""
+    """Página de Login com Loading; a password é verificada no pool de logins do SystemManager."""
     login_success = pyqtSignal(dict)
     goto_register = pyqtSignal()
     goto_recover = pyqtSignal()
+    # Emitido pela thread do pool; o Qt entrega-o na thread da interface
+    _login_finished = pyqtSignal(object)
 
     def __init__(self, system_manager):
         super().__init__()
         self.sm = system_manager
+        self._login_finished.connect(self._handle_login_result)
         self._build()
 
     def _build(self):
@@ -204,10 +187,9 @@ class LoginPage(QWidget):
         self.user.setEnabled(False)
         self.pwd.setEnabled(False)
         
-        # 2. Iniciar Thread de Login (para não congelar a janela)
-        self.worker = LoginWorker(self.sm, u, p)
-        self.worker.finished.connect(self._handle_login_result)
-        self.worker.start()
+        # 2. Verificar no pool de logins (o hash é lento de propósito; a janela não congela)
+        future = self.sm.login_async(u, p)
+        future.add_done_callback(lambda f: self._login_finished.emit(f.result()))
 
     def _handle_login_result(self, user):
         # 3. Login terminou: Restaurar UI
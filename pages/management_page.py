@@ -1,16 +1,98 @@
 from PyQt5.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QListWidget, QMessageBox,
-    QListWidgetItem, QLabel, QFrame, QFileDialog, QInputDialog
+    QListWidgetItem, QLabel, QFrame, QFileDialog, QInputDialog, QProgressDialog,
+    QDialog, QDialogButtonBox, QFormLayout, QComboBox, QDateEdit, QCheckBox
 )
-from PyQt5.QtCore import pyqtSignal, Qt, QSize
+from PyQt5.QtCore import pyqtSignal, Qt, QSize, QThread, QDate
 from PyQt5.QtGui import QIcon, QPixmap
 from models.product import Product
-import urllib.request
 from pathlib import Path
 
 # Diretório base do projeto
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+class CatalogImportWorker(QThread):
+    """Importa um catálogo em segundo plano para não bloquear a interface."""
+    progress = pyqtSignal(int)     # linhas lidas até agora
+    finished = pyqtSignal(object)  # ImportReport ou a exceção
+
+    def __init__(self, sm, path, company, shop_type):
+        super().__init__()
+        self.sm = sm
+        self.path = path
+        self.company = company
+        self.shop_type = shop_type
+
+    def run(self):
+        try:
+            report = self.sm.import_catalog_file(self.path, self.company, self.shop_type,
+                                                 progress=self.progress.emit)
+        except Exception as e:
+            report = e
+        self.finished.emit(report)
+
+class SalesExportWorker(QThread):
+    """Exporta vendas em segundo plano; cancelável com ``requestInterruption()``."""
+    progress = pyqtSignal(int)     # vendas exportadas até agora
+    finished = pyqtSignal(object)  # nº de vendas, ExportCancelled ou a exceção
+
+    def __init__(self, sm, path, options):
+        super().__init__()
+        self.sm = sm
+        self.path = path
+        self.options = options
+
+    def run(self):
+        try:
+            result = self.sm.export_sales(self.path, progress=self.progress.emit,
+                                          cancelled=self.isInterruptionRequested, **self.options)
+        except Exception as e:
+            result = e
+        self.finished.emit(result)
+
+class SalesExportDialog(QDialog):
+    """Filtros da exportação: intervalo de datas, vendedor e detalhe."""
+    DETAILS = [("Uma linha por fatura", "headers"), ("Uma linha por artigo", "items")]
+
+    def __init__(self, sellers, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Exportar vendas")
+        form = QFormLayout(self)
+        self.all_dates = QCheckBox("Todas as datas")
+        self.all_dates.setChecked(True)
+        today = QDate.currentDate()
+        self.since = QDateEdit(today.addMonths(-1))
+        self.until = QDateEdit(today)
+        for d in (self.since, self.until):
+            d.setCalendarPopup(True)
+            d.setDisplayFormat("dd/MM/yyyy")
+            d.setEnabled(False)
+        self.all_dates.toggled.connect(lambda on: (self.since.setEnabled(not on),
+                                                   self.until.setEnabled(not on)))
+        self.seller = QComboBox()
+        self.seller.addItem("Todos", None)
+        for s in sellers:
+            self.seller.addItem(s, s)
+        self.detail = QComboBox()
+        for label, value in self.DETAILS:
+            self.detail.addItem(label, value)
+        form.addRow(self.all_dates)
+        form.addRow("De:", self.since)
+        form.addRow("Até (inclusive):", self.until)
+        form.addRow("Vendedor:", self.seller)
+        form.addRow("Detalhe:", self.detail)
+        buttons = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
+        buttons.accepted.connect(self.accept)
+        buttons.rejected.connect(self.reject)
+        form.addRow(buttons)
+
+    def options(self) -> dict:
+        opts = {"seller": self.seller.currentData(), "detail": self.detail.currentData()}
+        if not self.all_dates.isChecked():
+            opts["since"] = self.since.date().toPyDate()
+            opts["until"] = self.until.date().addDays(1).toPyDate()
+        return opts
+
 class ManagementPage(QWidget):
     """Página de Gestão para o Administrador."""
     goto_sales = pyqtSignal()
@@ -81,11 +163,14 @@ class ManagementPage(QWidget):
         btn_add_product = QPushButton("Adicionar Produto")
         btn_add_product.setIcon(QIcon(str(BASE_DIR / "icons" / "add.png")))
         btn_add_product.setCursor(Qt.PointingHandCursor)
-        btn_export_csv = QPushButton("Exportar vendas CSV")
+        btn_import_catalog = QPushButton("Importar catálogo")
+        btn_import_catalog.setCursor(Qt.PointingHandCursor)
+        btn_export_csv = QPushButton("Exportar vendas")
         btn_export_csv.setCursor(Qt.PointingHandCursor)
         p_layout.addWidget(p_title)
         p_layout.addWidget(self.products_list)
         p_layout.addWidget(btn_add_product)
+        p_layout.addWidget(btn_import_catalog)
         p_layout.addWidget(btn_export_csv)
 
         center.addWidget(users_card, 1)
@@ -100,6 +185,7 @@ class ManagementPage(QWidget):
         btn_stats.clicked.connect(self.goto_stats.emit)
         btn_add_vendor.clicked.connect(self._add_vendor_dialog)
         btn_add_product.clicked.connect(self._add_product_dialog)
+        btn_import_catalog.clicked.connect(self._import_catalog)
         btn_export_csv.clicked.connect(self._export_csv)
 
     def _load_icon(self, path):
@@ -108,6 +194,7 @@ class ManagementPage(QWidget):
             return QIcon(str(BASE_DIR / "icons" / "product.png"))
         if path.startswith("http"):
             try:
+                import urllib.request  # só quando há imagens por URL (import pesado)
                 data = urllib.request.urlopen(path, timeout=3).read()
                 pix = QPixmap()
                 pix.loadFromData(data)
@@ -125,19 +212,15 @@ class ManagementPage(QWidget):
 
         # Vendedores
         self.users_list.clear()
-        for u in self.sm.list_users():
-            if u["role"] == "VENDOR" and u.get("shop_type") == shop_type and u.get("company") == company:
-                item = QListWidgetItem(u["username"])
-                # Usar helper também para fotos de utilizadores
-                item.setIcon(self._load_icon(u.get("photo_path") or str(BASE_DIR / "icons" / "user.png")))
-                self.users_list.addItem(item)
+        for u in self.sm.list_shop_users(company, shop_type, role="VENDOR"):
+            item = QListWidgetItem(u["username"])
+            # Usar helper também para fotos de utilizadores
+            item.setIcon(self._load_icon(u.get("photo_path") or str(BASE_DIR / "icons" / "user.png")))
+            self.users_list.addItem(item)
 
         # Produtos
         self.products_list.clear()
-        for p in self.sm.list_products():
-            if p.get("shop_type") != shop_type or p.get("company") != company:
-                continue
-            
+        for p in self.sm.list_shop_products(company, shop_type):
             desc = f'{p["name"]} ({p["ptype"]}) {p.get("price_no_vat", 0):.2f}€'
             item = QListWidgetItem(desc)
             # USAR O HELPER AQUI
@@ -166,8 +249,7 @@ class ManagementPage(QWidget):
         code, ok = QInputDialog.getText(self, "Produto", "Código:")
         if not ok or not code: return
         
-        existing_products = self.sm.list_products()
-        if any(p.get("code") == code for p in existing_products):
+        if self.sm.find_product(code, self.admin.get("company", ""), self.admin.get("shop_type", "OUTRO")):
             QMessageBox.warning(self, "Erro", f"Produto com código '{code}' já existe!")
             return
         
@@ -195,20 +277,78 @@ class ManagementPage(QWidget):
         except Exception as e:
             QMessageBox.critical(self, "Erro", f"Erro ao criar produto: {str(e)}")
 
+    def _import_catalog(self):
+        path, _ = QFileDialog.getOpenFileName(
+            self, "Importar catálogo", "", "Catálogos (*.csv *.jsonl *.json)")
+        if not path: return
+
+        # Sem total conhecido à partida: barra "ocupada" com o nº de linhas lidas
+        self.import_dialog = QProgressDialog("A importar catálogo...", None, 0, 0, self)
+        self.import_dialog.setWindowTitle("Importar catálogo")
+        self.import_dialog.setWindowModality(Qt.WindowModal)
+        self.import_dialog.setMinimumDuration(0)
+        self.import_dialog.show()
+
+        self.import_worker = CatalogImportWorker(
+            self.sm, Path(path), self.admin.get("company", ""), self.admin.get("shop_type", "OUTRO"))
+        self.import_worker.progress.connect(
+            lambda n: self.import_dialog.setLabelText(f"A importar catálogo... {n} linhas lidas"))
+        self.import_worker.finished.connect(self._on_catalog_imported)
+        self.import_worker.start()
+
+    def _on_catalog_imported(self, report):
+        self.import_dialog.close()
+        if isinstance(report, Exception):
+            QMessageBox.critical(self, "Erro", f"Erro ao importar catálogo: {report}")
+            return
+        self._refresh_lists()
+        msg = report.summary()
+        if report.errors:
+            lines = [f"Linha {n}: {err}" for n, err in report.errors[:20]]
+            if len(report.errors) > 20:
+                lines.append(f"... e mais {len(report.errors) - 20}.")
+            msg += "\n\n" + "\n".join(lines)
+            QMessageBox.warning(self, "Importação concluída", msg)
+        else:
+            QMessageBox.information(self, "Importação concluída", msg)
+
     def _export_csv(self):
-        from PyQt5.QtWidgets import QFileDialog
-        from pathlib import Path
-        path, _ = QFileDialog.getSaveFileName(self, "Exportar vendas para CSV", "vendas.csv", "CSV (*.csv)")
+        company = self.admin.get("company", "")
+        shop_type = self.admin.get("shop_type", "OUTRO")
+        dialog = SalesExportDialog(self.sm.get_shop_sellers(company, shop_type), self)
+        if dialog.exec_() != QDialog.Accepted: return
+        path, _ = QFileDialog.getSaveFileName(
+            self, "Exportar vendas", "vendas.csv",
+            "CSV (*.csv);;CSV comprimido (*.csv.gz);;JSON Lines (*.jsonl);;JSON Lines comprimido (*.jsonl.gz)")
         if not path: return
-        try:
-            self.sm.export_sales_csv(Path(path))
-            QMessageBox.information(self, "Exportado", "Ficheiro CSV criado com sucesso.")
-        except Exception as e:
-            QMessageBox.critical(self, "Erro", str(e))
+
+        self.export_dialog = QProgressDialog("A exportar vendas...", "Cancelar", 0, 0, self)
+        self.export_dialog.setWindowTitle("Exportar vendas")
+        self.export_dialog.setWindowModality(Qt.WindowModal)
+        self.export_dialog.setMinimumDuration(0)
+
+        options = dict(dialog.options(), company=company, shop_type=shop_type)
+        self.export_worker = SalesExportWorker(self.sm, Path(path), options)
+        self.export_worker.progress.connect(
+            lambda n: self.export_dialog.setLabelText(f"A exportar vendas... {n} vendas"))
+        self.export_worker.finished.connect(self._on_sales_exported)
+        self.export_dialog.canceled.connect(self.export_worker.requestInterruption)
+        self.export_dialog.show()
+        self.export_worker.start()
+
+    def _on_sales_exported(self, result):
+        from models.sales_export import ExportCancelled  # já carregado pela exportação
+        self.export_dialog.close()
+        if isinstance(result, ExportCancelled):
+            return
+        if isinstance(result, Exception):
+            QMessageBox.critical(self, "Erro", str(result))
+            return
+        QMessageBox.information(self, "Exportado", f"{result} vendas exportadas.")
 
     def _edit_product_dialog(self, item):
         desc = item.text()
-        products = self.sm.list_products()
+        products = self.sm.list_shop_products(self.admin.get("company"), self.admin.get("shop_type"))
         prod = None
         for p in products:
             p_desc = f'{p["name"]} ({p["ptype"]}) {p.get("price_no_vat", 0):.2f}€'
@@ -240,7 +380,8 @@ class ManagementPage(QWidget):
             updates["image_path"] = image_path
         
         try:
-            self.sm.update_product(prod["code"], **updates)
+            self.sm.update_product(prod["code"], company=prod.get("company"),
+                                   shop_type=prod.get("shop_type"), **updates)
             QMessageBox.information(self, "OK", "Produto atualizado.")
             self._refresh_lists()
         except Exception as e:
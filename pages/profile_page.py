@@ -7,7 +7,6 @@ from PyQt5.QtWidgets import (
 from PyQt5.QtGui import QPixmap, QCursor, QColor, QIcon
 from PyQt5.QtCore import Qt, QSize, QPoint
 import os
-import urllib.request
 
 class ProfilePage(QWidget):
     """Página de perfil profissional com layout horizontal e foto limpa."""
@@ -223,6 +222,7 @@ class ProfilePage(QWidget):
         pixmap = QPixmap()
         try:
             if photo_path.startswith("http"):
+                import urllib.request  # só quando há imagens por URL (import pesado)
                 data = urllib.request.urlopen(photo_path, timeout=5).read()
                 pixmap.loadFromData(data)
             elif photo_path and os.path.exists(photo_path):
@@ -273,13 +273,12 @@ class ProfilePage(QWidget):
         if not all([old, new, conf]) or new != conf or len(new) < 6:
             QMessageBox.warning(self, "Erro", "Dados inválidos (mínimo 6 caracteres).")
             return
-        if self.user.get('password') != old:
+        # A password atual é conferida pelo SystemManager (só ele vê o hash)
+        if not self.sm.change_user_password(self.user.get('username'), old, new):
             QMessageBox.warning(self, "Erro", "Password atual incorreta.")
             return
-        if self.sm.change_user_password(self.user.get('username'), old, new):
-            self.user['password'] = new
-            QMessageBox.information(self, "Sucesso", "Password alterada! Faça login novamente.")
-            self.on_logout()
+        QMessageBox.information(self, "Sucesso", "Password alterada! Faça login novamente.")
+        self.on_logout()
 
 class ChangePasswordDialog(QDialog):
     def __init__(self, parent=None):
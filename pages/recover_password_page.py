@@ -104,11 +104,7 @@ class RecoverPasswordPage(QWidget):
             return
         self.email.setStyleSheet("")
 
-        self.target_user = None
-        for u in self.sm.list_users():
-            if u.get("email", "").lower() == email.lower():
-                self.target_user = u
-                break
+        self.target_user = self.sm.find_user_by_email(email)
         if not self.target_user:
             QMessageBox.critical(self, "Erro", "Email não registado.")
             return
@@ -136,18 +132,7 @@ class RecoverPasswordPage(QWidget):
             return
 
         # Usar a API pública do SystemManager
-        users = self.sm.list_users()
-        username_target = self.target_user.get("username")
-
-        for u in users:
-            if not isinstance(u, dict):
-                continue
-            if u.get("username") == username_target:
-                u["password"] = self.new_pwd.text()
-                break
-
-        # Gravar de volta no ficheiro
-        self.sm._save_json(self.sm.USERS, users)
+        self.sm.reset_password(self.target_user.get("username"), self.new_pwd.text())
 
         QMessageBox.information(self, "OK", "Password redefinida com sucesso.")
 
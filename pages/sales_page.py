@@ -2,10 +2,9 @@ from PyQt5.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QListWidget, QPushButton, QMessageBox,
     QLabel, QListWidgetItem, QLineEdit
 )
-from PyQt5.QtCore import pyqtSignal, Qt, QSize
-from PyQt5.QtGui import QIcon, QPixmap
+from PyQt5.QtCore import pyqtSignal, Qt, QSize, QUrl
+from PyQt5.QtGui import QIcon, QPixmap, QDesktopServices
 from .toast import Toast
-import urllib.request # <--- Necessário para baixar imagens
 from pathlib import Path
 
 # Diretório base do projeto
@@ -23,6 +22,7 @@ class SalesPage(QWidget):
         self.shop_type = current_user.get("shop_type")
         self.company = current_user.get("company")
         self.cart = []
+        self.last_invoice = None
         self._build()
 
     def _build(self):
@@ -54,12 +54,15 @@ class SalesPage(QWidget):
         btn_clear = QPushButton("Limpar carrinho")
         btn_confirm = QPushButton("Confirmar e Gerar Fatura")
         btn_confirm.setStyleSheet("background-color: #28a745; color: white; font-weight: bold; padding: 10px;")
+        self.btn_reprint = QPushButton("Reimprimir última fatura")
+        self.btn_reprint.setEnabled(False)
         
         left.addWidget(lbl_cart)
         left.addWidget(self.invoice_list)
         left.addWidget(btn_remove_item)
         left.addWidget(btn_clear)
         left.addWidget(btn_confirm)
+        left.addWidget(self.btn_reprint)
 
         # Direita: Produtos
         right = QVBoxLayout()
@@ -96,6 +99,7 @@ class SalesPage(QWidget):
         self.products.itemClicked.connect(self._show_preview)
         self.products.itemDoubleClicked.connect(self._add_to_cart)
         btn_confirm.clicked.connect(self._confirm)
+        self.btn_reprint.clicked.connect(self._reprint)
         btn_remove_item.clicked.connect(self._remove_selected_item)
         btn_clear.clicked.connect(self._clear_cart)
         self.search_box.textChanged.connect(self._filter_products)
@@ -108,6 +112,7 @@ class SalesPage(QWidget):
         if path.startswith("http"):
             try:
                 # Baixar dados da imagem
+                import urllib.request  # só quando há imagens por URL (import pesado)
                 data = urllib.request.urlopen(path, timeout=3).read()
                 pix = QPixmap()
                 pix.loadFromData(data)
@@ -127,6 +132,7 @@ class SalesPage(QWidget):
         
         if path.startswith("http"):
             try:
+                import urllib.request  # só quando há imagens por URL (import pesado)
                 data = urllib.request.urlopen(path, timeout=3).read()
                 pix = QPixmap()
                 pix.loadFromData(data)
@@ -140,35 +146,50 @@ class SalesPage(QWidget):
             return QPixmap(path)
 
     def _load_products(self):
-        all_products = self.sm.list_products()
-        self.all_products = [
-            p for p in all_products
-            if p.get("shop_type") == self.shop_type and p.get("company") == self.company
-        ]
+        self.all_products = self.sm.list_shop_products(self.company, self.shop_type)
         self._populate_products_list(self.all_products)
         self._refresh_invoice_list()
 
     def _populate_products_list(self, products):
         self.products.clear()
         for p in products:
-            stock = int(p.get("stock", 0))
-            price = p.get("price_no_vat", 0)
-            
-            desc = f"{p['name']}\n{price:.2f}€ | Stock: {stock}"
-            item = QListWidgetItem(desc)
+            item = QListWidgetItem()
             
             # USAR O NOVO HELPER AQUI
             img_path = p.get("image_path", "")
             item.setIcon(self._load_icon(img_path))
             
-            item.setData(32, p) 
-            
-            if stock <= 0:
-                item.setFlags(Qt.NoItemFlags)
-                item.setText(f"{p['name']} (ESGOTADO)\n{price:.2f}€")
-                
+            self._set_product_item(item, p)
             self.products.addItem(item)
 
+    def _set_product_item(self, item, p):
+        stock = int(p.get("stock", 0))
+        price = p.get("price_no_vat", 0)
+        item.setData(32, p)
+        if stock <= 0:
+            item.setFlags(Qt.NoItemFlags)
+            item.setText(f"{p['name']} (ESGOTADO)\n{price:.2f}€")
+        else:
+            item.setText(f"{p['name']}\n{price:.2f}€ | Stock: {stock}")
+
+    def _reload_stock(self):
+        """Relê os produtos da loja depois de uma venda: o stock também muda
+        noutras caixas. Se a lista (códigos e imagens) não mudou, só se
+        atualiza o texto dos itens, sem voltar a carregar as imagens."""
+        products = self.sm.list_shop_products(self.company, self.shop_type)
+        if ([(p["code"], p.get("image_path")) for p in products]
+                != [(p["code"], p.get("image_path")) for p in self.all_products]):
+            self.all_products = products
+            self._filter_products(self.search_box.text())
+            return
+        self.all_products = products
+        by_code = {p["code"]: p for p in products}
+        for row in range(self.products.count()):
+            item = self.products.item(row)
+            data = item.data(32)
+            if data and data["code"] in by_code:
+                self._set_product_item(item, by_code[data["code"]])
+
     def _filter_products(self, text):
         text = text.strip().lower()
         if not text:
@@ -266,12 +287,23 @@ class SalesPage(QWidget):
             QMessageBox.warning(self, "Aviso", "Carrinho vazio.")
             return
         try:
+            # Retorna quando a venda está gravada; o HTML é gerado em segundo plano
             invoice = self.sm.create_invoice(
                 items=self.cart, seller_username=self.seller_username, vat_rate=0.23,
             )
-            msg = f'Fatura emitida com sucesso!\nTotal: {invoice["total_with_vat"]:.2f}€'
-            QMessageBox.information(self, "Venda Concluída", msg)
-            self.cart.clear()
-            self._load_products() 
         except Exception as e:
-            QMessageBox.critical(self, "Erro na Venda", str(e))
\ No newline at end of file
+            QMessageBox.critical(self, "Erro na Venda", str(e))
+            return
+        self.last_invoice = invoice
+        self.btn_reprint.setEnabled(True)
+        self._reload_stock()
+        self.cart.clear()
+        self._refresh_invoice_list()
+        Toast(self, f'Fatura {invoice["id"]} emitida! Total: {invoice["total_with_vat"]:.2f}€', 2500)
+
+    def _reprint(self):
+        if not self.last_invoice:
+            return
+        # Gera já o HTML se ainda estiver na fila
+        path = self.sm.invoice_html(self.last_invoice)
+        QDesktopServices.openUrl(QUrl.fromLocalFile(str(path)))
\ No newline at end of file
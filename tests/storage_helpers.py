@@ -0,0 +1,38 @@
+"""Base comum dos testes que correm sobre os dois backends (JSON e SQLite)."""
+import tempfile
+from pathlib import Path
+
+from models.file_cache import FILE_CACHE
+from models.json_storage import JsonStorage
+from models.sqlite_storage import SqliteStorage
+
+
+def json_storage(base: Path) -> JsonStorage:
+    return JsonStorage(base / "users.json", base / "products.json", base / "sales.json")
+
+
+def sqlite_storage(base: Path) -> SqliteStorage:
+    return SqliteStorage(base / "pos.db")
+
+
+class StorageMixin:
+    """Pasta temporária em ``self.base`` e ``self.storage`` criado por ``_make_storage()``.
+
+    As classes de teste definem ``_make_storage`` (ex.: ``json_storage(self.base)``).
+    No fim fecha-se ``self.sm``, se o teste o criou (fecha também o backend),
+    ou então ``self.storage``, e esquece-se a FILE_CACHE da pasta apagada.
+    """
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.base = Path(self.tmp.name)
+        self.storage = self._make_storage()
+        self.sm = None
+
+    def tearDown(self):
+        if self.sm is not None:
+            self.sm.close()
+        else:
+            self.storage.close()
+        FILE_CACHE.invalidate()
+        self.tmp.cleanup()
@@ -0,0 +1,105 @@
+import json
+import os
+import unittest
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from models.atomic_io import atomic_write, GroupCommitter
+from models.config import DEFAULTS
+from models.file_cache import FILE_CACHE
+from models.json_storage import JsonStorage, CorruptDataError
+from models.product import Product
+
+class TestAtomicIO(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.base = Path(self.tmp.name)
+
+    def tearDown(self):
+        FILE_CACHE.invalidate()
+        self.tmp.cleanup()
+
+    def _storage(self, durability="always", window=0.05, multi_terminal=True):
+        return JsonStorage(self.base / "users.json", self.base / "products.json",
+                           self.base / "sales.json", durability=durability, commit_window=window,
+                           multi_terminal=multi_terminal)
+
+    def test_failed_write_keeps_previous_file(self):
+        path = self.base / "f.json"
+        atomic_write(path, b"[1]")
+        with mock.patch("models.atomic_io.os.replace", side_effect=OSError("disco cheio")):
+            with self.assertRaises(OSError):
+                atomic_write(path, b"[2]")
+        self.assertEqual(path.read_bytes(), b"[1]")
+        self.assertEqual(os.listdir(self.base), ["f.json"])
+
+    def test_corrupt_file_is_not_read_as_empty(self):
+        storage = self._storage()
+        storage.add_product(Product(code="A", name="A", price_no_vat=1.0, ptype="x").to_dict())
+        FILE_CACHE.invalidate()
+        (self.base / "products.json").write_text('[{"code": "A", "na', encoding="utf-8")
+        with self.assertRaises(CorruptDataError):
+            storage.list_products()
+
+    def test_compact_encoding(self):
+        storage = self._storage()
+        storage.add_product(Product(code="A", name="Café", price_no_vat=1.0, ptype="x").to_dict())
+        text = (self.base / "products.json").read_text(encoding="utf-8")
+        self.assertNotIn("\n", text)
+        self.assertIn("Café", text)
+
+    def test_batch_mode_coalesces_writes(self):
+        # Uma só caixa: com o lock entre processos cada operação é gravada no fim
+        storage = self._storage("batch", window=60, multi_terminal=False)
+        storage.add_product(Product(code="A", name="A", price_no_vat=1.0, ptype="x").to_dict())
+        for _ in range(50):
+            storage.adjust_stock("A", 1)
+        # Ainda nada em disco, mas as leituras já veem o valor novo
+        self.assertEqual(json.loads((self.base / "products.json").read_text()), [])
+        self.assertEqual(storage.list_products()[0]["stock"], 50)
+        storage.flush()
+        self.assertEqual(storage.committer.flushes, 1)
+        self.assertEqual(json.loads((self.base / "products.json").read_text())[0]["stock"], 50)
+        self.assertEqual(storage.list_products()[0]["stock"], 50)
+
+    def test_batch_mode_coalesces_writes_with_default_config(self):
+        # multi_terminal fica como na configuração por omissão (lock entre processos)
+        self.assertTrue(DEFAULTS["multi_terminal"])
+        other = self._storage()
+        storage = self._storage("batch", window=60, multi_terminal=DEFAULTS["multi_terminal"])
+        for i in range(50):
+            storage.add_product(Product(code=f"P{i}", name="A", price_no_vat=1.0, ptype="x").to_dict())
+        self.assertEqual(storage.committer.flushes, 0)
+        self.assertEqual(len(storage.list_products()), 50)
+        # Até ao fim da janela esta caixa fica com o lock: as outras esperam
+        self.assertFalse(other._plock.try_acquire())
+        storage.flush()
+        self.assertEqual(storage.committer.flushes, 1)
+        self.assertEqual(len(json.loads((self.base / "products.json").read_text())), 50)
+        self.assertTrue(other._plock.try_acquire())
+        other._plock.release()
+        # A outra caixa vê as alterações ao escrever a seguir
+        other.adjust_stock("P0", 3)
+        self.assertEqual(other.find_product("P0")["stock"], 3)
+        storage.close()
+        other.close()
+
+    def test_idle_mode_flushes_after_quiet_period(self):
+        committer = GroupCommitter("idle", window=0.2)
+        path = self.base / "x.json"
+        done = []
+        committer.write(path, lambda: b"[1]")
+        committer.write(path, lambda: b"[2]", lambda: done.append(True))
+        timer = committer._timer
+        timer.join()
+        self.assertEqual(path.read_bytes(), b"[2]")
+        self.assertEqual(committer.flushes, 1)
+        self.assertEqual(done, [True])
+
+    def test_invalid_level(self):
+        with self.assertRaises(ValueError):
+            GroupCommitter("sometimes")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+import json
+import unittest
+import tempfile
+from pathlib import Path
+
+from models.file_cache import FILE_CACHE
+from models.system_manager import SystemManager
+from models.sqlite_storage import SqliteStorage
+from models.product import Product
+
+class TestCatalogImport(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.base = Path(self.tmp.name)
+        SystemManager.USERS = self.base / "users.json"
+        SystemManager.PRODUCTS = self.base / "products.json"
+        SystemManager.SALES = self.base / "sales.json"
+        SystemManager.INVOICES = self.base / "invoices"
+        self.sm = SystemManager()
+        self.sm.add_product(Product(code="P1", name="Brufen", price_no_vat=3.0, ptype="Medicamento",
+                                    company="B", shop_type="FARMACIA"))
+
+    def tearDown(self):
+        self.sm.close()
+        FILE_CACHE.invalidate()
+        self.tmp.cleanup()
+
+    def test_csv_import_reports_row_errors_and_writes_once(self):
+        path = self.base / "catalogo.csv"
+        path.write_text(
+            "code;name;price_no_vat;ptype;stock\n"
+            "P2;Ben-u-ron;2,50;Medicamento;10\n"
+            "p1;Duplicado na base;1;Medicamento;1\n"
+            "P3;Preço mau;abc;Medicamento;1\n"
+            "P2;Duplicado no ficheiro;1;Medicamento;1\n"
+            ";Sem código;1;Medicamento;1\n"
+            "P4;Aspirina;1.2;;\n",
+            encoding="utf-8",
+        )
+        flushes = self.sm.storage.committer.flushes
+        seen = []
+        report = self.sm.import_catalog_file(path, company="B", shop_type="FARMACIA",
+                                             progress=seen.append)
+        self.assertEqual([p["code"] for p in report.imported], ["P2", "P4"])
+        self.assertEqual([n for n, _ in report.errors], [3, 4, 5, 6])
+        self.assertEqual(seen[-1], 6)
+        self.assertEqual(self.sm.storage.committer.flushes - flushes, 1)
+
+        p2 = self.sm.find_product("P2", "B", "FARMACIA")
+        self.assertEqual((p2["price_no_vat"], p2["stock"]), (2.5, 10))
+        self.assertEqual(self.sm.find_product("P4", "B", "FARMACIA")["ptype"], "Outro")
+
+    def test_jsonl_rows_keep_their_shop(self):
+        path = self.base / "catalogo.jsonl"
+        rows = [{"code": "P1", "name": "Café", "price_no_vat": 0.7, "ptype": "Café",
+                 "company": "A", "shop_type": "RESTAURACAO"}]
+        path.write_text("".join(json.dumps(r) + "\n" for r in rows) + "{mau\n", encoding="utf-8")
+        report = self.sm.import_catalog_file(path)
+        self.assertEqual(len(report.imported), 1)
+        self.assertEqual(report.errors[0][0], 2)
+        self.assertEqual(len(self.sm.list_shop_products("A", "RESTAURACAO")), 1)
+
+    def test_sqlite_bulk_insert_is_all_or_nothing(self):
+        storage = SqliteStorage(self.base / "pos.db")
+        try:
+            sm = SystemManager(storage)
+            report = sm.import_products([{"code": "X1", "name": "Pneu", "price_no_vat": 50}],
+                                        company="C", shop_type="OFICINA")
+            self.assertTrue(report.ok)
+            with self.assertRaises(ValueError):
+                storage.add_products([
+                    {"code": "X2", "name": "Óleo", "company": "C", "shop_type": "OFICINA"},
+                    {"code": "x1", "name": "Repetido", "company": "C", "shop_type": "OFICINA"},
+                ])
+            self.assertEqual([p["code"] for p in sm.list_shop_products("C", "OFICINA")], ["X1"])
+        finally:
+            storage.close()
+
+if __name__ == "__main__":
+    unittest.main()
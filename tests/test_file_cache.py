@@ -0,0 +1,71 @@
+import json
+from datetime import datetime
+import unittest
+import tempfile
+from pathlib import Path
+
+from models.file_cache import FILE_CACHE
+from models.system_manager import SystemManager
+from models.product import Product
+
+class TestFileCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        base = Path(self.tmp.name) / "data"
+        base.mkdir()
+        SystemManager.USERS = base / "users.json"
+        SystemManager.PRODUCTS = base / "products.json"
+        SystemManager.SALES = base / "sales.json"
+        SystemManager.INVOICES = Path(self.tmp.name) / "invoices"
+        self.sm = SystemManager()
+
+    def tearDown(self):
+        self.sm.close()
+        FILE_CACHE.invalidate()
+        self.tmp.cleanup()
+
+    def test_repeated_reads_hit_cache(self):
+        self.sm.add_product(Product(code="A", name="A", price_no_vat=1.0, ptype="x", stock=3))
+        before = self.sm.cache_stats()
+        for _ in range(5):
+            self.assertEqual(len(self.sm.list_products()), 1)
+        after = self.sm.cache_stats()
+        self.assertEqual(after["hits"] - before["hits"], 5)
+        self.assertEqual(after["misses"], before["misses"])
+
+    def test_views_are_read_only(self):
+        self.sm.add_product(Product(code="A", name="A", price_no_vat=1.0, ptype="x", stock=3))
+        p = self.sm.list_products()[0]
+        with self.assertRaises(TypeError):
+            p["stock"] = 100
+        self.assertEqual(self.sm.list_products()[0]["stock"], 3)
+
+    def test_writes_update_cache_in_place(self):
+        self.sm.add_product(Product(code="A", name="A", price_no_vat=1.0, ptype="x", stock=3))
+        self.sm.list_products()
+        misses = self.sm.cache_stats()["misses"]
+        self.sm.adjust_stock("A", 2)
+        self.assertEqual(self.sm.list_products()[0]["stock"], 5)
+        self.assertEqual(self.sm.cache_stats()["misses"], misses)
+
+    def test_external_change_is_detected(self):
+        self.sm.add_product(Product(code="A", name="A", price_no_vat=1.0, ptype="x", stock=3))
+        self.sm.list_products()
+        rows = json.loads(SystemManager.PRODUCTS.read_text(encoding="utf-8"))
+        rows.append(dict(rows[0], code="B"))
+        SystemManager.PRODUCTS.write_text(json.dumps(rows), encoding="utf-8")
+        self.assertEqual([p["code"] for p in self.sm.list_products()], ["A", "B"])
+
+    def test_sales_journal_reads_only_new_lines(self):
+        self.sm.add_product(Product(code="A", name="A", price_no_vat=1.0, ptype="x", stock=3))
+        self.sm.create_invoice(items=[{"code": "A", "name": "A", "qty": 1, "price_no_vat": 1.0}],
+                               seller_username="v1")
+        self.assertEqual(len(self.sm.list_sales()), 1)
+        # Outra caixa acrescenta uma venda diretamente à partição do mês
+        journal = SystemManager.SALES.with_suffix("") / f"{datetime.now():%Y-%m}.jsonl"
+        with journal.open("a", encoding="utf-8") as f:
+            f.write(json.dumps({"id": "X", "seller": "v2", "total_with_vat": 1.0}) + "\n")
+        self.assertEqual([s["id"] for s in self.sm.list_sales()][-1], "X")
+
+if __name__ == "__main__":
+    unittest.main()
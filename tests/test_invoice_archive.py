@@ -0,0 +1,118 @@
+import os
+import unittest
+import tempfile
+from pathlib import Path
+
+from models.file_cache import FILE_CACHE
+from models.invoice_archive import InvoiceArchive
+from models.system_manager import SystemManager
+
+def invoice(n, month="2025-11"):
+    return {"id": f"INV-2025-1-{n:06d}", "timestamp": f"{month}-20T11:30:26"}
+
+class TestInvoiceArchive(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.folder = Path(self.tmp.name) / "invoices"
+        self.archive = InvoiceArchive(self.folder)
+
+    def tearDown(self):
+        self.archive.close()
+        FILE_CACHE.invalidate()
+        self.tmp.cleanup()
+
+    def test_put_and_get_by_month(self):
+        ref = self.archive.put(invoice(1), "<p>um</p>")
+        self.archive.put(invoice(2, "2025-12"), "<p>dois</p>" * 100)
+        self.assertEqual(ref, "archive:2025-11/INV-2025-1-000001")
+        self.assertEqual(self.archive.get("INV-2025-1-000001"), "<p>um</p>")
+        self.assertEqual(self.archive.get("INV-2025-1-000002"), "<p>dois</p>" * 100)
+        self.assertIsNone(self.archive.get("INV-2025-1-000003"))
+        self.assertEqual(sorted(p.name for p in self.folder.glob("*.pack")),
+                         ["2025-11.pack", "2025-12.pack"])
+        # Comprimido: muito menos do que as 100 repetições
+        self.assertLess((self.folder / "2025-12.pack").stat().st_size, 200)
+        view = self.archive.view("INV-2025-1-000001")
+        self.assertEqual(view.read_text(encoding="utf-8"), "<p>um</p>")
+
+    def test_rewrite_wins_and_other_instances_see_it(self):
+        self.archive.put(invoice(1), "v1")
+        other = InvoiceArchive(self.folder)
+        try:
+            self.assertEqual(other.get("INV-2025-1-000001"), "v1")
+            self.archive.put(invoice(1), "v2")
+            self.archive.put(invoice(2), "novo")
+            self.assertEqual(other.get("INV-2025-1-000001"), "v2")
+            self.assertEqual(other.get("INV-2025-1-000002"), "novo")
+            self.assertEqual(len(other), 2)
+        finally:
+            other.close()
+
+    def test_torn_writes_are_ignored(self):
+        self.archive.put(invoice(1), "ok")
+        with open(self.folder / "2025-11.pack", "ab") as f:
+            f.write(b"lixo sem linha no indice")
+        with open(self.folder / "2025-11.idx", "ab") as f:
+            f.write(b"INV-2025-1-000009\t12")  # linha cortada
+        reopened = InvoiceArchive(self.folder)
+        try:
+            self.assertEqual(reopened.get("INV-2025-1-000001"), "ok")
+            self.assertNotIn("INV-2025-1-000009", reopened)
+        finally:
+            reopened.close()
+
+    def test_migrates_loose_html_files(self):
+        (self.folder / "INV20251120113026.html").write_text("<p>antiga</p>", encoding="utf-8")
+        other = self.folder / "INV-2026-1-000001.html"
+        other.write_text("<p>nova</p>", encoding="utf-8")
+        os.utime(other, (1767225600, 1767225600))  # 2026-01-01
+        self.assertEqual(self.archive.migrate(), 2)
+        self.assertEqual(list(self.folder.glob("INV*.html")), [])
+        self.assertEqual(self.archive.locate("INV20251120113026")[0], "2025-11")
+        self.assertEqual(self.archive.get("INV-2026-1-000001"), "<p>nova</p>")
+        self.assertEqual(self.archive.migrate(), 0)
+
+    def test_legacy_sale_reprints_from_archive(self):
+        data = Path(self.tmp.name) / "data"
+        data.mkdir()
+        SystemManager.USERS = data / "users.json"
+        SystemManager.PRODUCTS = data / "products.json"
+        SystemManager.SALES = data / "sales.json"
+        SystemManager.INVOICES = self.folder
+        legacy = {"id": "INV20251120113026", "timestamp": "2025-11-20T11:30:26",
+                  "html_path": str(self.folder / "INV20251120113026.html")}
+        Path(legacy["html_path"]).write_text("<p>antiga</p>", encoding="utf-8")
+        sm = SystemManager()
+        try:
+            path = sm.invoice_html(legacy)
+            self.assertEqual(path.read_text(encoding="utf-8"), "<p>antiga</p>")
+            self.assertFalse(Path(legacy["html_path"]).exists())
+        finally:
+            sm.close()
+
+    def test_stored_legacy_sales_resolve_by_id_after_migration(self):
+        data = Path(self.tmp.name) / "data"
+        data.mkdir()
+        SystemManager.USERS = data / "users.json"
+        SystemManager.PRODUCTS = data / "products.json"
+        SystemManager.SALES = data / "sales.json"
+        SystemManager.INVOICES = self.folder
+        # Ficheiro com data de outro mês que a venda: o pack vem do id, não da venda
+        old = self.folder / "INV20251130235959.html"
+        old.write_text("<p>novembro</p>", encoding="utf-8")
+        sm = SystemManager()
+        try:
+            sm.storage.add_sale({"id": "INV20251130235959", "timestamp": "2025-12-01T00:00:01",
+                                 "seller": "v1", "items": [], "total_with_vat": 1.0,
+                                 "html_path": str(old)})
+            self.assertEqual(sm.archive().locate("INV20251130235959")[0], "2025-11")
+            sale = sm.list_sales()[0]
+            # O caminho guardado fica o antigo (já apagado), mas a reimpressão usa o id
+            self.assertEqual(sale["html_path"], str(old))
+            self.assertFalse(old.exists())
+            self.assertEqual(sm.invoice_html(sale).read_text(encoding="utf-8"), "<p>novembro</p>")
+        finally:
+            sm.close()
+
+if __name__ == "__main__":
+    unittest.main()
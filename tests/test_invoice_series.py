@@ -0,0 +1,101 @@
+import json
+import unittest
+import tempfile
+from datetime import datetime
+from pathlib import Path
+
+from benchmarks.bench_invoice_numbers import check, run_terminals
+from models.file_cache import FILE_CACHE
+from models.invoice_series import InvoiceNumberAllocator, parse_invoice_id
+from models.product import Product
+from models.system_manager import SystemManager
+
+class TestInvoiceSeries(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        base = Path(self.tmp.name) / "data"
+        base.mkdir()
+        SystemManager.USERS = base / "users.json"
+        SystemManager.PRODUCTS = base / "products.json"
+        SystemManager.SALES = base / "sales.json"
+        SystemManager.INVOICES = Path(self.tmp.name) / "invoices"
+        self.series = SystemManager.INVOICES / "series"
+        self.sm = SystemManager()
+        self.sm.add_product(Product(code="C01", name="Coca-Cola", price_no_vat=1.0,
+                                    ptype="Drinks", stock=100))
+
+    def tearDown(self):
+        self.sm.close()
+        FILE_CACHE.invalidate()
+        self.tmp.cleanup()
+
+    def sell(self, qty=1):
+        return self.sm.create_invoice(
+            items=[{"code": "C01", "name": "Coca-Cola", "qty": qty, "price_no_vat": 1.0}],
+            seller_username="v1",
+        )
+
+    def test_same_second_invoices_get_sequential_ids(self):
+        ids = [self.sell()["id"] for _ in range(5)]
+        year = datetime.now().year
+        self.assertEqual(ids, [f"INV-{year}-1-{n:06d}" for n in range(1, 6)])
+        self.assertEqual(len({s["html_path"] for s in self.sm.list_sales()}), 5)
+
+    def test_failed_checkout_does_not_consume_a_number(self):
+        first = self.sell()["id"]
+        with self.assertRaises(ValueError):
+            self.sell(qty=1000)
+        second = self.sell()["id"]
+        self.assertEqual(parse_invoice_id(second)[2], parse_invoice_id(first)[2] + 1)
+
+    def test_block_reservation_writes_once_per_block(self):
+        self.sm.close()
+        self.sm = SystemManager(invoice_block=10)
+        for _ in range(25):
+            self.sell()
+        # Abertura + 2 blocos esgotados
+        self.assertEqual(self.sm.invoice_numbers()._series[datetime.now().year].writes, 3)
+
+    def test_crash_recovery_continues_after_last_sale(self):
+        for _ in range(3):
+            self.sell()
+        # Sem close(): o estado fica "aberto" com o bloco reservado até 101
+        state_path = self.series / f"{datetime.now().year}-1.json"
+        self.assertFalse(json.loads(state_path.read_text())["clean"])
+        self.sm._invoice_numbers._terminal_lock.close()  # o processo "morreu"
+        self.sm.storage.close()
+        FILE_CACHE.invalidate()
+
+        self.sm = SystemManager()
+        self.assertEqual(parse_invoice_id(self.sell()["id"])[2], 4)
+        self.sm.close()
+        self.assertTrue(json.loads(state_path.read_text())["clean"])
+
+        # Depois de um fecho limpo a série continua sem reler as vendas
+        self.sm = SystemManager()
+        self.sm._last_invoice_number = lambda year, terminal: self.fail("não devia reler")
+        self.assertEqual(parse_invoice_id(self.sell()["id"])[2], 5)
+
+    def test_second_manager_gets_its_own_terminal(self):
+        self.sell()
+        other = SystemManager()
+        try:
+            self.assertEqual(other.invoice_numbers().terminal, "2")
+            with self.assertRaises(ValueError):
+                InvoiceNumberAllocator(self.series, lambda y, t: 0, terminal="1")
+        finally:
+            other.close()
+
+    def test_concurrent_tills_issue_unique_contiguous_numbers(self):
+        base = Path(self.tmp.name)
+        numbers = 5_000
+        elapsed = run_terminals(base, terminals=3, numbers=numbers)
+        series = check(base)
+        self.assertEqual(len(series), 3)
+        for issued in series.values():
+            self.assertEqual(issued, list(range(1, numbers + 1)))
+        # Inclui o arranque dos processos; sem escrita por fatura passa largamente
+        self.assertGreater(3 * numbers / elapsed, 1000)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+import unittest
+import tempfile
+from pathlib import Path
+
+from models.file_cache import FILE_CACHE
+from models.invoice_template import TEMPLATE_DIR, InvoiceTemplate, TemplateSet
+from models.product import Product
+from models.system_manager import SystemManager
+
+INVOICE = {
+    "id": "INV-2025-1-000001", "timestamp": "2025-11-20T11:30:26", "seller": "v1",
+    "company": "ISTEC", "shop_type": "FARMACIA", "vat_rate": 0.23,
+    "total_no_vat": 3.5, "total_with_vat": 4.31,
+    "items": [{"code": "01", "name": "Brufen <400>", "qty": 1, "price_no_vat": 3.0},
+              {"code": "02", "name": "Água", "qty": 2, "price_no_vat": 0.25}],
+}
+
+class TestInvoiceTemplate(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.base = Path(self.tmp.name)
+
+    def tearDown(self):
+        FILE_CACHE.invalidate()
+        self.tmp.cleanup()
+
+    def test_default_template(self):
+        out = TemplateSet().render(INVOICE)
+        self.assertNotIn("${", out)
+        self.assertIn("<title>Fatura INV-2025-1-000001</title>", out)
+        self.assertIn("20/11/2025 11:30", out)
+        self.assertIn("<td>Brufen &lt;400&gt;</td>", out)
+        self.assertIn("<td>0.50€</td>", out)
+        self.assertEqual(out.count("<tr><td>"), 2)
+        self.assertIn("IVA (23%)", out)
+        self.assertIn("background:#f5f5f5;", out)  # CSS intacto
+
+    def test_template_per_shop_type(self):
+        (self.base / "invoice.html").write_text(
+            (TEMPLATE_DIR / "invoice.html").read_text(encoding="utf-8"), encoding="utf-8")
+        (self.base / "invoice-FARMACIA.html").write_text(
+            "<h1>${company}</h1>\n<!-- row -->\n${code}:${qty}\n<!-- /row -->\n${total_with_vat}",
+            encoding="utf-8")
+        templates = TemplateSet(self.base)
+        self.assertEqual(templates.render(INVOICE), "<h1>ISTEC</h1>\n01:1\n02:2\n4.31")
+        other = templates.render(dict(INVOICE, shop_type="OFICINA"))
+        self.assertIn("<h1>Fatura</h1>", other)
+        self.assertIs(templates.get("OFICINA"), templates.get(None))
+
+    def test_template_without_row_block_is_rejected(self):
+        with self.assertRaises(ValueError):
+            InvoiceTemplate("<p>${id}</p>")
+
+    def test_render_invoices_in_parallel(self):
+        data = self.base / "data"
+        data.mkdir()
+        SystemManager.USERS = data / "users.json"
+        SystemManager.PRODUCTS = data / "products.json"
+        SystemManager.SALES = data / "sales.json"
+        SystemManager.INVOICES = self.base / "invoices"
+        sm = SystemManager(background_render=False)
+        try:
+            sm.add_product(Product(code="C01", name="Café", price_no_vat=1.0, ptype="x", stock=100))
+            invoices = [sm.create_invoice(items=[{"code": "C01", "name": "Café", "qty": 1,
+                                                  "price_no_vat": 1.0}], seller_username="v1")
+                        for _ in range(6)]
+            folder = self.base / "templates"
+            folder.mkdir()
+            (folder / "invoice.html").write_text(
+                "v2 ${id}\n<!-- row -->${name}\n<!-- /row -->", encoding="utf-8")
+            sm.templates = TemplateSet(folder)
+            report = sm.render_invoices(workers=2)
+            self.assertEqual(report["rendered"], 6)
+            self.assertGreater(report["per_second"], 0)
+            for inv in invoices:
+                self.assertEqual(sm.archive().get(inv["id"]), f"v2 {inv['id']}\nCafé\n")
+            self.assertEqual(sm.render_invoices([invoices[0]["id"]])["rendered"], 1)
+        finally:
+            sm.close()
+
+if __name__ == "__main__":
+    unittest.main()
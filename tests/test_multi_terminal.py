@@ -0,0 +1,42 @@
+import unittest
+import tempfile
+from pathlib import Path
+
+from benchmarks.bench_terminals import INITIAL_STOCK, check, open_storage, prepare, run_terminals
+from models.file_cache import FILE_CACHE
+
+class TestMultiTerminal(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.base = Path(self.tmp.name)
+        prepare(self.base, n_products=10)
+
+    def tearDown(self):
+        FILE_CACHE.invalidate()
+        self.tmp.cleanup()
+
+    def test_concurrent_tills_lose_nothing(self):
+        # 3 caixas a vender e 1 processo a repor stock, todos ao mesmo tempo
+        run_terminals(self.base, terminals=3, checkouts=25, restockers=1)
+        state = check(self.base)
+        self.assertEqual(state["sales"], 75)
+        self.assertEqual(state["stock"], INITIAL_STOCK - 75 + 25)
+        self.assertEqual(state["rollup_count"], 75)
+        self.assertAlmostEqual(state["month_total"], 75 * 1.23, places=2)
+
+    def test_open_storage_sees_other_process_writes(self):
+        storage = open_storage(self.base)
+        try:
+            self.assertEqual(storage.shop_monthly_totals("Loja", "OUTRO"), {})
+            run_terminals(self.base, terminals=1, checkouts=3)
+            # Os totais em memória são relidos porque a versão partilhada mudou
+            self.assertAlmostEqual(sum(storage.shop_monthly_totals("Loja", "OUTRO").values()), 3.69)
+            self.assertEqual(sum(storage.monthly_totals().values()), 3.69)
+            storage.adjust_stock("P0000", -1, "Loja", "OUTRO")
+            self.assertEqual(storage.find_product("P0000", "Loja", "OUTRO")["stock"],
+                             INITIAL_STOCK - 4)
+        finally:
+            storage.close()
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+import json
+import unittest
+import tempfile
+from pathlib import Path
+
+from models import passwords
+from models.file_cache import FILE_CACHE
+from models.json_storage import JsonStorage
+from models.system_manager import SystemManager
+
+# Custo baixo para os testes não demorarem
+COST = 1000
+
+class TestPasswordHashing(unittest.TestCase):
+    def test_hash_and_verify(self):
+        for scheme, cost in (("pbkdf2_sha256", COST), ("scrypt", 2 ** 4)):
+            hashed = passwords.hash_password("segredo", scheme, cost)
+            self.assertTrue(hashed.startswith(scheme + "$"))
+            self.assertNotEqual(hashed, passwords.hash_password("segredo", scheme, cost))  # sal
+            self.assertTrue(passwords.verify_password("segredo", hashed))
+            self.assertFalse(passwords.verify_password("Segredo", hashed))
+            self.assertFalse(passwords.needs_rehash(hashed, scheme, cost))
+
+    def test_legacy_and_cost_changes(self):
+        self.assertTrue(passwords.verify_password("abc", "abc"))
+        self.assertFalse(passwords.verify_password("abc", ""))
+        self.assertTrue(passwords.needs_rehash("abc"))
+        hashed = passwords.hash_password("abc", cost=COST)
+        self.assertTrue(passwords.needs_rehash(hashed, cost=COST * 2))
+        self.assertTrue(passwords.needs_rehash(hashed, "scrypt"))
+        self.assertFalse(passwords.verify_password("abc", "pbkdf2_sha256$x$y"))
+
+class TestLogin(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        base = Path(self.tmp.name)
+        SystemManager.INVOICES = base / "invoices"
+        self.storage = JsonStorage(base / "users.json", base / "products.json", base / "sales.json")
+        self.sm = SystemManager(storage=self.storage, password_cost=COST)
+        self.sm.register_admin(company="L", vat="505", shop_type="OUTRO",
+                               username="adm", email="a@a", password="123456")
+
+    def tearDown(self):
+        self.sm.close()
+        FILE_CACHE.invalidate()
+        self.tmp.cleanup()
+
+    def _stored(self, username):
+        return self.storage.find_user(username)["password"]
+
+    def test_passwords_are_stored_hashed(self):
+        self.assertTrue(passwords.is_hashed(self._stored("adm")))
+        user = self.sm.login("adm", "123456")
+        self.assertEqual(user["username"], "adm")
+        self.assertNotIn("password", user)
+        self.assertIsNone(self.sm.login("adm", "errada"))
+        self.assertIsNone(self.sm.login("ninguem", "123456"))
+
+    def test_legacy_plaintext_is_rehashed_on_login(self):
+        rows = json.loads(self.storage.users_path.read_text(encoding="utf-8"))
+        rows[0]["password"] = "antiga"
+        self.storage.users_path.write_text(json.dumps(rows), encoding="utf-8")
+        self.assertIsNotNone(self.sm.login("adm", "antiga"))
+        stored = self._stored("adm")
+        self.assertTrue(passwords.is_hashed(stored))
+        self.assertIsNotNone(self.sm.login("adm", "antiga"))
+        self.assertEqual(self._stored("adm"), stored)  # já não é refeito
+
+    def test_cost_change_rehashes(self):
+        self.sm.password_cost = COST + 1
+        self.assertIsNotNone(self.sm.login("adm", "123456"))
+        self.assertIn(f"${COST + 1}$", self._stored("adm"))
+
+    def test_change_and_reset(self):
+        self.assertFalse(self.sm.change_user_password("adm", "errada", "novapass"))
+        self.assertTrue(self.sm.change_user_password("adm", "123456", "novapass"))
+        self.assertTrue(passwords.is_hashed(self._stored("adm")))
+        self.assertIsNotNone(self.sm.login("adm", "novapass"))
+        self.assertTrue(self.sm.reset_password("adm", "outra1"))
+        self.assertIsNone(self.sm.login("adm", "novapass"))
+        self.assertIsNotNone(self.sm.login("adm", "outra1"))
+
+    def test_login_async(self):
+        futures = [self.sm.login_async("adm", pwd) for pwd in ("123456", "x", "123456")]
+        self.assertEqual([f.result() is not None for f in futures], [True, False, True])
+
+if __name__ == "__main__":
+    unittest.main()
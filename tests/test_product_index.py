@@ -0,0 +1,60 @@
+import json
+import unittest
+import tempfile
+from pathlib import Path
+
+from models.file_cache import FILE_CACHE
+from models.system_manager import SystemManager
+from models.json_storage import JsonStorage
+from models.product import Product
+
+class TestProductIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        base = Path(self.tmp.name)
+        SystemManager.INVOICES = base / "invoices"
+        self.storage = JsonStorage(base / "users.json", base / "products.json", base / "sales.json")
+        self.sm = SystemManager(storage=self.storage)
+        self.sm.add_product(Product(code="01", name="Café", price_no_vat=0.7, ptype="Café",
+                                    stock=5, company="A", shop_type="RESTAURACAO"))
+        self.sm.add_product(Product(code="02", name="Sopa", price_no_vat=2.0, ptype="Entrada",
+                                    stock=5, company="A", shop_type="RESTAURACAO"))
+        self.sm.add_product(Product(code="01", name="Brufen", price_no_vat=3.0, ptype="Medicamento",
+                                    stock=5, company="B", shop_type="FARMACIA"))
+
+    def tearDown(self):
+        FILE_CACHE.invalidate()
+        self.tmp.cleanup()
+
+    def test_same_code_in_two_shops(self):
+        updated = self.sm.adjust_stock("01", 3, company="B", shop_type="FARMACIA")
+        self.assertEqual(updated["name"], "Brufen")
+        self.sm.update_product("01", company="B", shop_type="FARMACIA", min_stock=2)
+        cafe = self.sm.find_product("01", "A", "RESTAURACAO")
+        self.assertEqual((cafe["stock"], cafe["min_stock"]), (5, 0))
+        self.assertEqual(self.sm.find_product("01", "b", "farmacia")["stock"], 8)
+
+    def test_shop_and_ptype_buckets(self):
+        self.assertEqual([p["name"] for p in self.sm.list_shop_products("A", "RESTAURACAO")],
+                         ["Café", "Sopa"])
+        self.assertEqual([p["name"] for p in self.sm.list_shop_products("A", "RESTAURACAO", "Entrada")],
+                         ["Sopa"])
+        self.sm.update_product("02", company="A", shop_type="RESTAURACAO", ptype="Prato")
+        self.assertEqual(self.sm.list_shop_products("A", "RESTAURACAO", "Entrada"), [])
+        self.assertEqual([p["name"] for p in self.sm.list_shop_products("A", "RESTAURACAO", "Prato")],
+                         ["Sopa"])
+
+    def test_duplicate_is_detected_through_index(self):
+        with self.assertRaises(ValueError):
+            self.sm.add_product(Product(code="01", name="x", price_no_vat=1.0, ptype="x",
+                                        company="A", shop_type="RESTAURACAO"))
+
+    def test_index_follows_external_changes(self):
+        self.sm.list_shop_products("A", "RESTAURACAO")
+        rows = json.loads(self.storage.products_path.read_text(encoding="utf-8"))
+        rows.append(dict(rows[0], code="03", name="Bolo"))
+        self.storage.products_path.write_text(json.dumps(rows), encoding="utf-8")
+        self.assertEqual(self.sm.find_product("03", "A", "RESTAURACAO")["name"], "Bolo")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+import pickle
+import unittest
+import tempfile
+from pathlib import Path
+
+from models.admin import Admin
+from models.file_cache import FILE_CACHE
+from models.product import Product
+from models.sale import InvoiceLine, Sale
+from models.system_manager import SystemManager
+from models.user import User
+
+class TestRecords(unittest.TestCase):
+    def test_round_trip_keeps_unknown_keys(self):
+        raw = {"username": "a", "email": "a@a", "password": "x", "role": "ADMIN",
+               "company": "Loja", "shop_type": "OUTRO", "photo_path": "", "vat": "505"}
+        u = User.from_dict(raw)
+        self.assertEqual(u.to_dict(), raw)
+        self.assertEqual(u["vat"], "505")
+        self.assertEqual(u.get("nada", 1), 1)
+        self.assertIn("vat", u)
+        self.assertEqual(u, raw)
+        self.assertFalse(hasattr(u, "__dict__"))
+
+    def test_missing_keys_get_defaults(self):
+        p = Product.from_dict({"code": "A", "name": "A"})
+        self.assertEqual((p.stock, p["price_no_vat"], p.extra), (0, 0.0, None))
+        self.assertEqual(Product(code="A", name="A").to_dict(), p.to_dict())
+        with self.assertRaises(TypeError):
+            Product(codigo="A")
+
+    def test_records_are_read_only(self):
+        p = Product(code="A", name="A", stock=3)
+        with self.assertRaises(TypeError):
+            p["stock"] = 100
+        with self.assertRaises(AttributeError):
+            p.stock = 100
+        q = p.replace(stock=5)
+        self.assertEqual((p.stock, q.stock, q.name), (3, 5, "A"))
+
+    def test_sale_lines(self):
+        raw = {"id": "INV1", "timestamp": "2025-01-01T10:00:00", "seller": "v",
+               "company": "L", "shop_type": "OUTRO",
+               "items": [{"code": "A", "name": "A", "qty": 2, "price_no_vat": 1.0}],
+               "total_no_vat": 2.0, "vat_rate": 0.23, "total_with_vat": 2.46, "html_path": None}
+        sale = Sale.from_dict(raw)
+        self.assertIsInstance(sale["items"][0], InvoiceLine)
+        self.assertEqual(sale.lines[0].qty, 2)
+        self.assertEqual(dict(sale.items())["id"], "INV1")
+        self.assertEqual(sale.to_dict(), raw)
+        self.assertEqual(sale, raw)
+        self.assertEqual(pickle.loads(pickle.dumps(sale)), sale)
+
+    def test_subclasses(self):
+        a = Admin(username="a", email="a@a", password="x")
+        self.assertEqual(a.role, "ADMIN")
+        self.assertEqual(type(Admin.from_dict(a.to_dict())), Admin)
+
+class TestManagerReturnsRecords(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        base = Path(self.tmp.name)
+        SystemManager.USERS = base / "users.json"
+        SystemManager.PRODUCTS = base / "products.json"
+        SystemManager.SALES = base / "sales.json"
+        SystemManager.INVOICES = base / "invoices"
+        self.sm = SystemManager()
+
+    def tearDown(self):
+        self.sm.close()
+        FILE_CACHE.invalidate()
+        self.tmp.cleanup()
+
+    def test_list_apis(self):
+        self.sm.register_admin(company="L", vat="505", shop_type="OUTRO",
+                               username="adm", email="a@a", password="x")
+        self.sm.add_product(Product(code="A", name="A", price_no_vat=1.0, ptype="x",
+                                    stock=3, company="L", shop_type="OUTRO"))
+        self.sm.create_invoice(items=[{"code": "A", "name": "A", "qty": 1, "price_no_vat": 1.0}],
+                               seller_username="adm")
+        self.assertIsInstance(self.sm.list_products()[0], Product)
+        self.assertEqual(self.sm.list_shop_products("L", "OUTRO")[0]["stock"], 2)
+        users = self.sm.list_shop_users("L", "OUTRO")
+        self.assertEqual((type(users[0]), users[0]["vat"]), (User, "505"))
+        self.assertIsInstance(self.sm.list_sales()[0], Sale)
+        # O login continua a devolver um dict
+        self.assertEqual(type(self.sm.login("adm", "x")), dict)
+
+if __name__ == "__main__":
+    unittest.main()
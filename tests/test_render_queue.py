@@ -0,0 +1,86 @@
+import json
+import unittest
+import tempfile
+from pathlib import Path
+
+from models.file_cache import FILE_CACHE
+from models.invoice_archive import InvoiceArchive
+from models.product import Product
+from models.render_queue import InvoiceRenderQueue
+from models.system_manager import SystemManager
+
+def render(invoice):
+    return f"<html>{invoice['id']}</html>"
+
+class TestRenderQueue(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.base = Path(self.tmp.name)
+        self.journal = self.base / "render_queue-1.jsonl"
+        self.archive = InvoiceArchive(self.base / "invoices")
+
+    def tearDown(self):
+        self.archive.close()
+        FILE_CACHE.invalidate()
+        self.tmp.cleanup()
+
+    def invoice(self, n):
+        return {"id": f"INV-{n}", "timestamp": "2025-11-20T11:30:26"}
+
+    def test_renders_in_background_and_clears_journal(self):
+        q = InvoiceRenderQueue(self.journal, render, self.archive)
+        for n in range(20):
+            q.submit(self.invoice(n))
+        q.join()
+        self.assertEqual(q.pending(), 0)
+        self.assertEqual(q.rendered, 20)
+        self.assertEqual(self.archive.get("INV-7"), "<html>INV-7</html>")
+        q.close()
+        self.assertFalse(self.journal.exists())
+
+    def test_pending_renders_survive_a_crash(self):
+        # Pedidos registados por um processo que parou antes de os gerar
+        lines = [{"invoice": self.invoice(1)}, {"invoice": self.invoice(2)}, {"done": "INV-1"}]
+        self.journal.write_text("".join(json.dumps(l) + "\n" for l in lines) + '{"invoi',
+                                encoding="utf-8")
+        q = InvoiceRenderQueue(self.journal, render, self.archive)
+        q.join()
+        q.close()
+        self.assertIn("INV-2", self.archive)
+        self.assertNotIn("INV-1", self.archive)
+
+    def test_render_now_does_not_wait_for_the_queue(self):
+        q = InvoiceRenderQueue(self.journal, render, self.archive)
+        try:
+            calls = []
+            q.render = lambda inv: calls.append(inv["id"]) or render(inv)
+            path = q.render_now(self.invoice(5))  # não está na fila: gera já
+            self.assertEqual(path.read_text(), "<html>INV-5</html>")
+            q.render_now(self.invoice(5))  # já está no arquivo: só extrai
+            self.assertEqual(calls, ["INV-5"])
+        finally:
+            q.close()
+
+    def test_checkout_with_and_without_queue(self):
+        data = self.base / "data"
+        data.mkdir()
+        SystemManager.USERS = data / "users.json"
+        SystemManager.PRODUCTS = data / "products.json"
+        SystemManager.SALES = data / "sales.json"
+        SystemManager.INVOICES = self.base / "invoices"
+        for background in (False, True):
+            sm = SystemManager(background_render=background)
+            try:
+                sm.add_product(Product(code=f"C{background:d}", name="Coca-Cola", price_no_vat=1.0,
+                                       ptype="Drinks", stock=10))
+                invoice = sm.create_invoice(
+                    items=[{"code": f"C{background:d}", "name": "Coca-Cola", "qty": 1,
+                            "price_no_vat": 1.0}],
+                    seller_username="v1",
+                )
+            finally:
+                sm.close()  # espera pelos HTML em fila
+            self.assertIn(invoice["id"], self.archive.get(invoice["id"]))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,163 @@
+import unittest
+from datetime import datetime, date
+
+from models import sales_columns
+from models.sales_columns import GROUPS, SalesColumns
+from storage_helpers import StorageMixin, json_storage, sqlite_storage
+
+SALES = [
+    # fora de ordem de propósito: as colunas têm de ficar ordenadas por data
+    ("2025-03-02T09:15:00", "ana", "Loja", "FARMACIA", 10.10),
+    ("2025-01-31T23:59:59", "rui", "Loja", "OFICINA", 5.05),
+    ("2025-02-01T00:00:00", "ana", "Loja", "FARMACIA", 0.10),
+    ("2025-02-01T00:00:00", "ana", "Loja", "FARMACIA", 0.20),
+    ("2024-12-30T18:30:00", "eva", "Outra", "FARMACIA", 7.77),
+    ("2025-03-03T09:45:00", "rui", "Loja", "OFICINA", 12.34),
+]
+
+
+def _reference(sales, by, since=None, until=None, sellers=None, company=None, shop_type=None):
+    """O ciclo sobre dicts que as colunas substituem."""
+    res = {}
+    for s in sales:
+        dt = datetime.fromisoformat(s["timestamp"])
+        if since is not None and dt < datetime(since.year, since.month, since.day):
+            continue
+        if until is not None and dt >= datetime(until.year, until.month, until.day):
+            continue
+        if sellers is not None and s["seller"] not in sellers:
+            continue
+        if company is not None and s["company"] != company:
+            continue
+        if shop_type is not None and s["shop_type"] != shop_type:
+            continue
+        key = {"month": dt.strftime("%Y-%m"), "day": dt.strftime("%Y-%m-%d"),
+               "seller": s["seller"], "shop": f"{s['company']}/{s['shop_type']}",
+               "hour": dt.strftime("%H"), "weekday": str(dt.weekday())}[by]
+        res[key] = round(res.get(key, 0.0) + s["total_with_vat"], 2)
+    return res
+
+
+class ColumnsMixin(StorageMixin):
+    def setUp(self):
+        super().setUp()
+        self.sales = []
+        for ts, seller, company, shop_type, total in SALES:
+            self._add(ts, seller, company, shop_type, total)
+
+    def _add(self, ts, seller, company, shop_type, total):
+        sale = {"id": f"S{len(self.sales)}", "timestamp": ts, "seller": seller,
+                "company": company, "shop_type": shop_type, "items": [],
+                "total_with_vat": total}
+        self.storage.add_sale(sale)
+        self.sales.append(sale)
+
+    def _check(self, **filters):
+        for by in GROUPS:
+            self.assertEqual(self.storage.sales_totals(by, **filters),
+                             _reference(self.sales, by, since=filters.get("since"),
+                                        until=filters.get("until"),
+                                        sellers=filters.get("allowed_sellers"),
+                                        company=filters.get("company"),
+                                        shop_type=filters.get("shop_type")), by)
+
+    def test_groups_match_dict_loop(self):
+        self._check()
+        self._check(since=date(2025, 1, 1))
+        self._check(since=date(2025, 2, 1), until=date(2025, 3, 3))
+        self._check(allowed_sellers=["ana", "eva"])
+        self._check(company="Loja", shop_type="FARMACIA")
+        self._check(since=date(2025, 1, 1), allowed_sellers=["rui"], company="Loja")
+        self.assertEqual(self.storage.sales_totals("month", until=date(2020, 1, 1)), {})
+
+    def test_new_sales_are_picked_up(self):
+        self._check()
+        self._add("2025-03-01T08:00:00", "eva", "Outra", "FARMACIA", 1.11)
+        self._add("2026-01-05T12:00:00", "novo", "Loja", "OFICINA", 3.0)
+        self._check()
+        self._check(since=date(2025, 3, 1))
+
+    def test_legacy_sales_use_the_seller_shop(self):
+        # Vendas antigas não têm loja: contam na do vendedor, nos dois backends
+        self.storage.add_user({"username": "velho", "email": "velho@x", "password": "x",
+                               "role": "VENDOR", "company": "Loja", "shop_type": "OFICINA"})
+        self.storage.add_sale({"id": "OLD", "timestamp": "2025-02-10T10:00:00",
+                               "seller": "velho", "items": [], "total_with_vat": 2.5})
+        self.assertEqual(self.storage.sales_totals("shop")["Loja/OFICINA"], 19.89)
+        self.assertEqual(self.storage.sales_totals("seller", company="Loja", shop_type="OFICINA"),
+                         {"rui": 17.39, "velho": 2.5})
+
+    def test_unknown_group(self):
+        with self.assertRaises(ValueError):
+            self.storage.sales_totals("ano")
+
+
+class TestJsonColumns(ColumnsMixin, unittest.TestCase):
+    def _make_storage(self):
+        return json_storage(self.base)
+
+    def test_totals_match_old_api(self):
+        self.assertEqual(self.storage.monthly_totals(["ana"]), {"2025-02": 0.3, "2025-03": 10.1})
+        self.assertEqual(self.storage.totals_by_seller(since=date(2025, 1, 1)),
+                         {"ana": 10.4, "rui": 17.39})
+
+    def test_cache_is_reloaded_and_caught_up(self):
+        self.storage.sales_totals()
+        self.storage.close()
+        path = self.base / "sales_columns.bin"
+        self.assertTrue(path.exists())
+        columns = SalesColumns(path)
+        self.assertEqual(len(columns), len(SALES))
+        self.assertEqual(columns.totals("seller"), _reference(self.sales, "seller"))
+        columns.close()
+
+        # Vendas gravadas por outra abertura só são lidas a partir do offset guardado
+        self.storage = self._make_storage()
+        self._add("2025-03-04T10:00:00", "ana", "Loja", "FARMACIA", 2.5)
+        cols = self.storage.columns()
+        self.assertEqual(len(cols), len(SALES) + 1)
+        self._check()
+
+    def test_corrupt_cache_is_rebuilt(self):
+        self.storage.sales_totals()
+        self.storage.close()
+        (self.base / "sales_columns.bin").write_bytes(b"lixo")
+        self.storage = self._make_storage()
+        self._check()
+
+    def test_undated_sales_only_count_without_dates(self):
+        self.storage.add_sale({"id": "X", "timestamp": "?", "seller": "ana", "company": "Loja",
+                               "shop_type": "FARMACIA", "items": [], "total_with_vat": 1.0})
+        self.assertEqual(self.storage.sales_totals("month"), _reference(self.sales, "month"))
+        self.assertEqual(self.storage.sales_totals("seller")["ana"], 11.4)
+        self.assertNotIn("ana", self.storage.sales_totals("seller", since=date(2025, 3, 3)))
+
+    @unittest.skipIf(sales_columns.load_numpy() is None, "NumPy não instalado")
+    def test_appends_reuse_spare_capacity(self):
+        self.storage.sales_totals()
+        self.storage.close()
+        self.storage = self._make_storage()
+        cols = self.storage.columns()
+        self.assertIsNone(cols._buf)  # vistas sobre o ficheiro (mmap)
+        # A primeira venda copia o histórico uma vez, para colunas com espaço livre
+        self._add("2025-04-01T09:00:00", "eva", "Outra", "FARMACIA", 0.5)
+        self._check()
+        buffers = cols._buf
+        self.assertGreater(len(buffers[0]), len(cols))
+        for i in range(20):
+            # Uma venda e uma consulta de cada vez (como no dashboard), uma fora de ordem
+            ts = "2024-11-01T08:00:00" if i == 10 else f"2025-04-{i + 1:02d}T10:00:00"
+            self._add(ts, "eva", "Outra", "FARMACIA", 1.0 + i)
+            self._check()
+        # As vendas novas foram para o espaço livre: o histórico não foi recopiado
+        self.assertIs(cols._buf, buffers)
+        self.assertEqual(len(cols), len(SALES) + 21)
+
+
+class TestSqliteColumns(ColumnsMixin, unittest.TestCase):
+    def _make_storage(self):
+        return sqlite_storage(self.base)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,113 @@
+import csv
+import gzip
+import json
+import unittest
+import tempfile
+from datetime import date
+from pathlib import Path
+from unittest import mock
+
+from models import sales_export
+from models.file_cache import FILE_CACHE
+from models.sales_export import ExportCancelled, guess_format
+from models.system_manager import SystemManager
+
+class TestSalesExport(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.base = Path(self.tmp.name)
+        data = self.base / "data"
+        data.mkdir()
+        SystemManager.USERS = data / "users.json"
+        SystemManager.PRODUCTS = data / "products.json"
+        SystemManager.SALES = data / "sales.json"
+        SystemManager.INVOICES = self.base / "invoices"
+        self.sm = SystemManager()
+        n = 0
+        for month, shop, seller in (("2024-12", "FARMACIA", "f1"), ("2025-01", "FARMACIA", "f2"),
+                                    ("2025-01", "OFICINA", "o1"), ("2025-02", "FARMACIA", "f1")):
+            n += 1
+            self.sm.storage.add_sale({
+                "id": f"INV{n}", "timestamp": f"{month}-10T10:00:00", "seller": seller,
+                "company": "Grupo", "shop_type": shop, "total_no_vat": 3.0, "vat_rate": 0.23,
+                "total_with_vat": 3.69,
+                "items": [{"code": "A", "name": "Aspirina", "qty": 2, "price_no_vat": 1.0},
+                          {"code": "B", "name": "Água; fresca", "qty": 1, "price_no_vat": 1.0}],
+            })
+
+    def tearDown(self):
+        self.sm.close()
+        FILE_CACHE.invalidate()
+        self.tmp.cleanup()
+
+    def test_guess_format(self):
+        self.assertEqual(guess_format(Path("v.csv")), ("csv", False))
+        self.assertEqual(guess_format(Path("v.jsonl.gz")), ("jsonl", True))
+        self.assertEqual(guess_format(Path("v.CSV.GZ")), ("csv", True))
+
+    def test_headers_csv_with_filters(self):
+        out = self.base / "farmacia.csv"
+        n = self.sm.export_sales(out, since=date(2025, 1, 1), company="Grupo",
+                                 shop_type="FARMACIA")
+        self.assertEqual(n, 2)
+        with out.open(encoding="utf-8", newline="") as f:
+            rows = list(csv.DictReader(f, delimiter=";"))
+        self.assertEqual([r["id"] for r in rows], ["INV2", "INV4"])
+        self.assertEqual(rows[0]["total_with_vat"], "3.69")
+        self.assertEqual(self.sm.export_sales(out, seller="f1", until=date(2025, 1, 1)), 1)
+
+    def test_legacy_sales_use_the_seller_shop(self):
+        # Vendas antigas não têm loja: contam na do vendedor, como nos totais
+        self.sm.add_vendor(username="velho", email="velho@x", password="x",
+                           company="Grupo", shop_type="OFICINA")
+        self.sm.storage.add_sale({
+            "id": "OLD1", "timestamp": "2025-01-20T10:00:00", "seller": "velho",
+            "total_no_vat": 1.0, "vat_rate": 0.23, "total_with_vat": 1.23, "items": []})
+        out = self.base / "oficina.csv"
+        self.assertEqual(self.sm.export_sales(out, company="Grupo", shop_type="OFICINA"), 2)
+        with out.open(encoding="utf-8", newline="") as f:
+            self.assertEqual([r["id"] for r in csv.DictReader(f, delimiter=";")], ["INV3", "OLD1"])
+        self.assertEqual(self.sm.export_sales(out, shop_type="FARMACIA"), 3)
+
+    def test_line_items_jsonl_gzip(self):
+        out = self.base / "linhas.jsonl.gz"
+        self.assertEqual(self.sm.export_sales(out, detail="items", seller="o1"), 1)
+        with gzip.open(out, "rt", encoding="utf-8") as f:
+            rows = [json.loads(line) for line in f]
+        self.assertEqual([(r["invoice_id"], r["code"], r["subtotal"]) for r in rows],
+                         [("INV3", "A", 2.0), ("INV3", "B", 1.0)])
+        self.assertEqual(rows[1]["name"], "Água; fresca")
+
+    def test_sales_without_items_are_counted(self):
+        for n in (5, 6):
+            self.sm.storage.add_sale({
+                "id": f"INV{n}", "timestamp": "2025-03-10T10:00:00", "seller": "f1",
+                "company": "Grupo", "shop_type": "FARMACIA", "total_no_vat": 0.0,
+                "vat_rate": 0.23, "total_with_vat": 0.0, "items": []})
+        out = self.base / "linhas.csv"
+        seen = []
+        with mock.patch.object(sales_export, "PROGRESS_EVERY", 2):
+            n = self.sm.export_sales(out, detail="items", progress=seen.append)
+        self.assertEqual(n, 6)
+        self.assertEqual(seen, [2, 4, 6, 6])
+        with out.open(encoding="utf-8", newline="") as f:
+            self.assertEqual(len(list(csv.DictReader(f, delimiter=";"))), 8)
+
+    def test_progress_and_cancel_leave_no_partial_file(self):
+        out = self.base / "vendas.csv"
+        seen = []
+        with mock.patch.object(sales_export, "PROGRESS_EVERY", 2):
+            self.sm.export_sales(out, progress=seen.append)
+            self.assertEqual(seen, [2, 4, 4])
+            out.unlink()
+            with self.assertRaises(ExportCancelled):
+                self.sm.export_sales(out, cancelled=lambda: True)
+        self.assertEqual(list(self.base.glob("*vendas*")), [])
+
+    def test_export_sales_csv_keeps_working(self):
+        out = self.base / "todas.csv"
+        self.sm.export_sales_csv(out)
+        self.assertEqual(len(out.read_text(encoding="utf-8").splitlines()), 5)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+import json
+import unittest
+import tempfile
+from pathlib import Path
+
+from models.file_cache import FILE_CACHE
+from models.sales_journal import SalesJournal, iter_json_array
+from models.json_storage import JsonStorage
+
+class TestSalesJournal(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.base = Path(self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_append_and_iterate(self):
+        journal = SalesJournal(self.base / "sales.jsonl")
+        journal.append({"id": "A", "total_with_vat": 1.0})
+        journal.append({"id": "B", "total_with_vat": 2.0})
+        self.assertEqual([s["id"] for s in journal], ["A", "B"])
+        self.assertEqual(len((self.base / "sales.jsonl").read_text().splitlines()), 2)
+
+    def test_torn_tail_is_discarded(self):
+        path = self.base / "sales.jsonl"
+        path.write_text('{"id": "A"}\n{"id": "B", "tot', encoding="utf-8")
+        journal = SalesJournal(path)
+        journal.append({"id": "C"})
+        self.assertEqual([s["id"] for s in journal], ["A", "C"])
+
+    def test_legacy_array_is_migrated(self):
+        legacy = [{"id": "INV1", "seller": "v1", "timestamp": "2025-11-20T11:30:26",
+                   "items": [], "total_with_vat": 10.0}]
+        (self.base / "sales.json").write_text(json.dumps(legacy), encoding="utf-8")
+        storage = JsonStorage(self.base / "users.json", self.base / "products.json",
+                              self.base / "sales.json")
+        self.assertEqual(storage.list_sales(), legacy)
+        self.assertFalse((self.base / "sales.json").exists())
+        self.assertTrue((self.base / "sales.json.migrated").exists())
+        self.assertEqual(storage.monthly_totals(), {"2025-11": 10.0})
+
+        # Reabrir não volta a migrar nem perde vendas
+        storage.add_sale({"id": "INV2", "seller": "v2", "timestamp": "2025-12-01T10:00:00",
+                          "items": [], "total_with_vat": 5.0})
+        reopened = JsonStorage(self.base / "users.json", self.base / "products.json",
+                               self.base / "sales.json")
+        self.assertEqual([s["id"] for s in reopened.list_sales()], ["INV1", "INV2"])
+        self.assertEqual(reopened.totals_by_seller(["v2"]), {"v2": 5.0})
+
+    def test_truncated_legacy_file_is_not_migrated(self):
+        legacy = self.base / "sales.json"
+        legacy.write_text('[{"id": "INV1", "total_with_vat": 1.0}, {"id": "INV2", "tot',
+                          encoding="utf-8")
+        journal = SalesJournal(self.base / "sales.jsonl")
+        journal.append({"id": "JA"})
+        with self.assertRaises(ValueError):
+            journal.migrate_legacy(legacy)
+        # Nada foi trocado nem renomeado: as vendas antigas continuam lá
+        self.assertTrue(legacy.exists())
+        self.assertFalse((self.base / "sales.json.migrated").exists())
+        self.assertFalse((self.base / "sales.jsonl.tmp").exists())
+        self.assertEqual([s["id"] for s in journal], ["JA"])
+
+    def test_json_array_is_read_incrementally(self):
+        records = [{"id": f"INV{i}", "note": "a, ] [ {", "total_with_vat": 12345.5 + i}
+                   for i in range(50)]
+        path = self.base / "sales.json"
+        path.write_text(json.dumps(records, indent=1), encoding="utf-8")
+        # Blocos minúsculos obrigam a juntar elementos cortados a meio
+        for chunk in (1, 7, 64, 1 << 16):
+            self.assertEqual(list(iter_json_array(path, chunk_size=chunk)), records)
+        path.write_text("[1, 22, 333]", encoding="utf-8")
+        self.assertEqual(list(iter_json_array(path, chunk_size=2)), [1, 22, 333])
+        path.write_text('[{"id": 1}, {"id"', encoding="utf-8")
+        with self.assertRaises(ValueError):
+            list(iter_json_array(path, chunk_size=4))
+
+    def test_stream_does_not_fill_the_cache(self):
+        journal = SalesJournal(self.base / "sales.jsonl")
+        journal.append({"id": "A"})
+        FILE_CACHE.invalidate()
+        self.assertEqual([s["id"] for s in journal.stream()], ["A"])
+        self.assertIsNone(FILE_CACHE.peek(journal.path))
+        # Com a cache carregada, o stream usa-a
+        journal.records()
+        self.assertIsNotNone(FILE_CACHE.peek(journal.path))
+        self.assertEqual([s["id"] for s in journal.stream()], ["A"])
+
+if __name__ == "__main__":
+    unittest.main()
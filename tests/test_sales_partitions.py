@@ -0,0 +1,87 @@
+import json
+import unittest
+from datetime import date
+
+from models.file_cache import FILE_CACHE
+from storage_helpers import StorageMixin, json_storage, sqlite_storage
+
+SALES = [
+    {"id": "A", "seller": "v1", "timestamp": "2025-01-10T10:00:00", "items": [], "total_with_vat": 10.0},
+    {"id": "B", "seller": "v2", "timestamp": "2025-01-31T23:59:59", "items": [], "total_with_vat": 5.0},
+    {"id": "C", "seller": "v1", "timestamp": "2025-02-01T00:00:00", "items": [], "total_with_vat": 7.0},
+    {"id": "D", "seller": "v1", "timestamp": "2025-03-15T12:00:00", "items": [], "total_with_vat": 3.0},
+]
+
+class RangeMixin(StorageMixin):
+    def setUp(self):
+        super().setUp()
+        for s in SALES:
+            self.storage.add_sale(s)
+
+    def test_list_sales_by_range(self):
+        ids = [s["id"] for s in self.storage.list_sales(since=date(2025, 1, 15), until="2025-03-01")]
+        self.assertEqual(ids, ["B", "C"])
+        self.assertEqual([s["id"] for s in self.storage.list_sales()], ["A", "B", "C", "D"])
+
+    def test_totals_by_range(self):
+        self.assertEqual(self.storage.monthly_totals(since="2025-02-01"), {"2025-02": 7.0, "2025-03": 3.0})
+        self.assertEqual(self.storage.totals_by_seller(["v1"], until="2025-02-01"), {"v1": 10.0})
+
+class TestJsonPartitions(RangeMixin, unittest.TestCase):
+    def _make_storage(self):
+        return json_storage(self.base)
+
+    def test_one_file_per_month_with_manifest(self):
+        folder = self.base / "sales"
+        self.assertEqual(sorted(p.name for p in folder.glob("*.jsonl")),
+                         ["2025-01.jsonl", "2025-02.jsonl", "2025-03.jsonl"])
+        manifest = json.loads((folder / "manifest.json").read_text(encoding="utf-8"))["partitions"]
+        self.assertEqual(manifest["2025-01"]["count"], 2)
+        self.assertEqual(manifest["2025-01"]["total"], 15.0)
+        self.assertEqual(manifest["2025-01"]["last"], "2025-01-31T23:59:59")
+        self.assertEqual(self.storage.monthly_totals(),
+                         {"2025-01": 15.0, "2025-02": 7.0, "2025-03": 3.0})
+
+    def test_old_partitions_do_not_need_newer_ones(self):
+        # Uma partição recente ilegível não impede consultas a meses anteriores
+        (self.base / "sales" / "2025-03.jsonl").write_text("lixo\n", encoding="utf-8")
+        FILE_CACHE.invalidate()
+        ids = [s["id"] for s in self.storage.list_sales(until="2025-02-01")]
+        self.assertEqual(ids, ["A", "B"])
+
+    def test_stale_manifest_is_recounted(self):
+        with (self.base / "sales" / "2025-02.jsonl").open("a", encoding="utf-8") as f:
+            f.write(json.dumps({"id": "X", "seller": "v3", "timestamp": "2025-02-02T09:00:00",
+                                "total_with_vat": 1.0}) + "\n")
+        reopened = self._make_storage()
+        self.assertEqual(reopened.monthly_totals()["2025-02"], 8.0)
+
+    def test_single_journal_is_migrated(self):
+        base = self.base / "old"
+        base.mkdir()
+        (base / "sales.jsonl").write_text("".join(json.dumps(s) + "\n" for s in SALES), encoding="utf-8")
+        storage = json_storage(base)
+        self.assertEqual([s["id"] for s in storage.list_sales()], ["A", "B", "C", "D"])
+        self.assertFalse((base / "sales.jsonl").exists())
+        self.assertTrue((base / "sales.jsonl.migrated").exists())
+        self.assertEqual(len(list((base / "sales").glob("*.jsonl"))), 3)
+
+    def test_journal_and_old_array_are_both_migrated(self):
+        base = self.base / "old"
+        base.mkdir()
+        (base / "sales.jsonl").write_text("".join(json.dumps(s) + "\n" for s in SALES[2:]),
+                                          encoding="utf-8")
+        # O sales.json antigo tem vendas que nunca passaram ao diário e uma repetida
+        (base / "sales.json").write_text(json.dumps(SALES[:3]), encoding="utf-8")
+        storage = json_storage(base)
+        self.assertEqual(sorted(s["id"] for s in storage.list_sales()), ["A", "B", "C", "D"])
+        storage.close()
+        self.assertTrue((base / "sales.jsonl.migrated").exists())
+        self.assertTrue((base / "sales.json.migrated").exists())
+
+class TestSqliteRanges(RangeMixin, unittest.TestCase):
+    def _make_storage(self):
+        return sqlite_storage(self.base)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+import json
+import unittest
+
+from models.system_manager import SystemManager
+from models.product import Product
+from storage_helpers import StorageMixin, json_storage, sqlite_storage
+
+class RollupsMixin(StorageMixin):
+    def setUp(self):
+        super().setUp()
+        SystemManager.INVOICES = self.base / "invoices"
+        self.sm = SystemManager(storage=self.storage)
+        for shop, seller in (("FARMACIA", "f1"), ("OFICINA", "o1")):
+            self.sm.add_vendor(username=seller, email=f"{seller}@x", password="x",
+                               company="Grupo", shop_type=shop)
+            self.sm.add_product(Product(code="01", name="P", price_no_vat=10.0, ptype="x",
+                                        stock=100, company="Grupo", shop_type=shop))
+
+    def _sell(self, seller, qty=1):
+        return self.sm.create_invoice(
+            items=[{"code": "01", "name": "P", "qty": qty, "price_no_vat": 10.0}],
+            seller_username=seller,
+        )
+
+    def test_rollups_follow_each_invoice(self):
+        inv = self._sell("f1")
+        self._sell("f1", 2)
+        self._sell("o1")
+        month, day = inv["timestamp"][:7], inv["timestamp"][:10]
+        self.assertEqual(self.sm.shop_monthly_totals("Grupo", "FARMACIA"), {month: 36.9})
+        self.assertEqual(self.sm.shop_totals_by_seller("Grupo", "FARMACIA"), {"f1": 36.9})
+        self.assertEqual(self.sm.shop_daily_totals("Grupo", "OFICINA"), {day: 12.3})
+        self.assertEqual(self.sm.shop_monthly_totals("Outra", "FARMACIA"), {})
+
+    def test_rebuild_matches_incremental(self):
+        self._sell("f1")
+        self._sell("o1", 3)
+        before = (self.sm.shop_monthly_totals("Grupo", "OFICINA"),
+                  self.sm.shop_totals_by_seller("Grupo", "FARMACIA"))
+        self.assertEqual(self.sm.rebuild_rollups(), 2)
+        after = (self.sm.shop_monthly_totals("Grupo", "OFICINA"),
+                 self.sm.shop_totals_by_seller("Grupo", "FARMACIA"))
+        self.assertEqual(before, after)
+
+class TestJsonRollups(RollupsMixin, unittest.TestCase):
+    def _make_storage(self):
+        return json_storage(self.base)
+
+    def test_missing_sales_are_recovered_on_open(self):
+        self._sell("f1")
+        # Venda gravada numa partição mas com os totais por atualizar (falha a meio)
+        with (self.base / "sales" / "2024-01.jsonl").open("a", encoding="utf-8") as f:
+            f.write(json.dumps({"id": "X", "timestamp": "2024-01-05T10:00:00", "seller": "o1",
+                                "items": [], "total_with_vat": 5.0}) + "\n")
+        reopened = self._make_storage()
+        self.assertEqual(reopened.shop_monthly_totals("Grupo", "OFICINA"), {"2024-01": 5.0})
+        self.assertEqual(reopened.rollups.data["count"], 2)
+
+    def _saved_count(self):
+        path = self.base / "sales_rollups.json"
+        return json.loads(path.read_text(encoding="utf-8"))["count"] if path.exists() else 0
+
+    def test_checkout_does_not_rewrite_rollups_file(self):
+        for _ in range(5):
+            self._sell("f1")
+        # As vendas estão nas partições; o ficheiro dos totais fica para depois
+        self.assertEqual(self._saved_count(), 0)
+        self.assertEqual(self.sm.storage.rollups.unsaved, 5)
+        # Se o programa parar aqui, a abertura seguinte reconta a diferença
+        reopened = self._make_storage()
+        self.assertEqual(reopened.rollups.data["count"], 5)
+        self.assertEqual(self.sm.shop_totals_by_seller("Grupo", "FARMACIA"), {"f1": 61.5})
+        self.sm.storage.flush()
+        self.assertEqual(self._saved_count(), 5)
+
+    def test_rollups_file_is_compacted_periodically(self):
+        self.sm.storage.rollups.save_every = 3
+        for _ in range(4):
+            self._sell("o1")
+        self.assertEqual(self._saved_count(), 3)
+        self.assertEqual(self.sm.storage.rollups.unsaved, 1)
+
+class TestSqliteRollups(RollupsMixin, unittest.TestCase):
+    def _make_storage(self):
+        return sqlite_storage(self.base)
+
+if __name__ == "__main__":
+    unittest.main()
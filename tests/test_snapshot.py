@@ -0,0 +1,99 @@
+import json
+import unittest
+import tempfile
+from pathlib import Path
+
+from models.file_cache import FILE_CACHE
+from models.json_storage import JsonStorage
+from models.product import Product
+from models.snapshot import decode, encode
+from models.system_manager import SystemManager
+
+class TestSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.base = Path(self.tmp.name)
+        SystemManager.INVOICES = self.base / "invoices"
+        self.sm = self._open()
+        self.sm.add_vendor(username="v1", email="v@x", password="x", company="L", shop_type="OUTRO")
+        self.sm.add_product(Product(code="A", name="A", price_no_vat=10.0, ptype="x", stock=5,
+                                    company="L", shop_type="OUTRO"))
+        self.sm.create_invoice(items=[{"code": "A", "name": "A", "qty": 1, "price_no_vat": 10.0}],
+                               seller_username="v1")
+        self.month = self.sm.list_sales()[0]["timestamp"][:7]
+
+    def tearDown(self):
+        self.sm.close()
+        FILE_CACHE.invalidate()
+        self.tmp.cleanup()
+
+    def _open(self, **kwargs):
+        return SystemManager(storage=JsonStorage(self.base / "users.json", self.base / "products.json",
+                                                 self.base / "sales.json", **kwargs))
+
+    def _reopen(self, **kwargs):
+        """Fecha e volta a abrir como num novo arranque (cache vazia)."""
+        self.sm.close()
+        FILE_CACHE.invalidate()
+        self.sm = self._open(**kwargs)
+        return self.sm.snapshot_report()
+
+    def test_cold_start_uses_snapshot(self):
+        report = self._reopen()
+        self.assertEqual(report["loaded"], ["products", "products_index", "rollups",
+                                            "users", "users_index"])
+        self.assertIsNone(report["error"])
+        misses = FILE_CACHE.stats()["misses"]
+        self.assertEqual(self.sm.list_shop_products("L", "OUTRO")[0]["stock"], 4)
+        self.assertEqual(self.sm.login("v1", "x")["company"], "L")
+        self.assertEqual(FILE_CACHE.stats()["misses"], misses)  # sem json.loads
+        self.assertEqual(self.sm.shop_monthly_totals("L", "OUTRO"), {self.month: 12.3})
+        # Nada mudou: a imagem não é regravada
+        self.assertFalse(self.sm.save_snapshot())
+
+    def test_changed_file_falls_back_to_json(self):
+        self.sm.close()
+        path = self.base / "products.json"
+        rows = json.loads(path.read_text(encoding="utf-8"))
+        rows[0]["stock"] = 99
+        path.write_text(json.dumps(rows), encoding="utf-8")
+        FILE_CACHE.invalidate()
+        self.sm = self._open()
+        self.assertEqual(self.sm.snapshot_report()["stale"], ["products", "products_index"])
+        self.assertEqual(self.sm.find_product("A", "L", "OUTRO")["stock"], 99)
+
+    def test_writes_are_in_next_snapshot(self):
+        self.sm.adjust_stock("A", 10, "L", "OUTRO")
+        self._reopen()
+        self.assertEqual(self.sm.find_product("A", "L", "OUTRO")["stock"], 14)
+
+    def test_corrupt_snapshot_is_ignored(self):
+        self.sm.close()
+        path = self.base / "snapshot.bin"
+        raw = bytearray(path.read_bytes())
+        raw[-1] ^= 0xFF
+        path.write_bytes(bytes(raw))
+        FILE_CACHE.invalidate()
+        self.sm = self._open()
+        report = self.sm.snapshot_report()
+        self.assertEqual(report["loaded"], [])
+        self.assertIn("CRC", report["error"])
+        self.assertEqual(self.sm.find_product("A", "L", "OUTRO")["stock"], 4)
+
+    def test_disabled(self):
+        self.sm.close()
+        (self.base / "snapshot.bin").unlink()
+        FILE_CACHE.invalidate()
+        self.sm = self._open(snapshot=False)
+        self.assertEqual(self.sm.snapshot_report(), {})
+        self.sm.close()
+        self.assertFalse((self.base / "snapshot.bin").exists())
+
+    def test_format_round_trip(self):
+        entries = {"users": ((1, 2, 3), [{"username": "a", "n": 1.5, "ok": True, "x": None}])}
+        self.assertEqual(decode(encode(entries)), entries)
+        with self.assertRaises(ValueError):
+            decode(b"POSSNAP9" + encode(entries)[8:])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,129 @@
+import json
+import unittest
+import tempfile
+from pathlib import Path
+
+from models.system_manager import SystemManager
+from models.sqlite_storage import SqliteStorage, migrate_json_to_sqlite
+from models.product import Product
+
+class TestSqliteStorage(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        base = Path(self.tmp.name)
+        SystemManager.INVOICES = base / "invoices"
+        self.storage = SqliteStorage(base / "pos.db")
+        self.sm = SystemManager(storage=self.storage)
+
+    def tearDown(self):
+        self.sm.close()
+        self.tmp.cleanup()
+
+    def test_wal_mode(self):
+        mode = self.storage._query("PRAGMA journal_mode")[0][0]
+        self.assertEqual(mode, "wal")
+
+    def test_register_and_login(self):
+        self.sm.register_admin(company="ISTEC", vat="505", shop_type="RESTAURACAO",
+                               username="admin1", email="admin1@email", password="123")
+        self.sm.add_vendor(username="v1", email="v1@email", password="abc",
+                           company="ISTEC", shop_type="RESTAURACAO")
+        with self.assertRaises(ValueError):
+            self.sm.add_vendor(username="ADMIN1", email="x", password="x",
+                               company="ISTEC", shop_type="RESTAURACAO")
+        user = self.sm.login("Admin1", "123")
+        self.assertEqual(user["role"], "ADMIN")
+        self.assertIsNone(self.sm.login("admin1", "errada"))
+        self.assertNotIn("vat", self.sm.login("v1", "abc"))
+        self.assertEqual(self.sm.get_shop_sellers("ISTEC", "RESTAURACAO"), ["v1", "admin1"])
+        self.assertTrue(self.sm.change_user_password("v1", "abc", "novo"))
+        self.assertIsNotNone(self.sm.login("v1", "novo"))
+
+    def test_products_scoped_by_shop(self):
+        self.sm.add_product(Product(code="01", name="Café", price_no_vat=0.7, ptype="Café",
+                                    stock=5, company="A", shop_type="RESTAURACAO"))
+        self.sm.add_product(Product(code="01", name="Brufen", price_no_vat=3.0, ptype="Medicamento",
+                                    stock=5, company="B", shop_type="FARMACIA"))
+        with self.assertRaises(ValueError):
+            self.sm.add_product(Product(code="01", name="Dup", price_no_vat=1.0, ptype="x",
+                                        company="A", shop_type="RESTAURACAO"))
+        self.assertEqual(len(self.sm.list_products()), 2)
+        self.assertEqual(self.sm.adjust_stock("01", -10)["stock"], 0)
+
+    def test_invoice_and_reports(self):
+        self.sm.add_product(Product(code="C01", name="Coca-Cola", price_no_vat=1.0,
+                                    ptype="Drinks", stock=10))
+        invoice = self.sm.create_invoice(
+            items=[{"code": "C01", "name": "Coca-Cola", "qty": 2, "price_no_vat": 1.0}],
+            seller_username="v1",
+        )
+        self.assertEqual(self.sm.list_products()[0]["stock"], 8)
+        sales = self.sm.list_sales()
+        self.assertEqual(sales[0]["items"], invoice["items"])
+        self.assertEqual(sales[0]["html_path"], invoice["html_path"])
+        month = invoice["timestamp"][:7]
+        self.assertEqual(self.sm.monthly_totals(), {month: 2.46})
+        self.assertEqual(self.sm.totals_by_seller(["v1"]), {"v1": 2.46})
+        self.assertEqual(self.sm.totals_by_seller(["outro"]), {})
+
+    def test_migrate_from_json(self):
+        data = Path(self.tmp.name) / "data"
+        data.mkdir()
+        users = [{"username": "a", "email": "a@x", "password": "p", "role": "ADMIN",
+                  "company": "C", "vat": "1", "shop_type": "OUTRO", "photo_path": ""}]
+        products = [{"code": "P1", "name": "Pneu", "price_no_vat": 50.0, "ptype": "Pneu",
+                     "image_path": "", "stock": 4, "min_stock": 1, "company": "C",
+                     "shop_type": "OUTRO"}]
+        sales = [{"id": "INV1", "timestamp": "2025-11-20T11:30:26", "seller": "a",
+                  "items": [{"code": "P1", "name": "Pneu", "qty": 1, "price_no_vat": 50.0}],
+                  "total_no_vat": 50.0, "vat_rate": 0.23, "total_with_vat": 61.5,
+                  "html_path": "x.html"}]
+        for name, rows in (("users", users), ("products", products), ("sales", sales)):
+            (data / f"{name}.json").write_text(json.dumps(rows), encoding="utf-8")
+
+        db = Path(self.tmp.name) / "migrated.db"
+        before = sorted(p.name for p in data.iterdir())
+        counts = migrate_json_to_sqlite(data, db)
+        self.assertEqual(counts, {"users": 1, "products": 1, "sales": 1, "duplicates": 0})
+        # A origem só é lida: sem partições, lock, totais nem imagem
+        self.assertEqual(sorted(p.name for p in data.iterdir()), before)
+        migrated = SqliteStorage(db)
+        try:
+            self.assertEqual(migrated.list_users(), users)
+            self.assertEqual(migrated.list_products(), products)
+            self.assertEqual(migrated.list_sales(), sales)
+        finally:
+            migrated.close()
+        with self.assertRaises(ValueError):
+            migrate_json_to_sqlite(data, db)
+
+    def test_migrate_from_partitions(self):
+        data = Path(self.tmp.name) / "data"
+        (data / "sales").mkdir(parents=True)
+        for month in ("2025-10", "2025-11"):
+            (data / "sales" / f"{month}.jsonl").write_text(
+                json.dumps({"id": f"INV-{month}", "timestamp": f"{month}-01T10:00:00",
+                            "seller": "a", "items": [], "total_no_vat": 1.0,
+                            "vat_rate": 0.23, "total_with_vat": 1.23, "html_path": ""}) + "\n"
+                + '{"id": "cortada"', encoding="utf-8")
+        before = {p: p.stat().st_size for p in data.rglob("*")}
+        counts = migrate_json_to_sqlite(data, Path(self.tmp.name) / "p.db")
+        self.assertEqual(counts, {"users": 0, "products": 0, "sales": 2, "duplicates": 0})
+        self.assertEqual({p: p.stat().st_size for p in data.rglob("*")}, before)
+
+    def test_import_reports_duplicates(self):
+        user = {"username": "a", "email": "a@x", "password": "p", "role": "ADMIN"}
+        product = {"code": "P1", "name": "Pneu", "company": "C", "shop_type": "OUTRO"}
+        sale = {"id": "INV1", "timestamp": "2025-11-20T11:30:26", "seller": "a", "items": [],
+                "total_with_vat": 1.0}
+        counts = self.storage.import_json([user, dict(user, username="A")],
+                                          [product, dict(product, name="Pneu novo")],
+                                          [sale, sale])
+        self.assertEqual(counts, {"users": 2, "products": 2, "sales": 2, "duplicates": 3})
+        # Utilizadores e produtos: fica o último; vendas: ficam as duas
+        self.assertEqual(len(self.storage.list_users()), 1)
+        self.assertEqual(self.storage.list_products()[0]["name"], "Pneu novo")
+        self.assertEqual(len(self.storage.list_sales()), 2)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+from models.startup_trace import StartupTrace
+
+ROOT = Path(__file__).resolve().parents[1]
+
+# Abre o SystemManager num processo novo (neste os testes já importaram tudo)
+# e diz que módulos pesados ficaram carregados
+_STARTUP = """
+import sys
+from pathlib import Path
+from models.system_manager import SystemManager
+data = Path(sys.argv[1])
+SystemManager.USERS = data / "users.json"
+SystemManager.PRODUCTS = data / "products.json"
+SystemManager.SALES = data / "sales.json"
+SystemManager.INVOICES = data / "invoices"
+sm = SystemManager()
+sm.storage.add_sale({"id": "INV1", "timestamp": "2025-01-10T10:00:00", "seller": "v",
+                     "total_with_vat": 1.0, "items": []})
+sm.close()
+print(" ".join(m for m in ("numpy", "urllib.request", "csv") if m in sys.modules))
+"""
+
+
+class TestStartupTrace(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.base = Path(self.tmp.name)
+        self.trace = None
+
+    def tearDown(self):
+        if self.trace is not None:
+            self.trace.uninstall()
+        sys.modules.pop("trace_modulo_a", None)
+        sys.modules.pop("trace_modulo_b", None)
+        if str(self.base) in sys.path:
+            sys.path.remove(str(self.base))
+        self.tmp.cleanup()
+
+    def test_disabled_by_default(self):
+        argv = ["main.py", "-style", "fusion"]
+        trace = StartupTrace.from_argv(argv)
+        self.assertFalse(trace.enabled)
+        self.assertEqual(argv, ["main.py", "-style", "fusion"])
+        trace.mark("QApplication")
+        self.assertEqual(trace.phases, [])
+        self.assertIsNone(trace.write())
+
+    def test_option_is_removed_from_argv(self):
+        out = self.base / "trace.txt"
+        argv = ["main.py", f"--startup-trace={out}", "-style", "fusion"]
+        self.trace = StartupTrace.from_argv(argv)
+        self.assertTrue(self.trace.enabled)
+        self.assertEqual(self.trace.path, out)
+        self.assertEqual(argv, ["main.py", "-style", "fusion"])
+
+    def test_records_imports_and_phases(self):
+        (self.base / "trace_modulo_a.py").write_text("import trace_modulo_b\n", encoding="utf-8")
+        (self.base / "trace_modulo_b.py").write_text("VALOR = 1\n", encoding="utf-8")
+        sys.path.insert(0, str(self.base))
+        self.trace = StartupTrace(self.base / "trace.txt")
+        self.trace.install()
+        import trace_modulo_a  # noqa: F401
+        import trace_modulo_a  # noqa: F401,F811  (já carregado: não volta a contar)
+        self.trace.mark("QApplication")
+        self.trace.uninstall()
+
+        names = [(depth, name) for _, _, depth, name in self.trace.imports]
+        self.assertEqual(sorted(names), [(0, "trace_modulo_a"), (1, "trace_modulo_b")])
+        self.assertEqual([p for p, _ in self.trace.phases], ["QApplication"])
+        text = self.trace.write().read_text(encoding="utf-8")
+        self.assertIn("QApplication", text)
+        self.assertIn("|   trace_modulo_b", text)  # indentado dentro do a
+
+    def test_system_manager_does_not_load_heavy_modules(self):
+        out = subprocess.run([sys.executable, "-c", _STARTUP, str(self.base)], cwd=ROOT,
+                             capture_output=True, text=True, check=True).stdout
+        self.assertEqual(out.split(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+import unittest
+
+from models.system_manager import SystemManager
+from models.product import Product
+from models.stock_list import parse_stock_list
+from storage_helpers import StorageMixin, json_storage, sqlite_storage
+
+class BulkStockMixin(StorageMixin):
+    def setUp(self):
+        super().setUp()
+        self.sm = SystemManager(self.storage)
+        for code, stock, shop in (("A", 5, "FARMACIA"), ("B", 1, "FARMACIA"), ("A", 9, "OFICINA")):
+            self.sm.add_product(Product(code=code, name=code, price_no_vat=1.0, ptype="x",
+                                        stock=stock, company="Grupo", shop_type=shop))
+
+    def _stock(self, shop):
+        return {p["code"]: p["stock"] for p in self.sm.list_shop_products("Grupo", shop)}
+
+    def test_bulk_deltas_clamp_at_zero_and_stay_in_shop(self):
+        changed = self.sm.adjust_stock_bulk({"a": 10, "B": -4}, reason="Entrega 42",
+                                            company="Grupo", shop_type="FARMACIA")
+        self.assertEqual([(p["code"], p["stock"]) for p in changed], [("A", 15), ("B", 0)])
+        self.assertEqual(self._stock("FARMACIA"), {"A": 15, "B": 0})
+        self.assertEqual(self._stock("OFICINA"), {"A": 9})
+        movement = list(self.sm.stock_movements())[-1]
+        self.assertEqual(movement["reason"], "Entrega 42")
+        self.assertEqual([c["stock"] for c in movement["changes"]], [15, 0])
+
+    def test_unknown_code_changes_nothing(self):
+        with self.assertRaises(ValueError):
+            self.sm.adjust_stock_bulk({"A": 1, "ZZ": 1}, company="Grupo", shop_type="FARMACIA")
+        self.assertEqual(self._stock("FARMACIA"), {"A": 5, "B": 1})
+        self.assertEqual(list(self.sm.stock_movements()), [])
+
+    def test_stock_take_sets_counted_quantities(self):
+        counts, errors = parse_stock_list("A 2\nB\nB\n")
+        self.assertEqual(errors, [])
+        self.sm.stock_take(counts, company="Grupo", shop_type="FARMACIA")
+        self.assertEqual(self._stock("FARMACIA"), {"A": 2, "B": 2})
+        self.assertEqual(list(self.sm.stock_movements())[-1]["reason"], "Contagem de stock")
+
+class TestJsonBulkStock(BulkStockMixin, unittest.TestCase):
+    def _make_storage(self):
+        return json_storage(self.base)
+
+    def test_one_products_write(self):
+        flushes = self.storage.committer.flushes
+        self.sm.adjust_stock_bulk({"A": 1, "B": 1}, company="Grupo", shop_type="FARMACIA")
+        self.assertEqual(self.storage.committer.flushes - flushes, 1)
+
+class TestSqliteBulkStock(BulkStockMixin, unittest.TestCase):
+    def _make_storage(self):
+        return sqlite_storage(self.base)
+
+class TestParseStockList(unittest.TestCase):
+    def test_formats_and_errors(self):
+        totals, errors = parse_stock_list("A1\nA1\nB2 5\nC3;7\nE5 x3\nF6\t-2\n\nlinha inválida")
+        self.assertEqual(totals, {"A1": 2, "B2": 5, "C3": 7, "E5": 3, "F6": -2})
+        self.assertEqual(errors, [(8, "linha inválida")])
+
+if __name__ == "__main__":
+    unittest.main()
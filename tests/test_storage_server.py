@@ -0,0 +1,88 @@
+import unittest
+import tempfile
+import threading
+from datetime import date
+from pathlib import Path
+
+from models.file_cache import FILE_CACHE
+from models.json_storage import JsonStorage
+from models.remote_storage import RemoteStorage
+from models.storage_server import StorageServer, CHUNK_SIZE
+from models.system_manager import SystemManager
+from models.product import Product
+
+class ServerMixin:
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.base = Path(self.tmp.name)
+        # O servidor é o único escritor: dispensa o lock entre processos
+        backend = JsonStorage(self.base / "users.json", self.base / "products.json",
+                              self.base / "sales.json", durability="batch", multi_terminal=False)
+        self.server = StorageServer(backend, self._address()).start()
+        self.remote = RemoteStorage(self.server.url)
+        SystemManager.INVOICES = self.base / "invoices"
+        self.sm = SystemManager(storage=self.remote)
+
+    def tearDown(self):
+        self.sm.close()
+        self.server.stop()
+        FILE_CACHE.invalidate()
+        self.tmp.cleanup()
+
+    def test_system_manager_over_the_socket(self):
+        self.sm.register_admin(company="ISTEC", vat="505", shop_type="RESTAURACAO",
+                               username="admin1", email="a@a", password="123")
+        user = self.sm.login("admin1", "123")
+        self.assertEqual(type(user), dict)
+        self.sm.add_product(Product(code="C01", name="Café", price_no_vat=1.0, ptype="Café",
+                                    stock=5, company="ISTEC", shop_type="RESTAURACAO"))
+        with self.assertRaises(ValueError):
+            self.sm.add_product(Product(code="c01", name="Outro", price_no_vat=1.0, ptype="Café",
+                                        company="ISTEC", shop_type="RESTAURACAO"))
+        invoice = self.sm.create_invoice(
+            items=[{"code": "C01", "name": "Café", "qty": 2, "price_no_vat": 1.0}],
+            seller_username="admin1")
+        self.assertEqual(self.sm.list_sales(), [invoice])
+        self.assertEqual(self.sm.find_product("C01", "ISTEC", "RESTAURACAO")["stock"], 3)
+        self.assertEqual(list(self.sm.shop_monthly_totals("ISTEC", "RESTAURACAO").values()), [2.46])
+        self.assertEqual(len(self.sm.list_sales(since=date(2000, 1, 1))), 1)
+
+    def test_pipeline_and_streamed_sales(self):
+        n = CHUNK_SIZE + 20
+        calls = [("add_sale", [{"id": f"S{i}", "seller": "v", "timestamp": "2025-01-01T10:00:00",
+                                "items": [], "total_with_vat": 1.0}], {}) for i in range(n)]
+        calls.append(("monthly_totals", [], {}))
+        results = self.remote.pipeline(calls)
+        self.assertEqual(results[-1], {"2025-01": float(n)})
+        self.assertEqual(sum(1 for _ in self.sm.iter_sales()), n)
+        # Um stream interrompido não estraga as ligações seguintes
+        next(iter(self.sm.iter_sales()))
+        self.assertEqual(self.remote.find_user("ninguém"), None)
+
+    def test_concurrent_clients_serialize_writes(self):
+        self.remote.add_product({"code": "A", "name": "A", "stock": 1000,
+                                 "company": "L", "shop_type": "OUTRO"})
+
+        def till():
+            client = RemoteStorage(self.server.url)
+            for _ in range(25):
+                client.adjust_stock("A", -1, "L", "OUTRO")
+            client.close()
+
+        threads = [threading.Thread(target=till) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(self.remote.find_product("A", "L", "OUTRO")["stock"], 900)
+
+class TestUnixServer(ServerMixin, unittest.TestCase):
+    def _address(self):
+        return f"unix:{self.base / 'pos.sock'}"
+
+class TestTcpServer(ServerMixin, unittest.TestCase):
+    def _address(self):
+        return "tcp:127.0.0.1:0"
+
+if __name__ == "__main__":
+    unittest.main()
@@ -17,9 +17,11 @@ class TestSystemManager(unittest.TestCase):
         SystemManager.USERS = base / "users.json"
         SystemManager.PRODUCTS = base / "products.json"
         SystemManager.SALES = base / "sales.json"
+        SystemManager.INVOICES = Path(self.tmp.name) / "invoices"
         self.sm = SystemManager()
 
     def tearDown(self):
+        self.sm.close()
         self.tmp.cleanup()
 
     def test_register_and_login_admin(self):
@@ -35,12 +37,56 @@ class TestSystemManager(unittest.TestCase):
         self.assertEqual(saved["code"], "C01")
 
     def test_create_invoice(self):
-        self.sm.add_product(Product(code="C01", name="Coca-Cola", price_no_vat=1.0, ptype="Drinks"))
+        self.sm.add_product(Product(code="C01", name="Coca-Cola", price_no_vat=1.0, ptype="Drinks", stock=10))
         invoice = self.sm.create_invoice(
             items=[{"code": "C01", "name": "Coca-Cola", "qty": 2, "price_no_vat": 1.0}],
             seller_username="v1",
         )
         self.assertAlmostEqual(invoice["total_with_vat"], 2.46, places=2)
+        self.assertEqual(self.sm.list_sales(), [invoice])
+        # O HTML é gerado em segundo plano; reimprimir gera-o logo se faltar
+        self.assertTrue(invoice["html_path"].startswith("archive:"))
+        self.assertIn(invoice["id"], self.sm.invoice_html(invoice).read_text(encoding="utf-8"))
+
+    def test_create_invoice_is_atomic(self):
+        self.sm.add_product(Product(code="C01", name="Coca-Cola", price_no_vat=1.0, ptype="Drinks", stock=5))
+        self.sm.add_product(Product(code="C02", name="Água", price_no_vat=0.5, ptype="Drinks", stock=1))
+        with self.assertRaises(ValueError):
+            self.sm.create_invoice(
+                items=[{"code": "C01", "name": "Coca-Cola", "qty": 2, "price_no_vat": 1.0},
+                       {"code": "C02", "name": "Água", "qty": 3, "price_no_vat": 0.5}],
+                seller_username="v1",
+            )
+        self.assertEqual([p["stock"] for p in self.sm.list_products()], [5, 1])
+        self.assertEqual(self.sm.list_sales(), [])
+
+    def test_create_invoice_scoped_to_seller_shop(self):
+        self.sm.add_vendor(username="v1", email="v1@email", password="x",
+                           company="B", shop_type="FARMACIA")
+        self.sm.add_product(Product(code="01", name="Café", price_no_vat=0.7, ptype="Café",
+                                    stock=5, company="A", shop_type="RESTAURACAO"))
+        self.sm.add_product(Product(code="01", name="Brufen", price_no_vat=3.0, ptype="Medicamento",
+                                    stock=5, company="B", shop_type="FARMACIA"))
+        cart = [{"code": "01", "name": "Brufen", "qty": 1, "price_no_vat": 3.0},
+                {"code": "01", "name": "Brufen", "qty": 1, "price_no_vat": 3.0}]
+        self.sm.create_invoice(items=cart, seller_username="v1")
+        cart.clear()
+        self.assertEqual([p["stock"] for p in self.sm.list_products()], [5, 3])
+        self.assertEqual(len(self.sm.list_sales()[0]["items"]), 2)
+
+    def test_iter_sales_streams_with_filter(self):
+        self.sm.add_product(Product(code="C01", name="Coca-Cola", price_no_vat=1.0, ptype="Drinks", stock=10))
+        for seller in ("v1", "v2", "v1"):
+            self.sm.create_invoice(
+                items=[{"code": "C01", "name": "Coca-Cola", "qty": 1, "price_no_vat": 1.0}],
+                seller_username=seller,
+            )
+        sales = self.sm.iter_sales(filter=lambda s: s["seller"] == "v1")
+        self.assertFalse(isinstance(sales, list))
+        self.assertEqual([s["seller"] for s in sales], ["v1", "v1"])
+        out = Path(self.tmp.name) / "vendas.csv"
+        self.sm.export_sales_csv(out)
+        self.assertEqual(len(out.read_text(encoding="utf-8").splitlines()), 4)
 
 if __name__ == "__main__":
     unittest.main()
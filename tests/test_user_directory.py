@@ -0,0 +1,55 @@
+import json
+import unittest
+import tempfile
+from pathlib import Path
+
+from models.file_cache import FILE_CACHE
+from models.system_manager import SystemManager
+from models.json_storage import JsonStorage
+
+class TestUserDirectory(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        base = Path(self.tmp.name)
+        SystemManager.INVOICES = base / "invoices"
+        self.storage = JsonStorage(base / "users.json", base / "products.json", base / "sales.json")
+        self.sm = SystemManager(storage=self.storage)
+        self.sm.register_admin(company="Loja", vat="1", shop_type="FARMACIA",
+                               username="Admin", email="Admin@Loja.pt", password="a")
+        self.sm.add_vendor(username="v1", email="v1@loja.pt", password="b",
+                           company="Loja", shop_type="FARMACIA")
+        self.sm.add_vendor(username="v2", email="v2@outra.pt", password="c",
+                           company="Outra", shop_type="OFICINA")
+
+    def tearDown(self):
+        FILE_CACHE.invalidate()
+        self.tmp.cleanup()
+
+    def test_login_and_uniqueness_are_case_insensitive(self):
+        self.assertEqual(self.sm.login("ADMIN", "a")["username"], "Admin")
+        self.assertIsNone(self.sm.login("admin", "b"))
+        with self.assertRaises(ValueError):
+            self.sm.add_vendor(username="V1", email="x", password="x",
+                               company="Loja", shop_type="FARMACIA")
+
+    def test_email_lookup_follows_updates(self):
+        self.assertEqual(self.sm.find_user_by_email("admin@loja.pt")["username"], "Admin")
+        self.storage.update_user("v1", {"email": "novo@loja.pt"})
+        self.assertIsNone(self.sm.find_user_by_email("v1@loja.pt"))
+        self.assertEqual(self.sm.find_user_by_email("NOVO@loja.pt")["username"], "v1")
+
+    def test_shop_membership(self):
+        self.assertEqual(self.sm.get_shop_sellers("Loja", "FARMACIA"), ["v1", "Admin"])
+        self.assertEqual([u["username"] for u in self.sm.list_shop_users("Outra", "OFICINA", "VENDOR")],
+                         ["v2"])
+        self.assertEqual(self.sm.get_shop_sellers("Nenhuma", "OUTRO"), [])
+
+    def test_directory_follows_external_changes(self):
+        self.sm.login("v1", "b")
+        rows = json.loads(self.storage.users_path.read_text(encoding="utf-8"))
+        rows[1]["password"] = "mudada"
+        self.storage.users_path.write_text(json.dumps(rows, indent=1), encoding="utf-8")
+        self.assertIsNotNone(self.sm.login("v1", "mudada"))
+
+if __name__ == "__main__":
+    unittest.main()